@@ -1,6 +1,8 @@
 import cv2
 import sys
 
+from pos_processamento import como_lista, criar_mascara_classes, pos_processar
+
 # --- MODOS DE OPERAÇÃO ---
 MODO_DETECCAO = 0
 MODO_RASTREAMENTO = 1
@@ -17,6 +19,13 @@ configFile = "models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt"
 
 # Carrega a rede neural na memória
 net = cv2.dnn.readNetFromTensorflow(modelFile, configFile)
+
+# Para simplificar, vamos focar em alguns objetos comuns.
+# Você pode remover ou alterar esta lista para detectar tudo.
+objetos_alvo = ["person", "car",
+                "bottle", "cat", "dog", "cell phone"]
+# Máscara booleana indexada pelo class_id, calculada uma vez só
+mascara_classes = criar_mascara_classes(labels, objetos_alvo)
 # ---------------------------------------------------
 
 # --- VARIÁVEIS GLOBAIS ---
@@ -131,43 +140,25 @@ while True:
             modo_atual = MODO_DETECCAO  # Volta para o modo de detecção
 
     elif modo_atual == MODO_DETECCAO:
-        deteccoes_frame_atual = []  # Limpa a lista a cada frame
         # --- LÓGICA DE DETECÇÃO (ADAPTADA DA AULA 13) ---
         blob = cv2.dnn.blobFromImage(frame, 1.0, size=(
             300, 300), mean=(0, 0, 0), swapRB=True, crop=False)
         net.setInput(blob)
         detections = net.forward()
 
-        # Itera sobre todas as detecções encontradas
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            # Filtra detecções com baixa confiança
-            if confidence > 0.5:
-                class_id = int(detections[0, 0, i, 1])
-
-                # Para simplificar, vamos focar em alguns objetos comuns.
-                # Você pode remover ou alterar este 'if' para detectar tudo.
-                objetos_alvo = ["person", "car",
-                                "bottle", "cat", "dog", "cell phone"]
-                if labels[class_id] in objetos_alvo:
-                    # Calcula as coordenadas da caixa
-                    x = int(detections[0, 0, i, 3] * largura)
-                    y = int(detections[0, 0, i, 4] * altura)
-                    w = int(detections[0, 0, i, 5] * largura) - x
-                    h = int(detections[0, 0, i, 6] * altura) - y
-
-                    caixa = (x, y, w, h)
-                    label = labels[class_id]
-
-                    # Guarda a detecção para a função de clique
-                    deteccoes_frame_atual.append((caixa, label, confidence))
-
-                    # Desenha a caixa e o texto na tela
-                    cv2.rectangle(frame, (x, y), (x + w, y + h),
-                                  cor_caixa_ia, 2)
-                    texto = f"{label}: {confidence:.2f}"
-                    cv2.putText(frame, texto, (x, y - 5),
-                                fonte, 0.5, cor_caixa_ia, 2)
+        # Filtra e converte todas as detecções de uma vez (NumPy)
+        caixas, class_ids, confiancas = pos_processar(
+            detections, largura, altura, mascara_classes, limiar_confianca=0.5)
+        deteccoes_frame_atual = como_lista(caixas, class_ids, confiancas, labels)
+
+        for caixa, label, confidence in deteccoes_frame_atual:
+            (x, y, w, h) = caixa
+            # Desenha a caixa e o texto na tela
+            cv2.rectangle(frame, (x, y), (x + w, y + h),
+                          cor_caixa_ia, 2)
+            texto = f"{label}: {confidence:.2f}"
+            cv2.putText(frame, texto, (x, y - 5),
+                        fonte, 0.5, cor_caixa_ia, 2)
 
         cv2.putText(frame, "Clique em um objeto para seguir",
                     (10, 30), fonte, 0.75, cor_info, 2)
@@ -3,21 +3,107 @@ import sys
 import serial  # biblioteca para comunicação serial
 import time  # Para dar um tempo para a conexão serial estabilizar
 
+from cache_modelo import carregar_variantes_em_segundo_plano, texto_grafo
+from comunicacao_serial import EnlaceSerial
+from controlador import ControladorPreditivo
+from correcao_drift import AgendadorCorrecao
+from detector_assincrono import DetectorAssincrono
+from gravacao_video import GravadorVideo
+from medicao import RegistroLatencias
+from metricas import ArquivoMetricas, ServidorMetricas
+from multi_alvo import RastreadorMultiAlvo
+from porta_movimento import PortaMovimento
+from pos_processamento import como_lista, criar_mascara_classes, pos_processar
+from qualidade_adaptativa import ControladorQualidade
+from quadros import ExibicaoEspelhada, espelhar_x
+from rastreadores import RastreadorAdaptativo, RastreadorEscalado, RastreadorIntercalado
+from reaquisicao import Reaquisicao
+from registro_voo import GravadorVoo
+from reidentificacao import Reidentificacao
+from seguidor import MODO_RASTREAMENTO, SeguidorAlvo, desenhar_estado
+
+# Tempo de cada etapa do loop (captura, flip, blob, forward, rastreamento, controle, serial),
+# em buffers circulares; publicado por metricas.py (ver PORTA_METRICAS/ARQUIVO_METRICAS)
+latencias = RegistroLatencias()
+
 # --- CONFIGURAÇÃO DA COMUNICAÇÃO SERIAL ---
+PORTA_SERIAL = 'COM4'
+BAUDRATE = 9600
+# "texto" (ANGULO,LED\n) ou "binario" (quadro de 4 bytes com checksum; requer firmware compatível)
+PROTOCOLO_SERIAL = "texto"
 try:
     # cria um objeto serial que representa a conexão com o Arduino
-    arduino = serial.Serial(port='COM4', baudrate=9600, timeout=0.1)
+    arduino = serial.Serial(port=PORTA_SERIAL, baudrate=BAUDRATE, timeout=0.1)
     time.sleep(2)  # Espera 2 segundos para a conexão se estabelecer
     print("Conexão com o Arduino estabelecida.")
+    # Os writes acontecem em uma thread própria: o loop de visão só publica o comando mais recente
+    enlace = EnlaceSerial(arduino, BAUDRATE, PROTOCOLO_SERIAL, registro=latencias).iniciar()
 except serial.SerialException as e:
     print(f"Erro ao conectar com o Arduino: {e}")
     print("O programa continuará em modo de simulação.")
     arduino = None
+    enlace = None
 # ---------------------------------------------------
 
 # --- MODOS DE OPERAÇÃO ---
-MODO_DETECCAO = 0
-MODO_RASTREAMENTO = 1
+# Rastreamento multi-alvo: mantém um ID para cada objeto detectado e permite
+# trocar de alvo com um clique a qualquer momento, inclusive durante o rastreamento
+USAR_MULTI_ALVO = False
+# Durante o rastreamento o detector só roda quando a correção de drift pede (até 90 frames);
+# com multi-alvo ele roda no frame inteiro pelo menos a cada N frames, para as outras trilhas
+# continuarem atualizadas e clicáveis
+INTERVALO_TRILHAS = 15
+
+# Tracker inicial ("CSRT", "KCF", "MOSSE", "MIL" ou "DETECTOR"). Se o loop não couber no
+# orçamento do FPS_ALVO mesmo no último nível de qualidade, ele é trocado por um mais barato.
+RASTREADOR_INICIAL = "CSRT"
+# O tracker de verdade roda a cada N frames (1 = todo frame) ou antes, se o alvo andar mais que
+# LIMIAR_MOVIMENTO pixels; no meio a caixa é extrapolada e os comandos continuam saindo todo frame
+INTERVALO_RASTREADOR = 1
+LIMIAR_MOVIMENTO = 8.0
+
+# FPS que o controle de qualidade tenta manter: é o único orçamento de tempo do frame.
+# Para caber nele, reduz a resolução do tracker, a frequência do detector e a quantidade de
+# informação desenhada na tela e, por último, troca o backend do tracker
+FPS_ALVO = 20
+
+# Controle preditivo: filtro de Kalman no centro/área do alvo, extrapolado pela latência
+# medida (idade do frame + serial), com PID no lugar do controle P puro (ver controlador.py)
+USAR_CONTROLE_PREDITIVO = False
+
+# Variantes da rede por tamanho de entrada (pixels), na ordem em que são carregadas.
+# A maior serve para a seleção inicial no frame inteiro; as menores, para reaquisição em
+# recortes e correção de drift de alvos grandes. Cada passada tenta caber em ORCAMENTO_DETECCAO.
+LADOS_ENTRADA = [300, 256, 192]
+ORCAMENTO_DETECCAO = 0.15  # segundos
+
+# No modo de detecção, só manda o frame inteiro para a rede se a cena mudou (diferença entre
+# miniaturas de 64 px) ou se a última passada tem mais de IDADE_MAXIMA_CENA_PARADA segundos
+USAR_PORTA_MOVIMENTO = True
+IDADE_MAXIMA_CENA_PARADA = 2.0
+
+# Reidentificação: depois de uma perda, a detecção da mesma classe mais parecida com o alvo
+# (histograma HSV, tamanho e proporção) reinicia o tracker sozinha, sem novo clique
+USAR_REIDENTIFICACAO = True
+LIMIAR_REIDENTIFICACAO = 0.6
+
+# Registro binário do voo (um registro por frame: modo, detecções, caixa do tracker e comando),
+# para repetir o controle depois com Projeto/replay.py sem rodar a rede. None = não grava.
+ARQUIVO_REGISTRO = None  # ex: "voo.reg"
+
+# Vídeo anotado (o que aparece na janela), codificado em uma thread separada. Se o disco ou o
+# codificador não acompanham, os frames mais velhos da fila são descartados; o loop nunca espera.
+# FPS_GRAVACAO (None = o da câmera) e ESCALA_GRAVACAO reduzem o custo. None = não grava.
+ARQUIVO_VIDEO = None  # ex: "voo.avi"
+FPS_GRAVACAO = None
+ESCALA_GRAVACAO = 1.0
+
+# Métricas ao vivo (percentis e histograma por etapa, contadores da serial e do detector) em
+# http://127.0.0.1:PORTA_METRICAS/metricas. Sem tela/rede, use ARQUIVO_METRICAS (JSON reescrito
+# a cada INTERVALO_METRICAS segundos). None desliga cada um.
+PORTA_METRICAS = 8765
+ARQUIVO_METRICAS = None  # ex: "metricas.json"
+INTERVALO_METRICAS = 5.0
 # -------------------------
 
 # --- CONFIGURAÇÃO DO MODELO DE IA (DA AULA 13 de OPENCV) ---
@@ -31,46 +117,82 @@ modelFile = "models/ssd_mobilenet_v2_coco_2018_03_29/frozen_inference_graph.pb"
 # descreve a estrutura da rede em formato legível para o OpenCV
 configFile = "models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt"
 
-# Carrega a rede neural na memória
-net = cv2.dnn.readNetFromTensorflow(modelFile, configFile)
+# Para simplificar, vou focar em alguns objetos comuns.
+# podemos remover ou alterar esta lista para detectar tudo.
+objetos_alvo = ["person", "car",
+                "bottle", "cat", "dog", "cell phone"]
+
+# Máscara booleana indexada pelo class_id, calculada uma vez só
+mascara_classes = criar_mascara_classes(labels, objetos_alvo)
+
+# Poda dentro da própria rede: só as classes de objetos_alvo, acima do mesmo limiar do
+# pós-processamento e no máximo 20 caixas. O NMS do DetectionOutput trabalha bem menos e o
+# tensor que volta para o Python já vem quase filtrado (o pós-processamento continua valendo)
+PODA_DETECCAO = dict(confidence_threshold=0.5, keep_top_k=20,
+                     classes=[i for i, label in enumerate(labels) if label in objetos_alvo])
+
+# O grafo de texto sai do cache em models/cache/ (indexado pelo hash do .pb e pelos argumentos
+# do conversor), e as redes são carregadas e aquecidas em segundo plano enquanto a câmera abre.
+# As variantes (tamanho de entrada e poda) são derivadas do .pbtxt padrão, sem TensorFlow.
+grafos = {lado: texto_grafo(modelFile, pbtxt_padrao=configFile, image_width=lado, image_height=lado,
+                            **PODA_DETECCAO)
+          for lado in LADOS_ENTRADA}
+redes = carregar_variantes_em_segundo_plano(modelFile, grafos)
+
+
+def extrair_deteccoes(detections, largura, altura):
+    # Filtra por confiança e classe e converte as caixas para pixels em uma única passada NumPy
+    caixas, class_ids, confiancas = pos_processar(
+        detections, largura, altura, mascara_classes, limiar_confianca=0.5)
+    return como_lista(caixas, class_ids, confiancas, labels)
+
+
+# A rede roda em uma thread própria: o loop principal continua lendo, rastreando
+# e enviando comandos na taxa da câmera enquanto a detecção acontece em paralelo.
+# Até a rede ficar pronta, os frames enviados apenas esperam no slot do detector.
+detector = DetectorAssincrono(redes, extrair_deteccoes, tamanho_entrada=(LADOS_ENTRADA[0], LADOS_ENTRADA[0]),
+                              registro=latencias).iniciar()
+# Detecções mais velhas que isso (em segundos) são ignoradas
+idade_maxima_deteccao = 0.5
+# Decide se vale rodar a rede no frame inteiro ou reaproveitar as detecções da cena parada
+movimento = PortaMovimento(idade_maxima=IDADE_MAXIMA_CENA_PARADA)
+
+# Durante o rastreamento a IA confere o tracker a cada N frames (N se adapta à estabilidade)
+# e só reinicia o CSRT quando a detecção discorda da caixa rastreada.
+agendador = AgendadorCorrecao()
+
+# Trilhas de todos os objetos detectados (só usado com USAR_MULTI_ALVO)
+multi_alvo = RastreadorMultiAlvo()
+
+# Ao perder o alvo, procura primeiro em recortes ampliados ao redor da última caixa
+# (degraus 3x, 5x, 8x) e só volta para o frame inteiro depois de alguns frames
+reaquisicao = Reaquisicao(fatores=(3.0, 5.0, 8.0), quadros_por_degrau=5, quadros_ate_tela_cheia=15)
+
+# Assinatura de aparência do alvo, tirada no clique e atualizada durante o rastreamento
+reidentificacao = Reidentificacao(limiar=LIMIAR_REIDENTIFICACAO)
+
+# Só usado com USAR_CONTROLE_PREDITIVO; os ganhos de posição partem dos mesmos do controle P
+controlador = ControladorPreditivo(ki_posicao=0.02, kd_posicao=0.01)
+
+gravador = GravadorVoo(ARQUIVO_REGISTRO, labels) if ARQUIVO_REGISTRO else None
 # ---------------------------------------------------
 
 # --- VARIÁVEIS GLOBAIS ---
-# Inicia o programa no modo de detecção
-modo_atual = MODO_DETECCAO
-# Lista para guardar as caixas detectadas no frame atual
-deteccoes_frame_atual = []
+# Contador de frames, usado para casar os resultados do detector com o frame de origem
+numero_frame = 0
 # -------------------------
 
 # --- FUNÇÃO DE CALLBACK DO MOUSE ---
 
 
 def selecionar_alvo_por_clique(event, x, y, flags, param):
-    global modo_atual, deteccoes_frame_atual, frame, tracker, area_referencia, bbox
-
     # Se o evento for um clique do botão esquerdo
     if event == cv2.EVENT_LBUTTONDOWN:
-        # Se estivermos no modo de detecção
-        if modo_atual == MODO_DETECCAO:
-            # Percorre todas as caixas detectadas no último frame, onde cada item é uma tupla (caixa, label, conf)
-            for i, (caixa, label, conf) in enumerate(deteccoes_frame_atual):
-                # desempacota os valores da caixa
-                (x_caixa, y_caixa, w_caixa, h_caixa) = caixa
-                # Verifica se o clique (x, y) está dentro da caixa atual
-                if x >= x_caixa and x <= x_caixa + w_caixa and y >= y_caixa and y <= y_caixa + h_caixa:
-                    print(f"Alvo selecionado: {label} [{i}]")
-                    # Define a caixa selecionada como a bbox para o tracker
-                    bbox = caixa
-                    # Reinicia o tracker
-                    tracker = cv2.TrackerCSRT_create()
-                    tracker.init(frame, bbox)
-                    # Define a área de referência para o controle de distância
-                    area_referencia = bbox[2] * bbox[3]
-                    # Muda para o modo de rastreamento
-                    modo_atual = MODO_RASTREAMENTO
-                    # Limpa a lista de detecções para não interferir
-                    deteccoes_frame_atual = []
-                    break  # Sai do loop assim que encontrar o alvo
+        # A janela mostra a imagem espelhada; as caixas estão nas coordenadas da câmera.
+        # Com multi-alvo vale qualquer trilha, em qualquer modo; senão, uma detecção do modo de detecção.
+        alvo = seguidor.selecionar(espelhar_x(x, largura), y)
+        if alvo is not None:
+            print(f"Alvo selecionado: {alvo}")
 # ------------------------------------
 
 
@@ -83,194 +205,153 @@ if not video.isOpened():
     print("Erro ao abrir o vídeo")
     sys.exit()
 
-# Cores e fontes
-cor_sucesso = (0, 255, 0)
-cor_falha = (0, 0, 255)
+# Cores e fontes (as caixas e o comando são desenhados por seguidor.desenhar_estado)
 cor_info = (0, 0, 255)
-cor_caixa_ia = (255, 178, 50)
 fonte = cv2.FONT_HERSHEY_SIMPLEX
 
 # Variáveis do tracker
-tracker = cv2.TrackerCSRT_create()
-area_referencia = 0
-bbox = None
+# O backend (CSRT, KCF, ...) é escolhido em tempo de execução pelo orçamento de tempo do frame,
+# e roda em uma cópia reduzida do frame definida pelo controle de qualidade
+tracker = RastreadorIntercalado(
+    RastreadorEscalado(RastreadorAdaptativo(inicial=RASTREADOR_INICIAL, orcamento_quadro=1 / FPS_ALVO)),
+    intervalo=INTERVALO_RASTREADOR, limiar_movimento=LIMIAR_MOVIMENTO)
+# Sobe/desce o nível de qualidade conforme o tempo de processamento de cada frame. É o único
+# que reage ao tempo do frame: quando os níveis acabam, ele mesmo troca o backend do tracker.
+qualidade = ControladorQualidade(fps_alvo=FPS_ALVO, rastreador=tracker)
+
+# O passo de cada frame (tracker, correção de drift, reaquisição, reidentificação, trilhas e
+# controle) é o mesmo do multi_camera.py e do pipeline_processos.py (ver seguidor.py)
+seguidor = SeguidorAlvo(
+    tracker, detector, agendador,
+    reaquisicao=reaquisicao,
+    reidentificacao=reidentificacao if USAR_REIDENTIFICACAO else None,
+    movimento=movimento if USAR_PORTA_MOVIMENTO else None,
+    controlador=controlador if USAR_CONTROLE_PREDITIVO else None,
+    multi_alvo=multi_alvo if USAR_MULTI_ALVO else None,
+    qualidade=qualidade, enlace=enlace, registro=latencias,
+    idade_maxima_deteccao=idade_maxima_deteccao, orcamento_deteccao=ORCAMENTO_DETECCAO,
+    intervalo_trilhas=INTERVALO_TRILHAS)
 
 # Cria a janela e atribui a função de callback do mouse a ela
 win_name = "Simulador Drone Siga-me com IA"
 cv2.namedWindow(win_name)
 cv2.setMouseCallback(win_name, selecionar_alvo_por_clique)
+
+gravador_video = None
+if ARQUIVO_VIDEO is not None:
+    # O fps do arquivo é o do loop (medido pelo gravador), não o CAP_PROP_FPS da câmera:
+    # o loop roda mais devagar que ela e o vídeo tocaria rápido demais
+    gravador_video = GravadorVideo(ARQUIVO_VIDEO, None, FPS_GRAVACAO, ESCALA_GRAVACAO,
+                                   registro=latencias).iniciar()
+
+# Contadores publicados junto com as latências
+extras_metricas = {
+    "rastreador": lambda: {"nome": tracker.nome, "escala": tracker.escala,
+                           "atualizacoes": tracker.atualizacoes, "interpolados": tracker.interpolados},
+    "detector": lambda: {"passadas": detector.passadas, "descartados": detector.frames_descartados,
+                         "erros": detector.erros,
+                         "latencias_ms": {lado: round(t * 1000, 1) for lado, t in detector.latencias_medidas().items()}},
+    "qualidade": lambda: {"nivel": qualidade.nivel, "orcamento_ms": round(qualidade.orcamento * 1000, 1),
+                          "trocas_rastreador": qualidade.trocas_rastreador},
+    "modo": lambda: "rastreamento" if seguidor.modo == MODO_RASTREAMENTO else "deteccao",
+    "reidentificacao": lambda: {"buscando": reidentificacao.buscando,
+                                "reidentificacoes": reidentificacao.reidentificacoes,
+                                "ultima_pontuacao": round(reidentificacao.ultima_pontuacao, 3)},
+    "porta_movimento": lambda: {"passadas": movimento.passadas, "ignorados": movimento.ignorados,
+                                "fracao_mudada": round(movimento.fracao_mudada, 4)},
+}
+if enlace is not None:
+    extras_metricas["serial"] = enlace.contadores
+if gravador_video is not None:
+    extras_metricas["gravacao_video"] = gravador_video.contadores
+publicadores_metricas = []
+if PORTA_METRICAS is not None:
+    try:
+        servidor_metricas = ServidorMetricas(latencias, PORTA_METRICAS, extras_metricas).iniciar()
+        publicadores_metricas.append(servidor_metricas)
+        print(f"Métricas em {servidor_metricas.endereco}")
+    except OSError as e:  # porta em uso
+        print(f"Servidor de métricas desativado: {e}")
+if ARQUIVO_METRICAS is not None:
+    publicadores_metricas.append(
+        ArquivoMetricas(latencias, ARQUIVO_METRICAS, INTERVALO_METRICAS, extras_metricas).iniciar())
 # ---------------------------------------------
 
 
+# Buffer de captura: read() grava o frame novo nele, sem alocar um por iteração.
+# Nada desenha nele (os desenhos vão na cópia de exibição), então ele pode ser reaproveitado.
+frame = None
+# Cópia espelhada para desenhar e mostrar, também reaproveitada
+tela = ExibicaoEspelhada()
+
 # --- LOOP PRINCIPAL ---
 while True:
-    ok, frame = video.read()
+    with latencias.medir("captura"):
+        ok, frame = video.read(frame)
     if not ok:
         break
-
-    frame = cv2.flip(frame, 1)
+    numero_frame += 1
+    timestamp_frame = time.monotonic()
+    inicio_quadro = time.perf_counter()
+
+    # Tracker, detector e controle trabalham na imagem da câmera; só a exibição é espelhada
+    # (os desenhos e os cliques passam por espelhar_caixa/espelhar_x)
+    with latencias.medir("flip"):
+        exibicao = tela.preparar(frame)
     altura, largura, _ = frame.shape
 
-    if modo_atual == MODO_RASTREAMENTO:
-        # - Atualiza a posição da bbox (bounding box) do objeto rastreado
-        ok, bbox = tracker.update(frame)
-
-        if ok:
-            comando_pos_serial = ''
-            comando_dist_serial = ''
-
-            # --- LÓGICA DE CONTROLE PROPORCIONAL (P-Controller) ---
-
-            # --- 1. Controle de Posição (Esquerda/Direita) ---
-            centro_frame_x = largura // 2
-            centro_obj_x = int(bbox[0] + bbox[2] / 2)
-
-            # Calcula o "erro" de posição. Negativo = objeto à esquerda, Positivo = objeto à direita
-            erro_posicao = centro_obj_x - centro_frame_x
-
-            # Define uma "velocidade" de movimento baseada no erro.
-            # O valor Kp (ganho proporcional) determina o quão "agressiva" é a resposta.
-            # Você pode ajustar este valor!
-            Kp_posicao = 0.1
-            velocidade_horizontal = Kp_posicao * erro_posicao
-
-            # Gera o comando de texto baseado na velocidade calculada
-            zona_morta = 30  # Usamos a zona morta para o comando "PARADO"
-
-            # NOVO: Define os parâmetros para o controle do servo motor
-            fator_conversao = 4.5  # Sua calibração: graus por unidade de velocidade
-            angulo_centro = 90
-            angulo_min = 0
-            angulo_max = 180
-
-            # NOVO: Calcula o quanto o ângulo deve se deslocar a partir do centro, baseado na velocidade
-            # abs retorna o valor absoluto
-            deslocamento_angulo = abs(velocidade_horizontal) * fator_conversao
-
-            # A lógica de IF/ELSE agora calcula o ângulo em vez de apenas definir um texto
-            if erro_posicao < -zona_morta:
-                comando_posicao = f"MOVER ESQUERDA (Vel: {abs(velocidade_horizontal):.1f})"
-                angulo_calculado = angulo_centro + deslocamento_angulo
-            elif erro_posicao > zona_morta:
-                comando_posicao = f"MOVER DIREITA (Vel: {velocidade_horizontal:.1f})"
-                angulo_calculado = angulo_centro - deslocamento_angulo
-            else:
-                comando_posicao = "CENTRALIZADO"
-                angulo_calculado = angulo_centro
-                velocidade_horizontal = 0
-
-            # NOVO: Garante que o ângulo final esteja sempre dentro dos limites seguros do servo (0-180)
-            angulo_final_servo = int(
-                max(angulo_min, min(angulo_max, angulo_calculado)))
-
-            # --- 2. Controle de Distância (Frente/Trás) ---
-            area_atual = bbox[2] * bbox[3]
-
-            # Calcula o erro de área em relação à referência.
-            # Positivo = objeto muito perto, Negativo = objeto muito longe
-            erro_area = area_atual - area_referencia
-
-            # Ganho proporcional para o controle de distância
-            Kp_area = 0.001  # Este valor costuma ser bem menor, pois nao quero que o drone se aproxime/afaste muito rápido
-            # Negativo para inverter a ação (se perto, afasta)
-            # O sinal negativo inverte a ação: se está perto, afasta.
-            velocidade_profundidade = - (Kp_area * erro_area)
-
-            # Gera o comando de texto
-            threshold_area = 0.15  # 15% de margem
-            if area_atual > area_referencia * (1 + threshold_area):
-                comando_distancia = f"AFASTAR (Vel: {abs(velocidade_profundidade):.1f})"
-                comando_dist_serial = 'F'  # F for Afastar
-            elif area_atual < area_referencia * (1 - threshold_area):
-                comando_distancia = f"APROXIMAR (Vel: {velocidade_profundidade:.1f})"
-                comando_dist_serial = 'A'  # A for Aproximar
-            else:
-                comando_distancia = "MANTER DISTANCIA"
-                velocidade_profundidade = 0
-                comando_dist_serial = 'M'  # M for Manter
-
-             # --- ENVIO DO COMANDO PARA O ARDUINO (NOVO) ---
-            if arduino is not None:
-                # O comando agora é "ANGULO,COMANDO_LED\n"
-                comando_final_serial = f"{angulo_final_servo},{comando_dist_serial}\n"
-                arduino.write(comando_final_serial.encode('utf-8'))
-
-            # --- FIM DO CONTROLE PROPORCIONAL ---
-
-            # Para um drone real, você enviaria os valores `velocidade_horizontal` e `velocidade_profundidade`
-            # via comunicação serial, em vez de apenas mostrar o texto.
-
-            # Lógica de exibição (desenhar caixa e texto)
-            p1, p2 = (int(bbox[0]), int(bbox[1])), (int(
-                bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-            cv2.rectangle(frame, p1, p2, cor_sucesso, 2, 1)
-
-            comando_final = f"Pos: {comando_posicao} | Dist: {comando_distancia}"
-            cv2.putText(frame, comando_final, (10, 30),
-                        fonte, 0.6, cor_info, 2)
-        else:
-            # RASTREAMENTO FALHOU!
-            cv2.putText(frame, "Alvo Perdido!", (100, 80),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.75, cor_falha, 2)
-            # Apenas muda o modo, não tenta selecionar aqui
-            modo_atual = MODO_DETECCAO
-
-    elif modo_atual == MODO_DETECCAO:
-        deteccoes_frame_atual = []  # Limpa a lista a cada frame
-        # --- LÓGICA DE DETECÇÃO (ADAPTADA DA AULA 13) ---
-        blob = cv2.dnn.blobFromImage(frame, 1.0, size=(
-            # transforma a imagem (frame) em um blob, que é o formato que a rede neural espera como entrada.
-            300, 300), mean=(0, 0, 0), swapRB=True, crop=False)
-        # Envia o blob como entrada para a rede neural, a rede neural agora esta pronto para fazer a detecção.
-        net.setInput(blob)
-        detections = net.forward()  # a rede analisa o frame e retorna as detecções
-
-        # Itera sobre todas as detecções encontradas
-        # 2 representa o número de detecções
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            # Filtra detecções com baixa confiança
-            if confidence > 0.5:
-                # - ID da classe detectada (ex: 1 = "person", 3 = "car", etc.).
-                class_id = int(detections[0, 0, i, 1])
-                # Para simplificar, vou focar em alguns objetos comuns.
-                # podemos remover ou alterar este 'if' para detectar tudo.
-                objetos_alvo = ["person", "car",
-                                "bottle", "cat", "dog", "cell phone"]
-                if labels[class_id] in objetos_alvo:
-                    # Calcula as coordenadas da caixa
-                    # Converte as coordenadas normalizadas (valores entre 0 e 1) para coordenadas reais da imagem.
-                    x = int(detections[0, 0, i, 3] * largura)
-                    # multiplicando pela largura e altura do frame.
-                    y = int(detections[0, 0, i, 4] * altura)
-                    # - Calcula w e h como diferença entre os extremos da caixa.
-                    w = int(detections[0, 0, i, 5] * largura) - x
-                    h = int(detections[0, 0, i, 6] * altura) - y
-
-                    caixa = (x, y, w, h)
-                    label = labels[class_id]
-
-                    # Guarda a detecção para a função de clique
-                    deteccoes_frame_atual.append((caixa, label, confidence))
-
-                    # Desenha a caixa e o texto na tela
-                    cv2.rectangle(frame, (x, y), (x + w, y + h),
-                                  cor_caixa_ia, 2)
-                    texto = f"{label}: {confidence:.2f}"
-                    cv2.putText(frame, texto, (x, y - 5),
-                                fonte, 0.5, cor_caixa_ia, 2)
+    # Tracker, detector, controle e serial deste frame
+    seguidor.passo(frame, numero_frame, timestamp_frame)
+    if seguidor.reidentificado is not None:
+        print(f"Alvo reidentificado: {seguidor.reidentificado} "
+              f"(pontuação {reidentificacao.ultima_pontuacao:.2f})")
+
+    # Quantidade de informação desenhada no nível de qualidade atual
+    nivel_overlay = qualidade.nivel_overlay
+    if seguidor.modo_quadro != MODO_RASTREAMENTO and not detector.pronto():
+        cv2.putText(exibicao, "Carregando rede neural...", (10, 30), fonte, 0.6, cor_info, 2)
+    desenhar_estado(exibicao, seguidor.estado(), nivel_overlay)
+
+    if gravador is not None:
+        # Uma perda neste frame aparece como modo de rastreamento sem caixa
+        # Tudo em coordenadas da imagem exibida (espelhada), as mesmas que o controle usa
+        comando = seguidor.comando
+        gravador.registrar(numero_frame, timestamp_frame, seguidor.modo_quadro, largura, altura,
+                           seguidor.bbox_controle, seguidor.area_referencia,
+                           comando, detector.ultimo_resultado(), espelhado=True,
+                           instante_controle=seguidor.instante_controle if comando is not None else 0.0,
+                           atraso_atuacao=seguidor.atraso_atuacao if comando is not None else 0.0)
+
+    if gravador_video is not None:
+        # Só copia o frame desenhado para a fila; a codificação fica com a thread do gravador
+        gravador_video.adicionar(exibicao)
 
     # Exibe o resultado final na janela
-    cv2.imshow(win_name, frame)
+    cv2.imshow(win_name, exibicao)
 
     if cv2.waitKey(1) & 0xFF == 27:  # ESC para sair
         break
-    # --- FINALIZAÇÃO (MODIFICADO) ---
-if arduino is not None:
-    # MODIFICADO: Manda um comando final para centralizar o servo (ângulo 90) e apagar os LEDs
-    arduino.write(f"90,M\n".encode('utf-8'))
-    arduino.close()
-    print("Conexão com o Arduino fechada.")
+
+    # Tempo de processamento do frame (sem a espera da câmera) para o controle de qualidade
+    duracao_quadro = time.perf_counter() - inicio_quadro
+    # Com o alvo sendo rastreado, o controle de qualidade também pode trocar o backend do tracker
+    qualidade.registrar(duracao_quadro, frame if seguidor.modo == MODO_RASTREAMENTO else None)
+    latencias.registrar("quadro", duracao_quadro)
+
+# --- FINALIZAÇÃO ---
+detector.parar()
+for publicador in publicadores_metricas:
+    publicador.parar()
+if gravador is not None:
+    gravador.fechar()
+    print(f"Registro do voo: {gravador.registros} frames em {ARQUIVO_REGISTRO}")
+if gravador_video is not None:
+    gravador_video.fechar()
+    print(f"Vídeo anotado em {ARQUIVO_VIDEO}: {gravador_video.contadores()}")
+if enlace is not None:
+    # Manda um comando final para centralizar o servo (ângulo 90) e apagar os LEDs
+    enlace.fechar(comando_final=(90, 'M'))
+    print(f"Conexão com o Arduino fechada. Comandos: {enlace.contadores()}")
 
 video.release()
 cv2.destroyAllWindows()
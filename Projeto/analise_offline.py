@@ -0,0 +1,164 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import cv2
+
+from cache_modelo import texto_grafo
+from pos_processamento import carregar_labels, criar_mascara_classes, pos_processar
+
+# --- ANÁLISE OFFLINE DE VÍDEOS GRAVADOS ---
+# Roda o detector SSD (mais o pós-processamento) em todos os frames de um vídeo gravado, sem
+# janela nem tracker. O vídeo é dividido em faixas de frames e cada faixa vai para um processo
+# de um pool; cada processo carrega a rede uma vez só e abre o vídeo por conta própria, então
+# só os índices das faixas e as detecções (listas pequenas) passam entre processos.
+# As faixas voltam na ordem (imap) e são gravadas em um arquivo JSON Lines, uma linha por frame:
+#   {"frame": 0, "deteccoes": [{"classe": "person", "confianca": 0.91, "caixa": [x, y, w, h]}, ...]}
+# Frames que não puderam ser lidos (faixa que terminou antes: vídeo truncado, seek impreciso)
+# saem com "deteccoes": null, para não se confundirem com frames lidos sem nenhuma detecção.
+#
+# Exemplos (a partir da pasta raiz do projeto):
+#   python Projeto/analise_offline.py voo1.mp4
+#   python Projeto/analise_offline.py voo1.mp4 --processos 8 --faixa 500 --saida voo1.jsonl
+
+MODELO_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29/frozen_inference_graph.pb"
+CONFIG_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt"
+
+# Estado de cada processo do pool (preenchido por inicializar_processo)
+_net = None
+_labels = None
+_mascara_classes = None
+_config = None
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Detecção offline em vídeos gravados com um pool de processos.")
+    parser.add_argument("video", help="Arquivo de vídeo gravado.")
+    parser.add_argument("--saida", help="Arquivo de detecções (padrão: <video>.deteccoes.jsonl).")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="Processos no pool (padrão: um por núcleo).")
+    parser.add_argument("--faixa", type=int, default=300, help="Frames por faixa entregue a um processo.")
+    parser.add_argument("--lado", type=int, default=300, help="Lado da entrada da rede (pixels).")
+    parser.add_argument("--limiar", type=float, default=0.5, help="Confiança mínima.")
+    parser.add_argument("--classes", nargs="*",
+                        help="Só estas classes (nomes do COCO, ex: person car). Padrão: todas.")
+    parser.add_argument("--espelhar", action="store_true",
+                        help="Espelha os frames como o loop ao vivo (cv2.flip) antes de detectar.")
+    parser.add_argument("--modelo", default=MODELO_PADRAO)
+    parser.add_argument("--config", default=CONFIG_PADRAO)
+    return parser
+
+
+def contar_quadros(caminho):
+    video = cv2.VideoCapture(caminho)
+    if not video.isOpened():
+        raise SystemExit(f"Erro ao abrir o vídeo {caminho}")
+    total = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total <= 0:
+        # Alguns contêineres não informam a contagem: conta com grab(), que não decodifica
+        total = 0
+        while video.grab():
+            total += 1
+    video.release()
+    return total
+
+
+def dividir_em_faixas(total, tamanho):
+    return [(inicio, min(inicio + tamanho, total)) for inicio in range(0, total, tamanho)]
+
+
+def inicializar_processo(caminho_pb, caminho_pbtxt, config):
+    global _net, _labels, _mascara_classes, _config
+    # Uma thread do OpenCV por processo: o paralelismo vem do pool, e threads internas
+    # de vários processos disputando os mesmos núcleos atrapalham a escala
+    cv2.setNumThreads(1)
+    _net = cv2.dnn.readNetFromTensorflow(caminho_pb, caminho_pbtxt)
+    _labels = carregar_labels()
+    _mascara_classes = criar_mascara_classes(_labels, config["classes"])
+    _config = config
+
+
+def analisar_faixa(faixa):
+    # Retorna (inicio, [detecções de cada frame da faixa], quantos frames do fim não foram lidos)
+    inicio, fim = faixa
+    lado = _config["lado"]
+    video = cv2.VideoCapture(_config["video"])
+    video.set(cv2.CAP_PROP_POS_FRAMES, inicio)
+    quadros = []
+    for _ in range(inicio, fim):
+        ok, frame = video.read()
+        if not ok:
+            break
+        if _config["espelhar"]:
+            frame = cv2.flip(frame, 1)
+        altura, largura = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, size=(lado, lado), mean=(0, 0, 0),
+                                     swapRB=True, crop=False)
+        _net.setInput(blob)
+        detections = _net.forward()
+        caixas, class_ids, confiancas = pos_processar(
+            detections, largura, altura, _mascara_classes, _config["limiar"])
+        quadros.append([{"classe": _labels[k], "confianca": round(float(c), 4), "caixa": caixa.tolist()}
+                        for caixa, k, c in zip(caixas, class_ids, confiancas)])
+    video.release()
+    # Faixa que terminou antes (vídeo truncado, seek impreciso): completa com None (null no
+    # arquivo), e não com listas vazias, que diriam "lido e sem detecções"
+    faltando = fim - inicio - len(quadros)
+    quadros.extend([None] * faltando)
+    return inicio, quadros, faltando
+
+
+def executar(args):
+    saida = args.saida or os.path.splitext(args.video)[0] + ".deteccoes.jsonl"
+    total = contar_quadros(args.video)
+    faixas = dividir_em_faixas(total, args.faixa)
+    # O grafo de texto é gerado (ou lido do cache) aqui, antes de o pool subir,
+    # para os processos não converterem o mesmo modelo ao mesmo tempo. Mesma poda dentro da
+    # rede do Versão2.py (limiar e, se houver, lista de classes)
+    poda = dict(confidence_threshold=args.limiar)
+    if args.classes:
+        poda["classes"] = [i for i, label in enumerate(carregar_labels()) if label in args.classes]
+    grafo = texto_grafo(args.modelo, pbtxt_padrao=args.config,
+                        image_width=args.lado, image_height=args.lado, **poda)
+    config = {"video": args.video, "lado": args.lado, "limiar": args.limiar,
+              "classes": args.classes, "espelhar": args.espelhar}
+    print(f"{total} frames em {len(faixas)} faixas, {args.processos} processos")
+
+    inicio = time.perf_counter()
+    faixas_curtas = 0
+    nao_lidos = 0
+    with multiprocessing.Pool(args.processos, initializer=inicializar_processo,
+                              initargs=(args.modelo, grafo, config)) as pool, \
+            open(saida, "w", encoding="utf-8") as fp:
+        # imap devolve as faixas na ordem de envio, mesmo que terminem fora de ordem:
+        # o arquivo é escrito em sequência sem guardar o vídeo inteiro na memória
+        for inicio_faixa, quadros, faltando in pool.imap(analisar_faixa, faixas):
+            if faltando:
+                faixas_curtas += 1
+                nao_lidos += faltando
+                print(f"  Aviso: faixa {inicio_faixa}-{inicio_faixa + len(quadros)} terminou "
+                      f"{faltando} frames antes (gravados com \"deteccoes\": null)")
+            for deslocamento, deteccoes in enumerate(quadros):
+                fp.write(json.dumps({"frame": inicio_faixa + deslocamento, "deteccoes": deteccoes},
+                                    ensure_ascii=False) + "\n")
+            feitos = inicio_faixa + len(quadros)
+            decorrido = time.perf_counter() - inicio
+            print(f"  {feitos}/{total} frames ({feitos / decorrido:.1f} FPS)")
+
+    duracao = time.perf_counter() - inicio
+    print(f"Detecções gravadas em {saida} ({(total - nao_lidos) / duracao:.1f} FPS no total)")
+    if faixas_curtas:
+        print(f"{nao_lidos} frames não lidos em {faixas_curtas} faixas curtas")
+
+
+if __name__ == "__main__":
+    parser = criar_parser()
+    args = parser.parse_args()
+    # Um nome fora do COCO deixaria a poda da rede sem classes (= todas) e a máscara sem nenhuma
+    desconhecidas = sorted(set(args.classes or []) - set(carregar_labels()))
+    if desconhecidas:
+        parser.error(f"classes desconhecidas: {', '.join(desconhecidas)}")
+    executar(args)
+# ------------------------------------
@@ -0,0 +1,112 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# --- ANEL DE FRAMES EM MEMÓRIA COMPARTILHADA ---
+# Um processo (a captura) escreve os frames em "slots" de um bloco multiprocessing.shared_memory;
+# os outros processos (inferência, rastreamento/controle, exibição) leem o slot pelo número de
+# sequência, direto da memória, sem pickle nem cópia pelo sistema operacional.
+#
+# Layout do bloco:
+#   sequencias int64[slots] | instantes float64[slots] | ultima int64 | (alinhamento) | frames uint8[slots, h, w, c]
+# O slot da sequência s é s % slots. Enquanto a captura escreve um slot, a sequência dele fica em -1
+# (um "seqlock"): quem lê confere a sequência antes e depois da cópia e descarta a leitura se o slot
+# foi reescrito no meio. Só pode existir um escritor.
+
+ALINHAMENTO = 64
+
+
+def _abrir_memoria(nome):
+    # Python 3.13+: quem só abre o bloco não deve registrá-lo no resource_tracker
+    # (senão ele é apagado quando o primeiro leitor termina)
+    try:
+        return shared_memory.SharedMemory(name=nome, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=nome)
+
+
+class AnelQuadros:
+    def __init__(self, memoria, forma, slots, dono):
+        self.memoria = memoria
+        self.forma = tuple(forma)
+        self.slots = slots
+        self.dono = dono
+        buffer = memoria.buf
+        self._sequencias = np.ndarray((slots,), dtype=np.int64, buffer=buffer, offset=0)
+        self._instantes = np.ndarray((slots,), dtype=np.float64, buffer=buffer, offset=8 * slots)
+        self._ultima = np.ndarray((1,), dtype=np.int64, buffer=buffer, offset=16 * slots)
+        self._frames = np.ndarray((slots,) + self.forma, dtype=np.uint8, buffer=buffer,
+                                  offset=AnelQuadros._inicio_frames(slots))
+
+    @staticmethod
+    def _inicio_frames(slots):
+        cabecalho = 16 * slots + 8
+        return (cabecalho + ALINHAMENTO - 1) // ALINHAMENTO * ALINHAMENTO
+
+    @classmethod
+    def criar(cls, forma, slots=8):
+        # Chamado pelo escritor (captura); o nome do bloco vai para os outros processos
+        tamanho = cls._inicio_frames(slots) + slots * int(np.prod(forma))
+        memoria = shared_memory.SharedMemory(create=True, size=tamanho)
+        anel = cls(memoria, forma, slots, dono=True)
+        anel._sequencias[:] = 0
+        anel._ultima[0] = 0
+        return anel
+
+    @classmethod
+    def abrir(cls, nome, forma, slots=8):
+        return cls(_abrir_memoria(nome), forma, slots, dono=False)
+
+    @property
+    def nome(self):
+        return self.memoria.name
+
+    def ultima(self):
+        # Sequência do frame mais novo (0 = nenhum ainda)
+        return int(self._ultima[0])
+
+    # --- Escrita (só a captura) ---
+
+    def reservar(self):
+        # Retorna (sequência, slot) para escrever o próximo frame direto na memória compartilhada
+        # (ex: video.read(slot)); depois chame publicar()
+        sequencia = self.ultima() + 1
+        indice = sequencia % self.slots
+        self._sequencias[indice] = -1
+        return sequencia, self._frames[indice]
+
+    def publicar(self, sequencia, instante):
+        indice = sequencia % self.slots
+        self._instantes[indice] = instante
+        self._sequencias[indice] = sequencia
+        self._ultima[0] = sequencia
+
+    def escrever(self, frame, instante):
+        sequencia, slot = self.reservar()
+        np.copyto(slot, frame)
+        self.publicar(sequencia, instante)
+        return sequencia
+
+    # --- Leitura ---
+
+    def ler(self, sequencia, destino):
+        # Copia o frame "sequencia" para destino (array do processo leitor, com a mesma forma).
+        # Retorna o instante de captura, ou None se o slot já foi (ou está sendo) reescrito.
+        indice = sequencia % self.slots
+        if self._sequencias[indice] != sequencia:
+            return None
+        np.copyto(destino, self._frames[indice])
+        instante = float(self._instantes[indice])
+        if self._sequencias[indice] != sequencia:
+            return None
+        return instante
+
+    def fechar(self, apagar=None):
+        # apagar: remove o bloco do sistema (padrão: só quem criou). Os outros processos que
+        # ainda o tiverem aberto continuam lendo até fecharem.
+        # As views NumPy precisam sumir antes do close(), senão o mmap não pode ser liberado
+        self._sequencias = self._instantes = self._ultima = self._frames = None
+        self.memoria.close()
+        if self.dono if apagar is None else apagar:
+            self.memoria.unlink()
+# ------------------------------------
@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import time
+
+import cv2
+
+from comunicacao_serial import EnlaceSerial
+from correcao_drift import AgendadorCorrecao
+from detector_assincrono import DetectorAssincrono, DetectorSincrono, ResultadoDeteccao
+from medicao import RegistroLatencias
+from porta_movimento import PortaMovimento
+from pos_processamento import carregar_labels, como_lista, criar_mascara_classes, pos_processar
+from quadros import ExibicaoEspelhada
+from qualidade_adaptativa import ControladorQualidade
+from rastreadores import RastreadorAdaptativo, RastreadorEscalado, RastreadorIntercalado
+from reaquisicao import Reaquisicao
+from reidentificacao import Reidentificacao
+from seguidor import MODO_DETECCAO, MODO_RASTREAMENTO, SeguidorAlvo, desenhar_estado
+
+# --- BENCHMARK HEADLESS DO PIPELINE ---
+# Reproduz vídeos (ou as fotos de images/ transformadas em sequências com um "pan" sintético)
+# pelo mesmo passo por frame do Versão2.py (seguidor.SeguidorAlvo), com os mesmos componentes:
+# detector, correção de drift, porta de movimento, reaquisição, reidentificação, controle de
+# qualidade e enlace serial (escrevendo em uma porta nula), mais a cópia espelhada e os desenhos
+# da exibição. Não abre janela nem usa câmera/GPU, então roda em máquinas de CI.
+# Sem operador para clicar, o alvo é a maior detecção, escolhida quando a reidentificação não
+# está procurando o alvo perdido.
+# O resultado (percentis por etapa, FPS e contadores) sai em JSON.
+#
+# Exemplos (a partir da pasta raiz do projeto):
+#   python Projeto/benchmark.py --imagens images --saida bench.json
+#   python Projeto/benchmark.py --video voo1.mp4 --rastreador KCF --intervalo-deteccao 10
+#   python Projeto/benchmark.py --intervalo-rastreador 2   # CSRT a cada 2 frames
+#   python Projeto/benchmark.py --sincrono   # a rede roda no próprio frame (reprodutível)
+#   python Projeto/benchmark.py --sem-rede   # sem o arquivo .pb: detector fixo no centro do frame
+
+MODELO_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29/frozen_inference_graph.pb"
+CONFIG_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt"
+OBJETOS_ALVO = ["person", "car", "bottle", "cat", "dog", "cell phone"]
+
+
+class FonteImagens:
+    # Transforma cada foto em uma sequência de frames: uma janela com 80% do tamanho
+    # da foto desliza na horizontal, como uma câmera fazendo pan. Mesma interface de VideoCapture.
+    def __init__(self, pasta, quadros_por_imagem=60, passo=4):
+        extensoes = (".jpg", ".jpeg", ".png", ".bmp")
+        caminhos = sorted(os.path.join(pasta, nome) for nome in os.listdir(pasta)
+                          if nome.lower().endswith(extensoes))
+        self.imagens = [imagem for imagem in (cv2.imread(c) for c in caminhos) if imagem is not None]
+        self.quadros_por_imagem = quadros_por_imagem
+        self.passo = passo
+        self.quadro = 0
+
+    def isOpened(self):
+        return len(self.imagens) > 0
+
+    def read(self):
+        indice, deslocamento = divmod(self.quadro, self.quadros_por_imagem)
+        if indice >= len(self.imagens):
+            return False, None
+        self.quadro += 1
+        imagem = self.imagens[indice]
+        altura, largura = imagem.shape[:2]
+        w, h = int(largura * 0.8), int(altura * 0.8)
+        # Vai e volta dentro da foto
+        curso = max(1, largura - w)
+        x = (deslocamento * self.passo) % (2 * curso)
+        x = x if x < curso else 2 * curso - x
+        y = (altura - h) // 2
+        # A cópia simula o buffer novo que a câmera entrega a cada frame
+        return True, imagem[y:y + h, x:x + w].copy()
+
+    def release(self):
+        pass
+
+
+class DetectorFixo:
+    # Detector de mentira para máquinas sem o modelo (--sem-rede): síncrono, sempre devolve
+    # uma "person" no centro do frame (ou do recorte pedido)
+    def __init__(self):
+        self.passadas = 0
+        self.frames_descartados = 0
+        self.erros = 0
+        self._resultado = None
+
+    def ocupado(self):
+        return False
+
+    def enviar(self, frame, id_frame, timestamp=None, roi=None, lado=None):
+        altura, largura = frame.shape[:2]
+        x0, y0, x1, y1 = roi if roi is not None else (0, 0, largura, altura)
+        w, h = (x1 - x0) // 4, (y1 - y0) // 4
+        caixa = (x0 + (x1 - x0 - w) // 2, y0 + (y1 - y0 - h) // 2, w, h)
+        self.passadas += 1
+        self._resultado = ResultadoDeteccao(id_frame, timestamp if timestamp is not None else time.monotonic(),
+                                            frame.copy(), [(caixa, "person", 1.0)], 0.0, roi, lado)
+
+    def ultimo_resultado(self, idade_maxima=None, id_minimo=None):
+        resultado = self._resultado
+        if resultado is None or (id_minimo is not None and resultado.id_frame < id_minimo):
+            return None
+        if idade_maxima is not None and time.monotonic() - resultado.timestamp > idade_maxima:
+            return None
+        return resultado
+
+    def lados_prontos(self):
+        return [300]
+
+    def latencias_medidas(self):
+        return {}
+
+    def parar(self):
+        pass
+
+
+class PortaNula:
+    # "Porta serial" que aceita tudo: mede o enlace (thread, limite de taxa, codificação) sem Arduino
+    def write(self, dados):
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FonteVideos:
+    # Lê vários arquivos de vídeo em sequência, como se fossem um só
+    def __init__(self, caminhos):
+        self.caminhos = list(caminhos)
+        self.video = None
+        self._abrir_proximo()
+
+    def _abrir_proximo(self):
+        if self.video is not None:
+            self.video.release()
+        self.video = cv2.VideoCapture(self.caminhos.pop(0)) if self.caminhos else None
+
+    def isOpened(self):
+        return self.video is not None and self.video.isOpened()
+
+    def read(self):
+        while self.video is not None:
+            ok, frame = self.video.read()
+            if ok:
+                return ok, frame
+            self._abrir_proximo()
+        return False, None
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Benchmark headless do pipeline Siga-me.")
+    parser.add_argument("--video", nargs="+", help="Arquivos de vídeo a reproduzir.")
+    parser.add_argument("--imagens", default="images", help="Pasta de fotos usadas quando não há --video.")
+    parser.add_argument("--quadros-por-imagem", type=int, default=60)
+    parser.add_argument("--max-quadros", type=int, default=0, help="Para depois de N frames (0 = tudo).")
+    parser.add_argument("--modelo", default=MODELO_PADRAO)
+    parser.add_argument("--config", default=CONFIG_PADRAO)
+    parser.add_argument("--sem-rede", action="store_true",
+                        help="Não carrega o SSD; um detector fixo devolve uma caixa no centro do frame.")
+    parser.add_argument("--sincrono", action="store_true",
+                        help="Roda a rede no próprio frame, em vez da thread do DetectorAssincrono.")
+    parser.add_argument("--intervalo-deteccao", type=int, default=15,
+                        help="Intervalo inicial (frames) da correção de drift durante o rastreamento.")
+    parser.add_argument("--rastreador", default="CSRT", help="CSRT, KCF, MOSSE, MIL ou DETECTOR.")
+    parser.add_argument("--adaptativo", action="store_true",
+                        help="Liga o controle de qualidade (resolução, detector e, por último, backend do tracker).")
+    parser.add_argument("--orcamento", type=float, default=1 / 15, help="Orçamento por frame, em segundos.")
+    parser.add_argument("--intervalo-rastreador", type=int, default=1,
+                        help="Roda o tracker a cada N frames e extrapola a caixa no meio (1 = todo frame).")
+    parser.add_argument("--limiar-movimento", type=float, default=8.0,
+                        help="Deslocamento previsto (px) que força o tracker a rodar antes do intervalo.")
+    parser.add_argument("--largura-rastreio", type=int, default=0,
+                        help="Largura máxima da imagem do tracker sem --adaptativo (0 = resolução cheia).")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Limite de taxa do enlace serial.")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout).")
+    return parser
+
+
+def executar(args):
+    if args.video:
+        fonte = FonteVideos(args.video)
+    else:
+        fonte = FonteImagens(args.imagens, args.quadros_por_imagem)
+    if not fonte.isOpened():
+        raise SystemExit("Nenhuma fonte de vídeo/imagem pôde ser aberta")
+
+    latencias = RegistroLatencias()
+    if args.sem_rede:
+        detector = DetectorFixo()
+    else:
+        labels = carregar_labels()
+        mascara_classes = criar_mascara_classes(labels, OBJETOS_ALVO)
+
+        def extrair_deteccoes(detections, largura, altura):
+            caixas, class_ids, confiancas = pos_processar(
+                detections, largura, altura, mascara_classes, limiar_confianca=0.5)
+            return como_lista(caixas, class_ids, confiancas, labels)
+
+        net = cv2.dnn.readNetFromTensorflow(args.modelo, args.config)
+        classe = DetectorSincrono if args.sincrono else DetectorAssincrono
+        detector = classe(net, extrair_deteccoes, registro=latencias).iniciar()
+
+    ordem = None if args.adaptativo else [args.rastreador]
+    tracker = RastreadorIntercalado(
+        RastreadorEscalado(RastreadorAdaptativo(inicial=args.rastreador, ordem=ordem,
+                                                orcamento_quadro=args.orcamento)),
+        intervalo=args.intervalo_rastreador, limiar_movimento=args.limiar_movimento)
+    qualidade = ControladorQualidade(fps_alvo=1 / args.orcamento, rastreador=tracker) if args.adaptativo else None
+    enlace = EnlaceSerial(PortaNula(), args.baudrate, registro=latencias).iniciar()
+    reidentificacao = Reidentificacao(limiar=0.6)
+    # Mesmos componentes e parâmetros do Versão2.py
+    seguidor = SeguidorAlvo(
+        tracker, detector, AgendadorCorrecao(intervalo_inicial=args.intervalo_deteccao),
+        reaquisicao=Reaquisicao(fatores=(3.0, 5.0, 8.0), quadros_por_degrau=5, quadros_ate_tela_cheia=15),
+        reidentificacao=reidentificacao, movimento=PortaMovimento(idade_maxima=2.0),
+        qualidade=qualidade, enlace=enlace, registro=latencias)
+    tela = ExibicaoEspelhada()
+
+    quadros = 0
+    perdas_alvo = 0
+    selecoes = 0
+    comandos = 0
+
+    inicio = time.perf_counter()
+    while not args.max_quadros or quadros < args.max_quadros:
+        with latencias.medir("captura"):
+            ok, frame = fonte.read()
+        if not ok:
+            break
+        quadros += 1
+        inicio_quadro = time.perf_counter()
+        timestamp = time.monotonic()
+
+        with latencias.medir("flip"):
+            exibicao = tela.preparar(frame)
+        if args.largura_rastreio and qualidade is None:
+            tracker.definir_escala(min(1.0, args.largura_rastreio / frame.shape[1]), frame)
+
+        seguidor.passo(frame, quadros, timestamp)
+        if seguidor.perdido:
+            perdas_alvo += 1
+        if seguidor.comando is not None:
+            comandos += 1
+
+        # O "operador" clica na maior detecção, como faria na janela
+        if seguidor.modo == MODO_DETECCAO and seguidor.deteccoes and not reidentificacao.buscando:
+            (x, y, w, h), _, _ = max(seguidor.deteccoes, key=lambda d: d[0][2] * d[0][3])
+            if seguidor.selecionar(x + w // 2, y + h // 2) is not None:
+                selecoes += 1
+
+        with latencias.medir("desenho"):
+            desenhar_estado(exibicao, seguidor.estado(), qualidade.nivel_overlay if qualidade else 2)
+
+        duracao_quadro = time.perf_counter() - inicio_quadro
+        latencias.registrar("quadro", duracao_quadro)
+        if qualidade is not None:
+            qualidade.registrar(duracao_quadro, frame if seguidor.modo == MODO_RASTREAMENTO else None)
+
+    duracao = time.perf_counter() - inicio
+    fonte.release()
+    detector.parar()
+    enlace.fechar(comando_final=None)
+
+    return {
+        "configuracao": vars(args),
+        "quadros": quadros,
+        "duracao_s": round(duracao, 3),
+        "fps": round(quadros / duracao, 2) if duracao > 0 else 0.0,
+        "chamadas_detector": detector.passadas,
+        "detector_descartados": detector.frames_descartados,
+        "detector_erros": detector.erros,
+        "selecoes_alvo": selecoes,
+        "perdas_alvo": perdas_alvo,
+        "reidentificacoes": reidentificacao.reidentificacoes,
+        "comandos": comandos,
+        "serial": enlace.contadores(),
+        "rastreador_final": tracker.nome,
+        "updates_rastreador": tracker.atualizacoes,
+        "quadros_interpolados": tracker.interpolados,
+        "nivel_qualidade_final": qualidade.nivel if qualidade is not None else None,
+        "etapas": latencias.resumo(),
+    }
+
+
+if __name__ == "__main__":
+    resultado = executar(criar_parser().parse_args())
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if resultado["configuracao"]["saida"]:
+        with open(resultado["configuracao"]["saida"], "w", encoding="utf-8") as fp:
+            fp.write(texto + "\n")
+    else:
+        print(texto)
+# ------------------------------------
@@ -0,0 +1,150 @@
+import copy
+import os
+import sys
+import timeit
+
+# O conversor fica na raiz do projeto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tf_text_graph_ssd import getUnconnectedNodes, removeIdentity, removeUnconnectedNodes  # noqa: E402
+
+# --- MICRO-BENCHMARK: REESCRITA DO GRAFO NO tf_text_graph_ssd.py (ANTIGA x INDEXADA) ---
+# Uso (a partir da pasta raiz do projeto):
+#   python Projeto/benchmark_conversor.py [copias] [repeticoes]
+# Lê o grafo MobileNet-SSD que vem no repositório (models/*.pbtxt) só com nome, op e entradas
+# (não precisa do TensorFlow) e mede a remoção de Identity e a poda de nós desconectados.
+# O .pbtxt já está podado, então "copias" cópias do grafo são penduradas nele sem ligação com a
+# saída, como os ramos de pré/pós-processamento do .pb original que a poda precisa apagar.
+
+CAMINHO_GRAFO = "models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt"
+SAIDA = "detection_out"
+
+
+class No:
+    # O mínimo de um NodeDef que a reescrita usa
+    def __init__(self, name, op, inputs):
+        self.name = name
+        self.op = op
+        self.input = list(inputs)
+
+
+class Grafo:
+    # O mínimo de um GraphDef: uma lista de nós em .node
+    def __init__(self, nos=()):
+        self.node = list(nos)
+
+
+def ler_pbtxt(caminho):
+    # Lê só os campos name/op/input do primeiro nível de cada "node { ... }"
+    nos = []
+    profundidade = 0
+    atual = None
+    with open(caminho, encoding="utf-8") as fp:
+        for linha in fp:
+            linha = linha.strip()
+            if profundidade == 0 and linha == "node {":
+                atual = {"name": None, "op": None, "input": []}
+            elif profundidade == 1 and ":" in linha and not linha.endswith("{"):
+                campo, valor = linha.split(":", 1)
+                valor = valor.strip().strip('"')
+                if campo == "input":
+                    atual["input"].append(valor)
+                elif campo in ("name", "op"):
+                    atual[campo] = valor
+            profundidade += linha.count("{") - linha.count("}")
+            if profundidade == 0 and atual is not None:
+                nos.append(No(atual["name"], atual["op"], atual["input"]))
+                atual = None
+    return Grafo(nos)
+
+
+def ampliar(grafo, copias):
+    # Acrescenta cópias renomeadas do grafo inteiro que não chegam à saída (ramos mortos)
+    nos = list(grafo.node)
+    for c in range(copias):
+        prefixo = f"Morto_{c}/"
+        for no in grafo.node:
+            nos.append(No(prefixo + no.name, no.op, [prefixo + inp for inp in no.input]))
+    return Grafo(nos)
+
+
+# --- Cópias fiéis do código que existia no tf_text_graph_ssd.py ---
+
+def getUnconnectedNodes_original(graph_def):
+    unconnected = []
+    for node in graph_def.node:
+        unconnected.append(node.name)
+        for inp in node.input:
+            if inp in unconnected:
+                unconnected.remove(inp)
+    return unconnected
+
+
+def removeIdentity_original(graph_def):
+    identities = {}
+    for node in graph_def.node:
+        if node.op == 'Identity':
+            identities[node.name] = node.input[0]
+            graph_def.node.remove(node)
+
+    for node in graph_def.node:
+        for i in range(len(node.input)):
+            if node.input[i] in identities:
+                node.input[i] = identities[node.input[i]]
+
+
+def poda_original(graph_def):
+    while True:
+        unconnectedNodes = getUnconnectedNodes_original(graph_def)
+        unconnectedNodes.remove(SAIDA)
+        if not unconnectedNodes:
+            break
+
+        for name in unconnectedNodes:
+            for i in range(len(graph_def.node)):
+                if graph_def.node[i].name == name:
+                    del graph_def.node[i]
+                    break
+
+
+def poda_indexada(graph_def):
+    removeUnconnectedNodes(graph_def, {SAIDA})
+
+
+def medir(funcao, grafo, repeticoes):
+    # Cada repetição recebe uma cópia nova (as funções alteram o grafo); a cópia não entra no tempo
+    copias = [copy.deepcopy(grafo) for _ in range(repeticoes)]
+    return timeit.timeit(lambda: funcao(copias.pop()), number=repeticoes) / repeticoes
+
+
+if __name__ == "__main__":
+    copias = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    grafo = ampliar(ler_pbtxt(CAMINHO_GRAFO), copias)
+    identidades = sum(no.op == "Identity" for no in grafo.node)
+    print(f"Grafo: {len(grafo.node)} nós ({identidades} Identity), {copias} cópias mortas")
+
+    # Confere que as duas podas deixam exatamente os mesmos nós
+    original, indexado = copy.deepcopy(grafo), copy.deepcopy(grafo)
+    poda_original(original)
+    poda_indexada(indexado)
+    assert [no.name for no in original.node] == [no.name for no in indexado.node]
+    assert getUnconnectedNodes(indexado) == [SAIDA]
+    print(f"Nós após a poda: {len(indexado.node)}")
+
+    # A versão antiga removia nós da lista enquanto iterava e pulava Identity seguidos
+    original, indexado = copy.deepcopy(grafo), copy.deepcopy(grafo)
+    removeIdentity_original(original)
+    removeIdentity(indexado)
+    print(f"Identity restantes: antiga {sum(no.op == 'Identity' for no in original.node)}, "
+          f"indexada {sum(no.op == 'Identity' for no in indexado.node)}")
+
+    for nome, antiga, nova in [("Remoção de Identity", removeIdentity_original, removeIdentity),
+                               ("Poda de nós mortos", poda_original, poda_indexada)]:
+        t_antiga = medir(antiga, grafo, repeticoes)
+        t_nova = medir(nova, grafo, repeticoes)
+        print(f"{nome}:")
+        print(f"  Antiga:   {t_antiga * 1e3:10.2f} ms")
+        print(f"  Indexada: {t_nova * 1e3:10.2f} ms")
+        print(f"  Ganho:    {t_antiga / t_nova:10.1f}x")
+# ------------------------------------
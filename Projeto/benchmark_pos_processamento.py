@@ -0,0 +1,69 @@
+import sys
+import timeit
+
+import numpy as np
+
+from pos_processamento import carregar_labels, criar_mascara_classes, pos_processar
+
+# --- MICRO-BENCHMARK: LOOP ORIGINAL x PÓS-PROCESSAMENTO VETORIZADO ---
+# Uso (a partir da pasta do projeto):
+#   python Projeto/benchmark_pos_processamento.py [repeticoes]
+# Gera uma saída sintética (1, 1, 100, 7) parecida com a do SSD e mede as duas versões.
+
+labels = carregar_labels()
+objetos_alvo = ["person", "car", "bottle", "cat", "dog", "cell phone"]
+mascara_classes = criar_mascara_classes(labels, objetos_alvo)
+largura, altura = 1280, 720
+
+
+def loop_original(detections):
+    # Cópia fiel do laço que existia em Versão1.py / Versão2.py
+    deteccoes = []
+    for i in range(detections.shape[2]):
+        confidence = detections[0, 0, i, 2]
+        if confidence > 0.5:
+            class_id = int(detections[0, 0, i, 1])
+            objetos_alvo = ["person", "car",
+                            "bottle", "cat", "dog", "cell phone"]
+            if labels[class_id] in objetos_alvo:
+                x = int(detections[0, 0, i, 3] * largura)
+                y = int(detections[0, 0, i, 4] * altura)
+                w = int(detections[0, 0, i, 5] * largura) - x
+                h = int(detections[0, 0, i, 6] * altura) - y
+                deteccoes.append(((x, y, w, h), labels[class_id], confidence))
+    return deteccoes
+
+
+def vetorizado(detections):
+    return pos_processar(detections, largura, altura, mascara_classes)
+
+
+def gerar_deteccoes(n=100, semente=0):
+    rng = np.random.default_rng(semente)
+    detections = np.zeros((1, 1, n, 7), dtype=np.float32)
+    detections[0, 0, :, 1] = rng.integers(1, 91, n)
+    # A saída real vem ordenada por confiança, com poucas linhas acima de 0.5
+    detections[0, 0, :, 2] = np.sort(rng.random(n) ** 3)[::-1]
+    x1y1 = rng.random((n, 2)) * 0.8
+    detections[0, 0, :, 3:5] = x1y1
+    detections[0, 0, :, 5:7] = x1y1 + rng.random((n, 2)) * 0.2
+    return detections
+
+
+if __name__ == "__main__":
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    detections = gerar_deteccoes()
+
+    # Confere que as duas versões retornam as mesmas caixas
+    caixas, class_ids, confiancas = vetorizado(detections)
+    esperado = loop_original(detections)
+    assert [caixa for caixa, _, _ in esperado] == [tuple(c) for c in caixas.tolist()]
+    assert [label for _, label, _ in esperado] == [labels[c] for c in class_ids]
+
+    t_loop = timeit.timeit(lambda: loop_original(detections), number=repeticoes)
+    t_vet = timeit.timeit(lambda: vetorizado(detections), number=repeticoes)
+    print(f"Detecções aceitas: {len(esperado)} de {detections.shape[2]}")
+    print(f"Loop original: {t_loop / repeticoes * 1e6:8.1f} us/frame")
+    print(f"Vetorizado:    {t_vet / repeticoes * 1e6:8.1f} us/frame")
+    print(f"Ganho:         {t_loop / t_vet:8.1f}x")
+# ------------------------------------
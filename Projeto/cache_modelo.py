@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+# --- CACHE DO GRAFO CONVERTIDO E REDE "AQUECIDA" ---
+# Gerar o .pbtxt com tf_text_graph_ssd.py exige o TensorFlow inteiro e leva vários segundos.
+# Aqui cada grafo de texto fica guardado em models/cache/, com nome dado por um hash do
+# conteúdo do .pb junto com os argumentos do conversor: o mesmo modelo com os mesmos
+# argumentos nunca é convertido duas vezes, e trocar o .pb ou um argumento gera outro arquivo.
+# O hash do .pb (dezenas de MB) também fica guardado, indexado por caminho, tamanho e data de
+# modificação, para que a inicialização não precise reler o arquivo inteiro.
+#
+# Além disso a rede é carregada e roda uma inferência de aquecimento em uma thread
+# (a primeira chamada de net.forward() é bem mais lenta que as outras), enquanto a câmera
+# já abre e o loop começa a mostrar frames.
+
+PASTA_CACHE = "models/cache"
+CONVERSOR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tf_text_graph_ssd.py")
+
+# Os mesmos padrões do tf_text_graph_ssd.py (com eles foi gerado o .pbtxt que vem no repositório)
+ARGUMENTOS_PADRAO = {
+    "num_classes": 90,
+    "min_scale": 0.2,
+    "max_scale": 0.95,
+    "num_layers": 6,
+    "aspect_ratios": [1.0, 2.0, 0.5, 3.0, 0.333],
+    "image_width": 300,
+    "image_height": 300,
+    # Limites do DetectionOutput e lista de classes (None = todas)
+    "nms_threshold": 0.6,
+    "top_k": 100,
+    "keep_top_k": 100,
+    "confidence_threshold": 0.01,
+    "classes": None,
+}
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as fp:
+        for bloco in iter(lambda: fp.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _ler_indice(pasta_cache):
+    try:
+        with open(os.path.join(pasta_cache, "indice.json"), encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_indice(pasta_cache, indice):
+    # Grava em um temporário e renomeia: nunca deixa um índice pela metade
+    caminho = os.path.join(pasta_cache, "indice.json")
+    with open(caminho + ".tmp", "w", encoding="utf-8") as fp:
+        json.dump(indice, fp, indent=2)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def hash_modelo(caminho_pb, pasta_cache=PASTA_CACHE):
+    # Reaproveita o hash calculado antes se o arquivo não mudou (mesmo tamanho e data)
+    info = os.stat(caminho_pb)
+    assinatura = [info.st_size, info.st_mtime_ns]
+    chave = os.path.abspath(caminho_pb)
+    indice = _ler_indice(pasta_cache)
+    registro = indice.get(chave)
+    if registro is not None and registro["assinatura"] == assinatura:
+        return registro["sha256"]
+    sha = hash_arquivo(caminho_pb)
+    os.makedirs(pasta_cache, exist_ok=True)
+    indice[chave] = {"assinatura": assinatura, "sha256": sha}
+    _salvar_indice(pasta_cache, indice)
+    return sha
+
+
+def chave_cache(sha_modelo, argumentos):
+    texto = json.dumps({"modelo": sha_modelo, "argumentos": argumentos}, sort_keys=True)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _converter(caminho_pb, saida, argumentos):
+    # Chama o conversor do OpenCV em outro processo (só ele precisa do TensorFlow)
+    comando = [sys.executable, CONVERSOR, "--input", caminho_pb, "--output", saida]
+    for nome, valor in argumentos.items():
+        if valor is None:
+            continue
+        comando.append("--" + nome)
+        if isinstance(valor, list):
+            comando.extend(str(v) for v in valor)
+        else:
+            comando.append(str(valor))
+    subprocess.run(comando, check=True)
+
+
+def _ler_nos(caminho):
+    # Separa o .pbtxt em blocos "node { ... }" (listas de linhas); cada bloco começa na coluna 0
+    nos = []
+    with open(caminho, encoding="utf-8") as fp:
+        for linha in fp:
+            if linha.startswith("node {") or not nos:
+                nos.append([])
+            nos[-1].append(linha)
+    return nos
+
+
+def _campo(no, campo):
+    # Valor de um campo de primeiro nível do nó (ex: name, op)
+    prefixo = f"  {campo}: "
+    for linha in no:
+        if linha.startswith(prefixo):
+            return linha[len(prefixo):].strip().strip('"')
+    return None
+
+
+def _no_texto(nome, op, entradas=(), valores=None):
+    # Bloco de texto de um nó novo; valores vira um Const float 1D
+    linhas = ["node {\n", f'  name: "{nome}"\n', f'  op: "{op}"\n']
+    linhas += [f'  input: "{entrada}"\n' for entrada in entradas]
+    if valores is not None:
+        linhas += ["  attr {\n", '    key: "value"\n', "    value {\n", "      tensor {\n",
+                   "        dtype: DT_FLOAT\n", "        tensor_shape {\n", "          dim {\n",
+                   f"            size: {len(valores)}\n", "          }\n", "        }\n"]
+        linhas += [f"        float_val: {v!r}\n" for v in valores]
+        linhas += ["      }\n", "    }\n", "  }\n"]
+    return linhas + ["}\n"]
+
+
+def mascara_classes_grafo(num_ancoras, num_classes, classes):
+    # Mesma máscara do classMask() do conversor: um deslocamento por canal da saída do
+    # ClassPredictor (num_ancoras x (num_classes + 1), classe 0 = fundo). As classes fora da lista
+    # ganham um logit muito negativo, o sigmoid delas vira 0 e o DetectionOutput as descarta antes do NMS.
+    manter = set(classes)
+    return [0.0 if c == 0 or c in manter else -1e4
+            for _ in range(num_ancoras) for c in range(num_classes + 1)]
+
+
+# Argumentos que dá para aplicar direto no texto de um .pbtxt pronto, sem TensorFlow
+DERIVAVEIS = {"image_width", "image_height", "nms_threshold", "top_k", "keep_top_k",
+              "confidence_threshold", "classes"}
+# Atributos do DetectionOutput e o tipo do valor no .pbtxt
+ATRIBUTOS_SAIDA = {"nms_threshold": "f", "top_k": "i", "keep_top_k": "i", "confidence_threshold": "f"}
+
+
+def derivar_grafo(pbtxt_base, saida, argumentos, argumentos_base=ARGUMENTOS_PADRAO):
+    # Gera o .pbtxt de "argumentos" a partir de um pronto (gerado com argumentos_base):
+    #   - tamanho da entrada: só os PriorBox mudam (larguras/alturas das âncoras em pixels);
+    #   - top_k, keep_top_k, limiares: atributos do DetectionOutput;
+    #   - classes: um Add com a máscara de classes antes do Flatten de cada ClassPredictor.
+    fatores = {"width": argumentos["image_width"] / argumentos_base["image_width"],
+               "height": argumentos["image_height"] / argumentos_base["image_height"]}
+    nos = _ler_nos(pbtxt_base)
+    ancoras = {}
+    resultado = []
+    for no in nos:
+        op = _campo(no, "op")
+        nome = _campo(no, "name")
+        chave = None
+        if op == "PriorBox":
+            larguras = 0
+            for k, linha in enumerate(no):
+                texto = linha.strip()
+                if texto.startswith("key: "):
+                    chave = texto[len("key: "):].strip('"')
+                elif chave in fatores and texto.startswith("float_val: "):
+                    valor = float(texto[len("float_val: "):]) * fatores[chave]
+                    no[k] = linha[:len(linha) - len(linha.lstrip())] + f"float_val: {valor!r}\n"
+                    larguras += chave == "width"
+            ancoras[nome] = larguras
+        elif op == "DetectionOutput":
+            for k, linha in enumerate(no):
+                texto = linha.strip()
+                if texto.startswith("key: "):
+                    chave = texto[len("key: "):].strip('"')
+                elif chave in ATRIBUTOS_SAIDA and texto.startswith(ATRIBUTOS_SAIDA[chave] + ": "):
+                    no[k] = linha[:len(linha) - len(linha.lstrip())] + \
+                        f"{ATRIBUTOS_SAIDA[chave]}: {argumentos[chave]}\n"
+        resultado.append(no)
+
+    if argumentos.get("classes"):
+        # Os Flatten de cada camada vêm antes dos PriorBox no arquivo: insere depois de ler tudo
+        final = []
+        for no in resultado:
+            nome = _campo(no, "name") or ""
+            if _campo(no, "op") == "Flatten" and "/ClassPredictor/BiasAdd" in nome:
+                entrada = nome[:-len("/Flatten")]
+                camada = nome.split("/")[0].split("_")[-1]
+                num_ancoras = ancoras.get(f"PriorBox_{camada}", 0)
+                mascara = mascara_classes_grafo(num_ancoras, argumentos["num_classes"], argumentos["classes"])
+                final += _no_texto(entrada + "/class_mask", "Const", valores=mascara)
+                final += _no_texto(entrada + "/class_filter", "Add", [entrada, entrada + "/class_mask"])
+                no = [linha.replace(f'input: "{entrada}"', f'input: "{entrada}/class_filter"') for linha in no]
+            final += no
+        resultado = [final]
+
+    with open(saida, "w", encoding="utf-8") as fp:
+        for no in resultado:
+            fp.writelines(no)
+
+
+def texto_grafo(caminho_pb, pasta_cache=PASTA_CACHE, pbtxt_padrao=None, **argumentos):
+    # Caminho de um .pbtxt para o .pb com estes argumentos do conversor, gerando só se preciso.
+    # pbtxt_padrao: um .pbtxt já pronto para os argumentos padrão (ex: o que vem no repositório);
+    # ele entra no cache na primeira vez, e variantes que só mudam tamanho de entrada, limites do
+    # DetectionOutput ou lista de classes são derivadas dele em vez de rodar o conversor.
+    argumentos = dict(ARGUMENTOS_PADRAO, **argumentos)
+    chave = chave_cache(hash_modelo(caminho_pb, pasta_cache), argumentos)
+    caminho = os.path.join(pasta_cache, f"{os.path.splitext(os.path.basename(caminho_pb))[0]}_{chave}.pbtxt")
+    if os.path.exists(caminho):
+        return caminho
+
+    os.makedirs(pasta_cache, exist_ok=True)
+    temporario = caminho + ".tmp"
+    derivavel = all(argumentos[nome] == valor for nome, valor in ARGUMENTOS_PADRAO.items()
+                    if nome not in DERIVAVEIS)
+    if pbtxt_padrao is not None and argumentos == ARGUMENTOS_PADRAO and os.path.exists(pbtxt_padrao):
+        shutil.copyfile(pbtxt_padrao, temporario)
+    elif pbtxt_padrao is not None and derivavel and os.path.exists(pbtxt_padrao):
+        derivar_grafo(pbtxt_padrao, temporario, argumentos)
+    else:
+        print(f"Convertendo {caminho_pb} para texto (só na primeira vez)...")
+        _converter(caminho_pb, temporario, argumentos)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def aquecer(net, tamanho_entrada=(300, 300), passadas=2):
+    # As primeiras passadas alocam buffers e escolhem implementações; as seguintes já saem no tempo normal
+    blob = np.zeros((1, 3, tamanho_entrada[1], tamanho_entrada[0]), dtype=np.float32)
+    for _ in range(passadas):
+        net.setInput(blob)
+        net.forward()
+
+
+def carregar_rede(caminho_pb, caminho_pbtxt, tamanho_entrada=(300, 300), aquecimento=2):
+    inicio = time.perf_counter()
+    net = cv2.dnn.readNetFromTensorflow(caminho_pb, caminho_pbtxt)
+    carregada = time.perf_counter()
+    if aquecimento:
+        aquecer(net, tamanho_entrada, aquecimento)
+    print(f"Rede pronta: leitura {carregada - inicio:.2f} s, "
+          f"aquecimento {time.perf_counter() - carregada:.2f} s")
+    return net
+
+
+def carregar_rede_em_segundo_plano(caminho_pb, caminho_pbtxt, tamanho_entrada=(300, 300), aquecimento=2):
+    # Retorna um Future com a rede; o DetectorAssincrono espera por ele na própria thread
+    lado = tamanho_entrada[0]
+    return carregar_variantes_em_segundo_plano(caminho_pb, {lado: caminho_pbtxt}, aquecimento)[lado]
+
+
+def carregar_variantes_em_segundo_plano(caminho_pb, grafos, aquecimento=2):
+    # grafos: {lado da entrada: caminho do .pbtxt}, na ordem em que devem ficar prontas.
+    # Carrega uma de cada vez na mesma thread, para não disputar CPU com o loop principal;
+    # retorna {lado: Future}.
+    futuros = {lado: Future() for lado in grafos}
+
+    def executar():
+        for lado, caminho_pbtxt in grafos.items():
+            try:
+                futuros[lado].set_result(carregar_rede(caminho_pb, caminho_pbtxt, (lado, lado), aquecimento))
+            except Exception as e:  # cv2.error, arquivo ausente...
+                futuros[lado].set_exception(e)
+
+    threading.Thread(target=executar, daemon=True).start()
+    return futuros
+# ------------------------------------
@@ -0,0 +1,154 @@
+import threading
+import time
+
+from controle import codificar_comando
+
+# --- ENLACE SERIAL NÃO BLOQUEANTE COM O ARDUINO ---
+# O loop de visão só "publica" o comando mais recente; uma thread separada faz o write.
+#   - Só existe um slot: se chega um comando novo antes do anterior sair, o anterior é
+#     descartado ("coalescido"), porque só o mais novo interessa ao servo.
+#   - Comandos iguais ao último enviado não são reenviados ("descartados").
+#   - A taxa de envio é limitada ao que o link aguenta (cada byte custa ~10 bits na serial).
+# Assim uma porta lenta nunca trava o loop de visão.
+#
+# Protocolos:
+#   "texto":   b"ANGULO,LED\n"   (o mesmo de sempre, ex: b"90,M\n")
+#   "binario": 0xA5 ANGULO LED CHECKSUM  (4 bytes; checksum = XOR dos 3 primeiros)
+#              Requer o firmware do Arduino com suporte ao quadro binário.
+
+CABECALHO_BINARIO = 0xA5
+TAMANHO_BINARIO = 4
+
+
+def codificar_binario(angulo, comando_distancia):
+    corpo = bytes((CABECALHO_BINARIO, int(angulo) & 0xFF, ord(comando_distancia) & 0xFF))
+    return corpo + bytes((corpo[0] ^ corpo[1] ^ corpo[2],))
+
+
+def decodificar_binario(dados):
+    # Retorna (angulo, comando_distancia) ou None se o quadro for inválido
+    if len(dados) != TAMANHO_BINARIO or dados[0] != CABECALHO_BINARIO:
+        return None
+    if dados[0] ^ dados[1] ^ dados[2] != dados[3]:
+        return None
+    return dados[1], chr(dados[2])
+
+
+CODIFICADORES = {"texto": codificar_comando, "binario": codificar_binario}
+
+
+class EnlaceSerial:
+    def __init__(self, porta, baudrate=9600, protocolo="texto", intervalo_minimo=None, registro=None):
+        # porta: objeto serial.Serial já aberto (ou qualquer objeto com write/flush/close)
+        self.porta = porta
+        self.baudrate = baudrate
+        self.codificar = CODIFICADORES[protocolo]
+        self.protocolo = protocolo
+        # Tempo mínimo entre dois envios; por padrão o tempo de transmitir um comando de texto completo
+        if intervalo_minimo is None:
+            intervalo_minimo = len(codificar_comando(180, 'M')) * 10 / baudrate
+        self.intervalo_minimo = intervalo_minimo
+        # RegistroLatencias opcional (medicao.py): duração de cada write na porta
+        self.registro = registro
+
+        self._condicao = threading.Condition()
+        self._pendente = None  # (angulo, comando_distancia, timestamp)
+        self._ultimo_enviado = None
+        self._rodando = False
+        self._thread = None
+
+        # Contadores para diagnóstico
+        self.enviados = 0
+        self.coalescidos = 0  # substituídos por um comando mais novo antes de sair
+        self.descartados = 0  # iguais ao último enviado, não precisam sair
+        self.erros = 0
+        self.bytes_enviados = 0
+        self.latencia_ultimo_envio = 0.0  # publicar() -> fim do write, em segundos
+
+    def iniciar(self):
+        self._rodando = True
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        return self
+
+    def publicar(self, angulo, comando_distancia):
+        # Chamado pelo loop de visão; nunca bloqueia na porta serial
+        comando = (int(angulo), comando_distancia)
+        # Cada publicação conta uma vez só: descartada, coalescida (substituiu um pendente) ou enviada
+        with self._condicao:
+            if comando == self._ultimo_enviado:
+                # Já é o que o Arduino tem: nada a enviar (e descarta um pendente diferente e mais velho)
+                self._pendente = None
+                self.descartados += 1
+                return
+            if self._pendente is not None:
+                self.coalescidos += 1
+            self._pendente = comando + (time.perf_counter(),)
+            self._condicao.notify()
+
+    def contadores(self):
+        with self._condicao:
+            return {
+                "enviados": self.enviados,
+                "coalescidos": self.coalescidos,
+                "descartados": self.descartados,
+                "erros": self.erros,
+                "bytes_enviados": self.bytes_enviados,
+            }
+
+    def fechar(self, comando_final=(90, 'M')):
+        # Para a thread e manda um comando final síncrono (servo no centro, LEDs apagados)
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if comando_final is not None:
+            self._escrever(self.codificar(*comando_final))
+        self.porta.close()
+
+    def _executar(self):
+        proximo_envio = 0.0
+        while True:
+            with self._condicao:
+                while self._rodando and self._pendente is None:
+                    self._condicao.wait()
+                if not self._rodando:
+                    return
+                # Respeita o limite de taxa sem segurar o lock: comandos novos continuam
+                # chegando e substituindo o pendente enquanto esperamos
+                espera = proximo_envio - time.perf_counter()
+                if espera > 0:
+                    self._condicao.wait(espera)
+                    continue
+                angulo, comando_distancia, publicado = self._pendente
+                self._pendente = None
+                # Já conta como o estado do Arduino, para publicar() não repetir o comando em voo
+                self._ultimo_enviado = (angulo, comando_distancia)
+
+            dados = self.codificar(angulo, comando_distancia)
+            inicio = time.perf_counter()
+            ok = self._escrever(dados)
+            fim = time.perf_counter()
+            if self.registro is not None:
+                self.registro.registrar("serial", fim - inicio)
+            proximo_envio = fim + self.intervalo_minimo
+
+            with self._condicao:
+                if ok:
+                    self.enviados += 1
+                    self.bytes_enviados += len(dados)
+                    self.latencia_ultimo_envio = fim - publicado
+                else:
+                    self.erros += 1
+                    # Não sabemos o que o Arduino recebeu: o próximo comando sai mesmo que seja igual
+                    self._ultimo_enviado = None
+
+    def _escrever(self, dados):
+        try:
+            self.porta.write(dados)
+            return True
+        except Exception as e:  # serial.SerialException, OSError...
+            print(f"Erro ao enviar para o Arduino: {e}")
+            return False
+# ------------------------------------
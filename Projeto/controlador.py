@@ -0,0 +1,153 @@
+import time
+
+import numpy as np
+
+from controle import (FATOR_CONVERSAO, KP_AREA, KP_POSICAO, THRESHOLD_AREA, ZONA_MORTA,
+                      ComandoControle, distancia_por_velocidade, posicao_por_velocidade)
+
+# --- CONTROLE PREDITIVO (KALMAN + PID) ---
+# A bbox que chega ao controle já tem a idade do frame: captura + tracker/detector + fila.
+# E o comando ainda leva o tempo da serial para chegar ao servo. Com o controle P puro,
+# o servo sempre corre atrás de onde o alvo *estava*.
+# Aqui um filtro de Kalman de velocidade constante acompanha o centro (x) e o tamanho do alvo;
+# a estimativa é extrapolada pela latência medida (idade do frame + atraso de atuação) e
+# o PID age sobre essa posição prevista. O filtro também absorve o ruído da bbox,
+# que no controle P vira tremedeira do servo.
+
+
+class FiltroKalmanVelocidadeConstante:
+    # Estado por eixo: [posição, velocidade]. Os eixos são independentes e compartilham o modelo,
+    # então P fica com forma (eixos, 2, 2) e tudo é feito em lote com NumPy.
+    def __init__(self, eixos=2, aceleracao=1500.0, ruido_medicao=4.0):
+        # aceleracao: desvio da aceleração não modelada (px/s^2); ruido_medicao: desvio da medida (px)
+        self.eixos = eixos
+        self.q = aceleracao ** 2
+        self.r = ruido_medicao ** 2
+        self.x = np.zeros((eixos, 2))
+        self.P = np.zeros((eixos, 2, 2))
+        self.instante = None
+
+    @property
+    def inicializado(self):
+        return self.instante is not None
+
+    def reiniciar(self, medida, instante):
+        self.x[:, 0] = medida
+        self.x[:, 1] = 0.0
+        # Posição conhecida com o erro da medida; velocidade desconhecida
+        self.P[:] = np.diag([self.r, 1e4])
+        self.instante = instante
+
+    def _transicao(self, dt):
+        F = np.array([[1.0, dt], [0.0, 1.0]])
+        # Ruído de aceleração branca (modelo discreto de velocidade constante)
+        Q = self.q * np.array([[dt ** 4 / 4, dt ** 3 / 2], [dt ** 3 / 2, dt ** 2]])
+        return F, Q
+
+    def prever(self, instante):
+        # Avança o estado até "instante" (o filtro guarda o instante da última medida)
+        dt = max(0.0, instante - self.instante)
+        if dt > 0:
+            F, Q = self._transicao(dt)
+            self.x = self.x @ F.T
+            self.P = F @ self.P @ F.T + Q
+            self.instante = instante
+
+    def corrigir(self, medida, instante):
+        if not self.inicializado:
+            self.reiniciar(medida, instante)
+            return
+        self.prever(instante)
+        # Medimos só a posição: H = [1, 0]
+        inovacao = np.asarray(medida, dtype=np.float64) - self.x[:, 0]
+        S = self.P[:, 0, 0] + self.r
+        K = self.P[:, :, 0] / S[:, None]
+        self.x += K * inovacao[:, None]
+        self.P -= K[:, :, None] * self.P[:, None, 0, :]
+
+    def extrapolar(self, horizonte):
+        # Posição e velocidade "horizonte" segundos à frente, sem mexer no estado
+        return self.x[:, 0] + self.x[:, 1] * horizonte, self.x[:, 1]
+
+
+class ControladorPID:
+    def __init__(self, kp, ki=0.0, kd=0.0, limite_integral=None):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        # Anti-windup: limita a contribuição do termo integral
+        self.limite_integral = limite_integral
+        self.integral = 0.0
+
+    def reiniciar(self):
+        self.integral = 0.0
+
+    def atualizar(self, erro, derivada, dt, integrar=True):
+        # A derivada vem pronta do filtro de Kalman (velocidade estimada), em vez de
+        # diferenciar a bbox ruidosa frame a frame.
+        # integrar=False congela o termo integral (ex: erro dentro da zona morta, onde o servo
+        # fica parado e o erro acumulado só viraria um tranco na saída da zona)
+        if self.ki and integrar:
+            self.integral += erro * dt
+            if self.limite_integral is not None:
+                limite = self.limite_integral / self.ki
+                self.integral = max(-limite, min(limite, self.integral))
+        return self.kp * erro + self.ki * self.integral + self.kd * derivada
+
+
+class ControladorPreditivo:
+    # Mesma saída de controle.calcular_comando (ComandoControle), então o resto do loop não muda
+    def __init__(self, kp_posicao=KP_POSICAO, ki_posicao=0.0, kd_posicao=0.0,
+                 fator_conversao=FATOR_CONVERSAO, kp_area=KP_AREA, zona_morta=ZONA_MORTA,
+                 threshold_area=THRESHOLD_AREA, aceleracao=1500.0, ruido_medicao=4.0,
+                 horizonte_maximo=0.5, limite_integral=20.0):
+        self.pid_posicao = ControladorPID(kp_posicao, ki_posicao, kd_posicao, limite_integral)
+        self.kp_area = kp_area
+        self.fator_conversao = fator_conversao
+        self.zona_morta = zona_morta
+        self.threshold_area = threshold_area
+        # Eixo 0: centro x; eixo 1: lado equivalente (raiz da área), que tem a mesma unidade (px)
+        # e varia de forma mais linear que a área quando o alvo se aproxima
+        self.filtro = FiltroKalmanVelocidadeConstante(2, aceleracao, ruido_medicao)
+        # Não extrapola mais que isso (frames muito velhos ou travamentos)
+        self.horizonte_maximo = horizonte_maximo
+        self.ultimo_controle = None
+        self.horizonte = 0.0
+
+    def reiniciar(self):
+        # Chamado ao escolher um novo alvo: o estado do alvo anterior não vale mais
+        self.filtro.instante = None
+        self.pid_posicao.reiniciar()
+        self.ultimo_controle = None
+
+    def calcular(self, bbox, largura, area_referencia, instante_frame, agora=None, atraso_atuacao=0.0):
+        # instante_frame: quando o frame da bbox foi capturado (mesmo relógio de "agora")
+        # atraso_atuacao: tempo estimado até o comando chegar ao servo (ex: latência da serial)
+        if agora is None:
+            agora = time.monotonic()
+        medida = (bbox[0] + bbox[2] / 2, np.sqrt(max(bbox[2] * bbox[3], 0)))
+        self.filtro.corrigir(medida, instante_frame)
+
+        # Prevê onde o alvo estará quando o comando for executado
+        self.horizonte = min(self.horizonte_maximo, max(0.0, agora - instante_frame + atraso_atuacao))
+        (centro_x, lado), (velocidade_x, _) = self.filtro.extrapolar(self.horizonte)
+
+        dt = 0.0 if self.ultimo_controle is None else agora - self.ultimo_controle
+        self.ultimo_controle = agora
+
+        # --- 1. Posição: PID sobre o erro previsto ---
+        erro_posicao = centro_x - largura // 2
+        velocidade_horizontal = self.pid_posicao.atualizar(
+            erro_posicao, velocidade_x, dt, integrar=abs(erro_posicao) > self.zona_morta)
+        angulo, texto_posicao, velocidade_horizontal = posicao_por_velocidade(
+            erro_posicao, velocidade_horizontal, self.fator_conversao, self.zona_morta)
+
+        # --- 2. Distância: área prevista ---
+        area_prevista = max(lado, 0.0) ** 2
+        velocidade_profundidade = - (self.kp_area * (area_prevista - area_referencia))
+        comando_distancia, texto_distancia, velocidade_profundidade = distancia_por_velocidade(
+            area_prevista, area_referencia, velocidade_profundidade, self.threshold_area)
+
+        return ComandoControle(angulo, comando_distancia, texto_posicao, texto_distancia,
+                               velocidade_horizontal, velocidade_profundidade)
+# ------------------------------------
@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+# --- LÓGICA DE CONTROLE PROPORCIONAL (P-Controller) ---
+# Extraída do loop principal de Versão2.py para poder ser usada também pelo benchmark,
+# pelo simulador e pelo replay de voos, sem câmera nem janela.
+
+# Parâmetros padrão (os mesmos que estavam no loop principal)
+KP_POSICAO = 0.1  # ganho proporcional de posição: o quão "agressiva" é a resposta
+ZONA_MORTA = 30  # em pixels; dentro dela o alvo é considerado CENTRALIZADO
+FATOR_CONVERSAO = 4.5  # calibração: graus do servo por unidade de velocidade
+ANGULO_CENTRO = 90
+ANGULO_MIN = 0
+ANGULO_MAX = 180
+KP_AREA = 0.001  # bem menor, pois não queremos que o drone se aproxime/afaste muito rápido
+THRESHOLD_AREA = 0.15  # 15% de margem
+
+# Resultado do controle para um frame.
+# comando_distancia é o caractere enviado ao Arduino: 'F' (afastar), 'A' (aproximar) ou 'M' (manter)
+ComandoControle = namedtuple("ComandoControle", [
+    "angulo", "comando_distancia", "texto_posicao", "texto_distancia",
+    "velocidade_horizontal", "velocidade_profundidade"])
+
+
+def controle_posicao(erro_posicao, kp_posicao=KP_POSICAO, fator_conversao=FATOR_CONVERSAO,
+                     zona_morta=ZONA_MORTA):
+    # Erro negativo = objeto à esquerda, positivo = objeto à direita.
+    # Retorna (angulo do servo, texto, velocidade horizontal)
+    return posicao_por_velocidade(erro_posicao, kp_posicao * erro_posicao, fator_conversao, zona_morta)
+
+
+def posicao_por_velocidade(erro_posicao, velocidade_horizontal, fator_conversao=FATOR_CONVERSAO,
+                           zona_morta=ZONA_MORTA):
+    # Mesma conversão velocidade -> ângulo do controle P, para uma velocidade calculada
+    # por outro controlador (ex: o PID de controlador.py).
+    # O erro só decide a zona morta; o sentido e o tamanho do movimento vêm da velocidade com
+    # sinal, porque no PID os termos I e D podem inverter a saída em relação ao erro.
+    # Velocidade positiva (alvo à direita) = ângulo abaixo do centro.
+    if abs(erro_posicao) <= zona_morta:
+        texto = "CENTRALIZADO"
+        angulo_calculado = ANGULO_CENTRO
+        velocidade_horizontal = 0
+    else:
+        if velocidade_horizontal < 0:
+            texto = f"MOVER ESQUERDA (Vel: {abs(velocidade_horizontal):.1f})"
+        else:
+            texto = f"MOVER DIREITA (Vel: {velocidade_horizontal:.1f})"
+        angulo_calculado = ANGULO_CENTRO - velocidade_horizontal * fator_conversao
+
+    # Garante que o ângulo final esteja sempre dentro dos limites seguros do servo (0-180)
+    angulo = int(max(ANGULO_MIN, min(ANGULO_MAX, angulo_calculado)))
+    return angulo, texto, velocidade_horizontal
+
+
+def controle_distancia(area_atual, area_referencia, kp_area=KP_AREA, threshold_area=THRESHOLD_AREA):
+    # Erro de área: positivo = objeto muito perto, negativo = objeto muito longe.
+    # Retorna (comando serial 'F'/'A'/'M', texto, velocidade de profundidade)
+    erro_area = area_atual - area_referencia
+    # O sinal negativo inverte a ação: se está perto, afasta.
+    return distancia_por_velocidade(area_atual, area_referencia, - (kp_area * erro_area), threshold_area)
+
+
+def distancia_por_velocidade(area_atual, area_referencia, velocidade_profundidade,
+                             threshold_area=THRESHOLD_AREA):
+    # O comando 'F'/'A'/'M' depende só da área; a velocidade vem do controlador usado
+    if area_atual > area_referencia * (1 + threshold_area):
+        return 'F', f"AFASTAR (Vel: {abs(velocidade_profundidade):.1f})", velocidade_profundidade
+    if area_atual < area_referencia * (1 - threshold_area):
+        return 'A', f"APROXIMAR (Vel: {velocidade_profundidade:.1f})", velocidade_profundidade
+    return 'M', "MANTER DISTANCIA", 0
+
+
+def calcular_comando(bbox, largura, area_referencia, kp_posicao=KP_POSICAO,
+                     fator_conversao=FATOR_CONVERSAO, kp_area=KP_AREA):
+    # --- 1. Controle de Posição (Esquerda/Direita) ---
+    centro_frame_x = largura // 2
+    centro_obj_x = int(bbox[0] + bbox[2] / 2)
+    angulo, texto_posicao, velocidade_horizontal = controle_posicao(
+        centro_obj_x - centro_frame_x, kp_posicao, fator_conversao)
+
+    # --- 2. Controle de Distância (Frente/Trás) ---
+    area_atual = bbox[2] * bbox[3]
+    comando_distancia, texto_distancia, velocidade_profundidade = controle_distancia(
+        area_atual, area_referencia, kp_area)
+
+    return ComandoControle(angulo, comando_distancia, texto_posicao, texto_distancia,
+                           velocidade_horizontal, velocidade_profundidade)
+
+
+def codificar_comando(angulo, comando_distancia):
+    # O comando para o Arduino é "ANGULO,COMANDO_LED\n"
+    return f"{angulo},{comando_distancia}\n".encode('utf-8')
+# ------------------------------------
@@ -0,0 +1,146 @@
+from collections import deque
+from math import sqrt
+
+# --- CORREÇÃO DE "DRIFT" AGENDADA PELO DETECTOR ---
+# O CSRT vai acumulando pequenos erros ("drift") e só avisa que perdeu o alvo quando já é tarde.
+# Este agendador pede uma detecção da IA a cada N frames (ou antes, se a caixa do tracker se
+# comportar de forma estranha), compara a detecção com a caixa do tracker por IoU e classe,
+# e só manda reiniciar o tracker quando os dois discordam.
+# N se adapta: cresce enquanto o tracker concorda com a IA e encolhe quando precisa de correção.
+
+# Resultados de avaliar()
+CONCORDA = "concorda"
+CORRIGIR = "corrigir"
+SEM_CORRESPONDENCIA = "sem_correspondencia"
+
+
+def calcular_iou(caixa_a, caixa_b):
+    # IoU (Intersection over Union) entre duas caixas no formato (x, y, w, h)
+    xa, ya, wa, ha = caixa_a
+    xb, yb, wb, hb = caixa_b
+    largura_inter = min(xa + wa, xb + wb) - max(xa, xb)
+    altura_inter = min(ya + ha, yb + hb) - max(ya, yb)
+    if largura_inter <= 0 or altura_inter <= 0:
+        return 0.0
+    intersecao = largura_inter * altura_inter
+    uniao = wa * ha + wb * hb - intersecao
+    return intersecao / uniao if uniao > 0 else 0.0
+
+
+class AgendadorCorrecao:
+    def __init__(self, intervalo_inicial=15, intervalo_min=5, intervalo_max=90,
+                 limiar_concordancia=0.6, limiar_associacao=0.1,
+                 limiar_escala=1.3, limiar_salto=0.5, tamanho_historico=120):
+        # Intervalo (em frames) entre duas correções
+        self.intervalo = intervalo_inicial
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        # IoU acima disso: tracker e IA concordam
+        self.limiar_concordancia = limiar_concordancia
+        # IoU abaixo disso: a detecção não é o nosso alvo (pode ser outro objeto da mesma classe)
+        self.limiar_associacao = limiar_associacao
+        # Variação de área entre frames consecutivos considerada anormal (ex: 1.3 = 30%)
+        self.limiar_escala = limiar_escala
+        # Salto do centro, em frações do tamanho da caixa, considerado anormal
+        self.limiar_salto = limiar_salto
+        # Multiplicador do intervalo, usado pelo controle de qualidade para espaçar as detecções
+        self.fator_intervalo = 1.0
+
+        self.classe_alvo = None
+        self.quadros_desde_envio = 0
+        self.id_enviado = None
+        self.id_avaliado = None
+        self.anormal = False
+        self._bbox_anterior = None
+        # Caixa do tracker em cada frame recente, para comparar com a detecção do mesmo frame
+        self._historico = {}
+        self._ids_historico = deque(maxlen=tamanho_historico)
+
+        # Contadores para diagnóstico
+        self.correcoes = 0
+        self.concordancias = 0
+
+    def reiniciar(self, bbox, classe_alvo):
+        # Chamado quando um novo alvo é selecionado
+        self.classe_alvo = classe_alvo
+        self.quadros_desde_envio = 0
+        self.id_enviado = None
+        self.id_avaliado = None
+        self.anormal = False
+        self._bbox_anterior = tuple(bbox)
+        self._historico.clear()
+        self._ids_historico.clear()
+
+    def registrar(self, id_frame, bbox):
+        # Guarda a caixa do tracker deste frame e retorna True se uma detecção deve ser pedida agora
+        if len(self._ids_historico) == self._ids_historico.maxlen:
+            self._historico.pop(self._ids_historico[0], None)
+        self._ids_historico.append(id_frame)
+        self._historico[id_frame] = tuple(bbox)
+
+        if self._bbox_anterior is not None and self._movimento_anormal(self._bbox_anterior, bbox):
+            self.anormal = True
+        self._bbox_anterior = tuple(bbox)
+
+        self.quadros_desde_envio += 1
+        return self.anormal or self.quadros_desde_envio >= self.intervalo * self.fator_intervalo
+
+    def marcar_enviado(self, id_frame):
+        self.id_enviado = id_frame
+        self.quadros_desde_envio = 0
+        self.anormal = False
+
+    def aguardando(self, resultado):
+        # True se o resultado é a resposta a um pedido nosso que ainda não foi avaliada
+        return (resultado is not None and self.id_enviado is not None
+                and resultado.id_frame >= self.id_enviado
+                and resultado.id_frame != self.id_avaliado)
+
+    def avaliar(self, resultado, bbox_atual):
+        # Compara a detecção com a caixa que o tracker tinha NO MESMO frame da detecção.
+        # Retorna (acao, caixa): caixa é a detecção corrigida para o frame atual quando acao == CORRIGIR.
+        self.id_avaliado = resultado.id_frame
+        bbox_origem = self._historico.get(resultado.id_frame, tuple(bbox_atual))
+
+        melhor_iou = 0.0
+        melhor_caixa = None
+        for caixa, label, confianca in resultado.deteccoes:
+            if label != self.classe_alvo:
+                continue
+            iou = calcular_iou(caixa, bbox_origem)
+            if iou > melhor_iou:
+                melhor_iou = iou
+                melhor_caixa = caixa
+
+        if melhor_caixa is None or melhor_iou < self.limiar_associacao:
+            # A IA não viu o alvo (oclusão, borrão...). Não mexe no tracker, mas confere de novo logo.
+            self.intervalo = max(self.intervalo_min, self.intervalo // 2)
+            return SEM_CORRESPONDENCIA, None
+
+        if melhor_iou >= self.limiar_concordancia:
+            # Tracker estável: pode esperar mais até a próxima correção
+            self.concordancias += 1
+            self.intervalo = min(self.intervalo_max, int(self.intervalo * 1.5) + 1)
+            return CONCORDA, melhor_caixa
+
+        # Discordam: leva a detecção para o frame atual somando o deslocamento que o tracker
+        # fez desde o frame de origem, e pede correções mais frequentes por um tempo.
+        self.correcoes += 1
+        self.intervalo = max(self.intervalo_min, self.intervalo // 2)
+        dx = bbox_atual[0] - bbox_origem[0]
+        dy = bbox_atual[1] - bbox_origem[1]
+        x, y, w, h = melhor_caixa
+        return CORRIGIR, (int(x + dx), int(y + dy), int(w), int(h))
+
+    def _movimento_anormal(self, anterior, atual):
+        area_anterior = anterior[2] * anterior[3]
+        area_atual = atual[2] * atual[3]
+        if area_anterior <= 0 or area_atual <= 0:
+            return True
+        razao = area_atual / area_anterior
+        if razao > self.limiar_escala or razao < 1 / self.limiar_escala:
+            return True
+        dx = (atual[0] + atual[2] / 2) - (anterior[0] + anterior[2] / 2)
+        dy = (atual[1] + atual[3] / 2) - (anterior[1] + anterior[3] / 2)
+        return sqrt(dx * dx + dy * dy) > self.limiar_salto * sqrt(area_anterior)
+# ------------------------------------
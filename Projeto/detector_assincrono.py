@@ -0,0 +1,386 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from quadros import PoolQuadros, preparar_blob
+
+# Resultado de uma passada da rede neural.
+# Guarda o id e o timestamp do frame que originou as detecções, e também uma cópia
+# desse frame, para que o tracker possa ser iniciado exatamente na imagem em que a caixa foi encontrada.
+# No DetectorAssincrono a cópia vem de um anel de buffers (quadros.PoolQuadros): ela vale
+# até o detector receber mais alguns frames, então use-a logo e não a guarde (o SeguidorAlvo
+# copia o frame das detecções que ficam na tela esperando o clique).
+# roi é a região (x0, y0, x1, y1) em que a rede rodou, ou None se foi no frame inteiro.
+# lado é o tamanho (quadrado) da entrada da variante da rede usada.
+ResultadoDeteccao = namedtuple(
+    "ResultadoDeteccao", ["id_frame", "timestamp", "frame", "deteccoes", "duracao", "roi", "lado"])
+
+
+def escolher_lado_entrada(lados, latencias, orcamento, caixa_alvo=None, tamanho_imagem=None,
+                          tamanho_minimo_alvo=40):
+    # Escolhe a variante de entrada da rede (ex: 192, 256 ou 300 pixels).
+    #   - Sem alvo (seleção inicial no frame inteiro): a maior, para achar até objetos pequenos.
+    #   - Com alvo: a menor em que o alvo ainda fica com "tamanho_minimo_alvo" pixels na entrada
+    #     da rede (reaquisição em recortes e correção de drift de alvos grandes ficam bem mais rápidas).
+    # Depois desce enquanto a latência medida (ou estimada pela área da entrada) passar do orçamento.
+    lados = sorted(lados)
+    if not lados:
+        return None
+    if caixa_alvo is None or tamanho_imagem is None:
+        escolhido = len(lados) - 1
+    else:
+        escolhido = len(lados) - 1
+        w, h = caixa_alvo
+        largura, altura = tamanho_imagem
+        for i, lado in enumerate(lados):
+            # blobFromImage estica a imagem para lado x lado
+            if min(w * lado / largura, h * lado / altura) >= tamanho_minimo_alvo:
+                escolhido = i
+                break
+
+    medidos = [(lado, latencias[lado]) for lado in lados if lado in latencias]
+    while escolhido > 0 and medidos:
+        lado = lados[escolhido]
+        if lado in latencias:
+            latencia = latencias[lado]
+        else:
+            # Custo da rede ~ proporcional à área da entrada
+            referencia, latencia_referencia = min(medidos, key=lambda m: abs(m[0] - lado))
+            latencia = latencia_referencia * (lado / referencia) ** 2
+        if latencia <= orcamento:
+            break
+        escolhido -= 1
+    return lados[escolhido]
+
+
+# --- DETECTOR EM SEGUNDO PLANO ---
+# Roda blobFromImage + net.forward() em uma thread separada.
+# O loop principal apenas entrega frames (enviar) e consulta o último resultado pronto
+# (ultimo_resultado), sem nunca esperar pela rede neural.
+# Só existe um "slot" de entrada: se um frame novo chega enquanto a rede ainda está ocupada,
+# o frame pendente mais antigo é descartado (não faz sentido detectar em imagens velhas).
+#
+# net pode ser a rede já carregada ou um Future que a entrega (cache_modelo.carregar_rede_em_segundo_plano):
+# nesse caso a thread espera a rede ficar pronta e os frames enviados até lá ficam no slot.
+# Também pode ser um dict {lado da entrada: rede ou Future} com variantes da mesma rede em tamanhos
+# de entrada diferentes; enviar(..., lado=...) escolhe qual usar (ver escolher_lado_entrada).
+class DetectorAssincrono:
+    def __init__(self, net, pos_processamento, tamanho_entrada=(300, 300), suavizacao=0.2, registro=None):
+        if not isinstance(net, dict):
+            net = {tamanho_entrada[0]: net}
+        self.redes = dict(net)
+        # Variante usada quando enviar() não pede um lado
+        self.lado_padrao = tamanho_entrada[0] if tamanho_entrada[0] in self.redes else max(self.redes)
+        # função (detections, largura, altura) -> lista de (caixa, label, confianca)
+        self.pos_processamento = pos_processamento
+        # Latência média de cada variante (média móvel exponencial, em segundos)
+        self.latencias = {}
+        self.suavizacao = suavizacao
+        # RegistroLatencias opcional (medicao.py): tempo de blob, forward e pós-processamento
+        self.registro = registro
+        # Cópias dos frames enviados e blobs de entrada, alocados uma vez e reaproveitados.
+        # O anel tem folga para o pendente, o que está na rede e os últimos resultados.
+        self._copias = PoolQuadros(tamanho=5)
+        self._blobs = {}
+
+        self._condicao = threading.Condition()
+        self._pendente = None  # (id_frame, timestamp, frame, roi, lado) esperando a rede
+        self._resultado = None  # último ResultadoDeteccao pronto
+        self._ocupado = False
+        self._rodando = False
+        self._thread = None
+
+        # Contadores para diagnóstico
+        self.passadas = 0
+        self.frames_descartados = 0
+        self.erros = 0  # passadas que falharam (ex: recorte vazio, erro da DNN)
+
+    def iniciar(self):
+        self._rodando = True
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def pronto(self, lado=None):
+        # A rede já foi carregada (sempre True se ela foi passada pronta)
+        net = self.redes.get(self.lado_padrao if lado is None else lado)
+        return net is not None and (not hasattr(net, "result") or (net.done() and net.exception() is None))
+
+    def lados_prontos(self):
+        return [lado for lado in list(self.redes) if self.pronto(lado)]
+
+    def latencias_medidas(self):
+        with self._condicao:
+            return dict(self.latencias)
+
+    def ocupado(self):
+        with self._condicao:
+            return self._ocupado or self._pendente is not None
+
+    def enviar(self, frame, id_frame, timestamp=None, roi=None, lado=None):
+        # roi (x0, y0, x1, y1): roda a rede só nesse recorte; as caixas voltam em coordenadas do frame
+        # lado: variante de entrada da rede (None = lado_padrao)
+        if timestamp is None:
+            timestamp = time.monotonic()
+        # Copia o frame: o buffer de captura do loop principal é reescrito no próximo read()
+        copia = self._copias.copiar(frame)
+        with self._condicao:
+            if self._pendente is not None:
+                self.frames_descartados += 1
+            self._pendente = (id_frame, timestamp, copia, roi, lado or self.lado_padrao)
+            self._condicao.notify()
+
+    def ultimo_resultado(self, idade_maxima=None, id_minimo=None):
+        # Retorna o último resultado, ou None se ele for velho demais (resultado "stale")
+        with self._condicao:
+            resultado = self._resultado
+        if resultado is None:
+            return None
+        if id_minimo is not None and resultado.id_frame < id_minimo:
+            return None
+        if idade_maxima is not None and time.monotonic() - resultado.timestamp > idade_maxima:
+            return None
+        return resultado
+
+    def limpar(self):
+        # Esquece o pendente e o último resultado (ex: ao trocar de modo)
+        with self._condicao:
+            self._pendente = None
+            self._resultado = None
+
+    def _rede(self, lado):
+        # Espera a variante ficar pronta (só na primeira vez); se ela falhou, usa a padrão
+        net = self.redes.get(lado)
+        if hasattr(net, "result"):
+            try:
+                net = self.redes[lado] = net.result()
+            except Exception as e:
+                print(f"Erro ao carregar a rede neural ({lado}x{lado}): {e}")
+                del self.redes[lado]
+                net = None
+        if net is None and lado != self.lado_padrao and self.lado_padrao in self.redes:
+            return self._rede(self.lado_padrao)
+        return net, lado
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while self._rodando and self._pendente is None:
+                    self._condicao.wait()
+                if not self._rodando:
+                    return
+                id_frame, timestamp, frame, roi, lado = self._pendente
+                self._pendente = None
+                self._ocupado = True
+
+            self._passada(id_frame, timestamp, frame, roi, lado)
+
+    def _passada(self, id_frame, timestamp, frame, roi, lado):
+        # Um erro em uma passada não pode matar a thread: _ocupado ficaria True para sempre e
+        # o loop principal nunca mais pediria uma detecção, sem nenhum aviso
+        resultado = None
+        try:
+            net, lado = self._rede(lado)
+            if net is not None:
+                resultado = self._detectar(net, lado, id_frame, timestamp, frame, roi)
+        except Exception as e:
+            print(f"Erro na detecção do frame {id_frame}: {e!r}")
+            with self._condicao:
+                self.erros += 1
+        finally:
+            with self._condicao:
+                self._ocupado = False
+        if resultado is None:
+            return
+
+        with self._condicao:
+            self.passadas += 1
+            media = self.latencias.get(lado)
+            duracao = resultado.duracao
+            self.latencias[lado] = duracao if media is None else media + self.suavizacao * (duracao - media)
+            # Um resultado nunca substitui outro mais novo
+            if self._resultado is None or self._resultado.id_frame < id_frame:
+                self._resultado = resultado
+
+    def _detectar(self, net, lado, id_frame, timestamp, frame, roi):
+        inicio = time.perf_counter()
+        if roi is None:
+            imagem = frame
+            x0, y0 = 0, 0
+        else:
+            x0, y0, x1, y1 = roi
+            imagem = frame[y0:y1, x0:x1]
+        altura, largura = imagem.shape[:2]
+        blob = preparar_blob(imagem, lado, self._blobs)
+        fim_blob = time.perf_counter()
+        net.setInput(blob)
+        detections = net.forward()
+        fim_forward = time.perf_counter()
+        deteccoes = self.pos_processamento(detections, largura, altura)
+        if self.registro is not None:
+            self.registro.registrar("blob", fim_blob - inicio)
+            self.registro.registrar("forward", fim_forward - fim_blob)
+            self.registro.registrar("pos_processamento", time.perf_counter() - fim_forward)
+        if roi is not None:
+            # Leva as caixas do recorte de volta para as coordenadas do frame
+            deteccoes = [((x + x0, y + y0, w, h), label, confianca)
+                         for (x, y, w, h), label, confianca in deteccoes]
+        duracao = time.perf_counter() - inicio
+        return ResultadoDeteccao(id_frame, timestamp, frame, deteccoes, duracao, roi, lado)
+
+
+# --- DETECTOR SÍNCRONO (BENCHMARK) ---
+# Mesma interface e mesma passada do DetectorAssincrono, mas enviar() roda a rede na hora, na
+# thread de quem chamou: o resultado fica pronto antes do próximo frame e o tempo da rede entra
+# no tempo do frame. Serve para medições reprodutíveis (benchmark.py); o loop ao vivo usa o assíncrono.
+class DetectorSincrono(DetectorAssincrono):
+    def iniciar(self):
+        return self
+
+    def parar(self):
+        pass
+
+    def enviar(self, frame, id_frame, timestamp=None, roi=None, lado=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self._passada(id_frame, timestamp, self._copias.copiar(frame), roi, lado or self.lado_padrao)
+
+
+# --- DETECTOR EM LOTE PARA VÁRIAS CÂMERAS ---
+# Uma rede só para N fluxos: os frames pendentes de todos os fluxos viram um único lote
+# (blobFromImages) e passam por um único net.forward(). A saída do DetectionOutput traz na
+# coluna 0 o índice da imagem no lote, usado para devolver as detecções ao fluxo certo.
+# Cada fluxo tem o seu slot (um frame novo substitui o pendente do mesmo fluxo).
+class DetectorEmLote:
+    def __init__(self, net, pos_processamento, lado=300):
+        self.net = net
+        # função (detections, largura, altura) -> lista de (caixa, label, confianca)
+        self.pos_processamento = pos_processamento
+        self.lado = lado
+
+        self._condicao = threading.Condition()
+        self._pendentes = {}  # fluxo -> (id_frame, timestamp, frame, roi)
+        self._em_execucao = set()
+        self._resultados = {}  # fluxo -> último ResultadoDeteccao
+        self._rodando = False
+        self._thread = None
+
+        # Contadores para diagnóstico
+        self.lotes = 0
+        self.imagens = 0
+        self.frames_descartados = 0
+        self.erros = 0  # lotes que falharam
+
+    def iniciar(self):
+        self._rodando = True
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        with self._condicao:
+            self._rodando = False
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def ocupado(self, fluxo):
+        with self._condicao:
+            return fluxo in self._pendentes or fluxo in self._em_execucao
+
+    def enviar(self, pedidos):
+        # pedidos: {fluxo: (frame, id_frame, timestamp, roi)}; todos entram no mesmo lote.
+        # roi (x0, y0, x1, y1) ou None, como no DetectorAssincrono
+        copias = {fluxo: (id_frame, timestamp, frame.copy(), roi)
+                  for fluxo, (frame, id_frame, timestamp, roi) in pedidos.items()}
+        if not copias:
+            return
+        with self._condicao:
+            for fluxo, pedido in copias.items():
+                if fluxo in self._pendentes:
+                    self.frames_descartados += 1
+                self._pendentes[fluxo] = pedido
+            self._condicao.notify()
+
+    def ultimo_resultado(self, fluxo, idade_maxima=None, id_minimo=None):
+        with self._condicao:
+            resultado = self._resultados.get(fluxo)
+        if resultado is None:
+            return None
+        if id_minimo is not None and resultado.id_frame < id_minimo:
+            return None
+        if idade_maxima is not None and time.monotonic() - resultado.timestamp > idade_maxima:
+            return None
+        return resultado
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while self._rodando and not self._pendentes:
+                    self._condicao.wait()
+                if not self._rodando:
+                    return
+                lote = list(self._pendentes.items())
+                self._pendentes = {}
+                self._em_execucao = {fluxo for fluxo, _ in lote}
+
+            # Como no DetectorAssincrono: um lote com erro é descartado e a thread continua
+            # (senão ocupado() ficaria True para esses fluxos para sempre)
+            resultados = {}
+            try:
+                resultados = self._detectar_lote(lote)
+            except Exception as e:
+                print(f"Erro na detecção em lote ({len(lote)} imagens): {e!r}")
+                with self._condicao:
+                    self.erros += 1
+            finally:
+                with self._condicao:
+                    self._em_execucao = set()
+
+            if not resultados:
+                continue
+            with self._condicao:
+                self.lotes += 1
+                self.imagens += len(lote)
+                for fluxo, resultado in resultados.items():
+                    anterior = self._resultados.get(fluxo)
+                    if anterior is None or anterior.id_frame < resultado.id_frame:
+                        self._resultados[fluxo] = resultado
+
+    def _detectar_lote(self, lote):
+        inicio = time.perf_counter()
+        # Cada imagem do lote pode ser o frame inteiro ou um recorte (reaquisição);
+        # blobFromImages estica todas para lado x lado
+        imagens = [frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]
+                   for _, (_, _, frame, roi) in lote]
+        blob = cv2.dnn.blobFromImages(imagens, 1.0, size=(self.lado, self.lado),
+                                      mean=(0, 0, 0), swapRB=True, crop=False)
+        self.net.setInput(blob)
+        detections = self.net.forward()
+        duracao = time.perf_counter() - inicio
+
+        resultados = {}
+        indices_imagem = detections[0, 0, :, 0]
+        for indice, (fluxo, (id_frame, timestamp, frame, roi)) in enumerate(lote):
+            # Linhas desta imagem, no mesmo formato (1, 1, N, 7) de uma passada individual
+            linhas = detections[:, :, indices_imagem == indice, :]
+            altura, largura = imagens[indice].shape[:2]
+            deteccoes = self.pos_processamento(linhas, largura, altura)
+            if roi is not None:
+                # Leva as caixas do recorte de volta para as coordenadas do frame
+                x0, y0 = roi[0], roi[1]
+                deteccoes = [((x + x0, y + y0, w, h), label, confianca)
+                             for (x, y, w, h), label, confianca in deteccoes]
+            resultados[fluxo] = ResultadoDeteccao(
+                id_frame, timestamp, frame, deteccoes, duracao, roi, self.lado)
+        return resultados
+# ------------------------------------
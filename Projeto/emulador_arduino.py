@@ -0,0 +1,129 @@
+import os
+import select
+import threading
+import time
+import tty
+
+from comunicacao_serial import CABECALHO_BINARIO, TAMANHO_BINARIO, decodificar_binario
+
+# --- EMULADOR DO ARDUINO EM UM PSEUDO-TERMINAL (pty) ---
+# Cria um par de pty: o lado "escravo" se comporta como a porta serial do Arduino
+# (ex: /dev/pts/5, pode ser aberto com serial.Serial) e o lado "mestre" é lido por este emulador.
+# O emulador entende o mesmo protocolo do firmware ("ANGULO,LED\n" ou o quadro binário),
+# atrasa cada comando pelo tempo de transmissão no baud rate configurado e modela
+# a velocidade máxima do servo (um SG90 leva ~0.1 s para girar 60 graus).
+# Só funciona em sistemas com pty (Linux/macOS).
+
+
+class EmuladorArduino:
+    def __init__(self, baudrate=9600, velocidade_servo=600.0, angulo_inicial=90, protocolo="texto"):
+        self.baudrate = baudrate
+        # Velocidade máxima do servo, em graus por segundo
+        self.velocidade_servo = velocidade_servo
+        self.protocolo = protocolo
+
+        self._mestre, self._escravo = os.openpty()
+        # Modo "raw": sem eco e sem processamento de linha, como uma serial de verdade
+        tty.setraw(self._escravo)
+        self.caminho = os.ttyname(self._escravo)
+
+        self._lock = threading.Lock()
+        self._angulo = float(angulo_inicial)
+        self._angulo_alvo = float(angulo_inicial)
+        self._instante = time.perf_counter()
+        self.led = 'M'
+        # (instante de chegada, angulo, led) de cada comando recebido
+        self.recebidos = []
+        self.invalidos = 0
+
+        self._rodando = False
+        self._thread = None
+
+    def iniciar(self):
+        self._rodando = True
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._rodando = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        os.close(self._mestre)
+        os.close(self._escravo)
+
+    def angulo(self, agora=None):
+        # Posição atual do servo: anda em direção ao alvo na velocidade máxima
+        with self._lock:
+            return self._atualizar_servo(time.perf_counter() if agora is None else agora)
+
+    def _atualizar_servo(self, agora):
+        decorrido = max(0.0, agora - self._instante)
+        passo = self.velocidade_servo * decorrido
+        diferenca = self._angulo_alvo - self._angulo
+        if abs(diferenca) <= passo:
+            self._angulo = self._angulo_alvo
+        else:
+            self._angulo += passo if diferenca > 0 else -passo
+        self._instante = agora
+        return self._angulo
+
+    def _aplicar(self, angulo, led, chegada):
+        with self._lock:
+            self._atualizar_servo(chegada)
+            # Como no firmware, o ângulo é limitado a 0-180
+            self._angulo_alvo = float(max(0, min(180, angulo)))
+            self.led = led
+            self.recebidos.append((chegada, angulo, led))
+
+    def _executar(self):
+        buffer = b""
+        fim_ultima_chegada = 0.0
+        while self._rodando:
+            prontos, _, _ = select.select([self._mestre], [], [], 0.05)
+            if not prontos:
+                continue
+            try:
+                dados = os.read(self._mestre, 256)
+            except OSError:
+                return
+            # Os bytes só "chegam" ao Arduino depois do tempo de transmissão (~10 bits por byte)
+            agora = time.perf_counter()
+            chegada = max(agora, fim_ultima_chegada) + len(dados) * 10 / self.baudrate
+            fim_ultima_chegada = chegada
+            espera = chegada - agora
+            if espera > 0:
+                time.sleep(espera)
+
+            buffer += dados
+            if self.protocolo == "binario":
+                buffer = self._processar_binario(buffer, chegada)
+            else:
+                buffer = self._processar_texto(buffer, chegada)
+
+    def _processar_texto(self, buffer, chegada):
+        *linhas, resto = buffer.split(b"\n")
+        for linha in linhas:
+            try:
+                angulo, led = linha.decode('utf-8').strip().split(",")
+                self._aplicar(int(angulo), led, chegada)
+            except ValueError:
+                self.invalidos += 1
+        return resto
+
+    def _processar_binario(self, buffer, chegada):
+        while len(buffer) >= TAMANHO_BINARIO:
+            if buffer[0] != CABECALHO_BINARIO:
+                # Ressincroniza procurando o próximo cabeçalho
+                buffer = buffer[1:]
+                self.invalidos += 1
+                continue
+            comando = decodificar_binario(buffer[:TAMANHO_BINARIO])
+            if comando is None:
+                buffer = buffer[1:]
+                self.invalidos += 1
+                continue
+            self._aplicar(comando[0], comando[1], chegada)
+            buffer = buffer[TAMANHO_BINARIO:]
+        return buffer
+# ------------------------------------
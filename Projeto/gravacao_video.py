@@ -0,0 +1,179 @@
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# --- GRAVAÇÃO DO VÍDEO ANOTADO EM SEGUNDO PLANO ---
+# Um cv2.VideoWriter.write() no loop principal poria a codificação (e o disco) no caminho
+# crítico do controle. Aqui o loop só "adiciona" o frame já desenhado (caixa, comando): ele é
+# copiado (ou reduzido) para um buffer livre e entra em uma fila curta; uma thread separada
+# codifica e grava.
+#   - A fila tem tamanho fixo: se o codificador não acompanha, o frame mais velho é descartado
+#     (e contado) para o mais novo entrar. adicionar() nunca espera pelo disco nem pelo codificador.
+#   - fps_gravacao grava menos frames por segundo que a câmera (os do meio são "pulados", não
+#     descartados); escala grava em resolução menor, com o resize feito direto no buffer da fila.
+#   - O fps do cabeçalho do arquivo é o ritmo medido do loop (limitado a fps_gravacao): o loop
+#     roda mais devagar que a câmera, então CAP_PROP_FPS faria o vídeo tocar rápido demais. Por
+#     isso o arquivo só é aberto quando a fila enche pela primeira vez. Se o ritmo do loop mudar muito
+#     durante o voo, o vídeo toca no ritmo do começo.
+#   - Os buffers (tamanho_fila + 1, o que está sendo codificado) são alocados uma vez e
+#     reaproveitados: quem sai da fila, gravado ou descartado, volta para a lista de livres.
+# Só um produtor (o loop principal) chama adicionar().
+
+
+class GravadorVideo:
+    def __init__(self, caminho, fps=None, fps_gravacao=None, escala=1.0, tamanho_fila=8,
+                 fourcc="MJPG", registro=None):
+        self.caminho = caminho
+        # fps: o do cabeçalho do arquivo; None = medido no ritmo do loop (ver acima)
+        self.fps_fixo = fps
+        self.fps = None  # o que foi escrito no cabeçalho
+        self.fps_gravacao = fps_gravacao
+        self.intervalo_minimo = 1.0 / fps_gravacao if fps_gravacao else 0.0
+        self.escala = escala
+        self.tamanho_fila = tamanho_fila
+        self.fourcc = fourcc
+        # RegistroLatencias opcional (medicao.py): duração de cada write no arquivo
+        self.registro = registro
+
+        self._condicao = threading.Condition()
+        self._fila = collections.deque()
+        self._livres = []
+        self._tamanho = None  # (largura, altura) gravado, definido pelo primeiro frame
+        self._proximo_instante = None  # a partir de quando o próximo frame pode ser aceito
+        self._primeiro_recebido = None  # para medir o ritmo do loop
+        self._ultimo_recebido = None
+        self._escritor = None
+        self._rodando = False
+        self._thread = None
+
+        # Contadores para diagnóstico
+        self.recebidos = 0
+        self.gravados = 0
+        self.descartados = 0  # saíram da fila cheia sem serem gravados
+        self.pulados = 0  # fora do fps_gravacao
+        self.erros = 0
+
+    def iniciar(self):
+        self._rodando = True
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        return self
+
+    def adicionar(self, frame, instante=None):
+        # Chamado pelo loop principal depois dos desenhos; retorna False se o frame foi pulado
+        if instante is None:
+            instante = time.monotonic()
+        with self._condicao:
+            self.recebidos += 1
+            if self._primeiro_recebido is None:
+                self._primeiro_recebido = instante
+            self._ultimo_recebido = instante
+            if self._proximo_instante is not None and instante < self._proximo_instante:
+                self.pulados += 1
+                return False
+            # A agenda avança de intervalo em intervalo (e não a partir do frame aceito), senão cada
+            # frame aceito atrasaria o próximo e a taxa real ficaria bem abaixo de fps_gravacao.
+            # Depois de um buraco (loop travado) ela é realinhada, sem rajada para "recuperar".
+            if self._proximo_instante is None or instante - self._proximo_instante >= self.intervalo_minimo:
+                self._proximo_instante = instante
+            self._proximo_instante += self.intervalo_minimo
+            if self._tamanho is None:
+                altura, largura = frame.shape[:2]
+                self._tamanho = (max(1, int(largura * self.escala)), max(1, int(altura * self.escala)))
+            if len(self._fila) >= self.tamanho_fila:
+                # Fila cheia: o frame mais velho sai e o buffer dele recebe o novo
+                buffer, _ = self._fila.popleft()
+                self.descartados += 1
+            elif self._livres:
+                buffer = self._livres.pop()
+            else:
+                largura, altura = self._tamanho
+                buffer = np.empty((altura, largura) + frame.shape[2:], dtype=frame.dtype)
+
+        # A cópia (ou redução) acontece fora do lock: o buffer não está nem na fila nem com a thread
+        if buffer.shape[:2] == frame.shape[:2]:
+            np.copyto(buffer, frame)
+        else:
+            cv2.resize(frame, self._tamanho, dst=buffer, interpolation=cv2.INTER_AREA)
+
+        with self._condicao:
+            self._fila.append((buffer, instante))
+            self._condicao.notify()
+        return True
+
+    def contadores(self):
+        with self._condicao:
+            return {
+                "recebidos": self.recebidos,
+                "gravados": self.gravados,
+                "descartados": self.descartados,
+                "pulados": self.pulados,
+                "erros": self.erros,
+                "na_fila": len(self._fila),
+                "fps_arquivo": None if self.fps is None else round(self.fps, 2),
+            }
+
+    def fechar(self, esvaziar=True):
+        # Para a thread; com esvaziar=True os frames que ainda estão na fila são gravados antes
+        with self._condicao:
+            if not esvaziar:
+                self.descartados += len(self._fila)
+                self._livres.extend(buffer for buffer, _ in self._fila)
+                self._fila.clear()
+            self._rodando = False
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._escritor is not None:
+            self._escritor.release()
+            self._escritor = None
+
+    def _medir_fps(self):
+        # Chamado com o lock: ritmo de chegada dos frames (o do loop), limitado a fps_gravacao
+        if self.fps_fixo:
+            return self.fps_fixo
+        if self.recebidos >= 2 and self._ultimo_recebido > self._primeiro_recebido:
+            fps = (self.recebidos - 1) / (self._ultimo_recebido - self._primeiro_recebido)
+            return min(fps, self.fps_gravacao) if self.fps_gravacao else fps
+        # Vídeo curto demais para medir (fechado antes de encher a fila)
+        return self.fps_gravacao or 30.0
+
+    def _abrir_escritor(self):
+        self._escritor = cv2.VideoWriter(self.caminho, cv2.VideoWriter_fourcc(*self.fourcc),
+                                         self.fps, self._tamanho)
+        if not self._escritor.isOpened():
+            print(f"Gravação de vídeo desativada: não foi possível abrir {self.caminho}")
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                # Antes de abrir o arquivo, espera a fila encher para medir o fps
+                while self._rodando and (not self._fila or (
+                        self._escritor is None and len(self._fila) < self.tamanho_fila)):
+                    self._condicao.wait()
+                if not self._fila:
+                    return
+                if self._escritor is None:
+                    self.fps = self._medir_fps()
+                buffer, _ = self._fila.popleft()
+
+            # Abre o arquivo aqui (e não no construtor) porque o tamanho e o fps vêm dos frames
+            if self._escritor is None:
+                self._abrir_escritor()
+            inicio = time.perf_counter()
+            ok = self._escritor.isOpened()
+            if ok:
+                self._escritor.write(buffer)
+            if self.registro is not None:
+                self.registro.registrar("gravacao", time.perf_counter() - inicio)
+
+            with self._condicao:
+                if ok:
+                    self.gravados += 1
+                else:
+                    self.erros += 1
+                self._livres.append(buffer)
+# ------------------------------------
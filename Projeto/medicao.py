@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+
+# --- MEDIÇÃO DE LATÊNCIA POR ETAPA ---
+# Cada etapa do pipeline (captura, flip, detecção, rastreamento, controle, serial...) guarda
+# suas últimas durações em um buffer circular de tamanho fixo: registrar é O(1) e não aloca memória,
+# e os percentis são calculados só quando alguém pede o resumo.
+# Cada etapa deve ser registrada por uma única thread; o resumo pode ser lido de outra
+# (ex: metricas.py) e no pior caso mistura uma medida a mais ou a menos.
+
+# Faixas do histograma, em milissegundos
+LIMITES_HISTOGRAMA_MS = (1, 2, 5, 10, 20, 33, 50, 100, 200, 500)
+
+
+class BufferLatencias:
+    def __init__(self, capacidade=4096):
+        self.valores = np.zeros(capacidade, dtype=np.float64)
+        self.total = 0  # quantas medidas já foram registradas (inclusive as sobrescritas)
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, duracao):
+        self.valores[self.total % len(self.valores)] = duracao
+        self.total += 1
+        self.soma += duracao
+        if duracao > self.maximo:
+            self.maximo = duracao
+
+    def recentes(self):
+        return self.valores[:min(self.total, len(self.valores))]
+
+    def resumo(self):
+        # Durações em milissegundos. Média, percentis e máximo são das "janela" medidas mais
+        # recentes (as que estão no buffer); "n" e os campos "_total" cobrem a execução inteira.
+        if self.total == 0:
+            return {"n": 0, "janela": 0}
+        recentes = self.recentes()
+        p50, p95, p99 = np.percentile(recentes, [50, 95, 99]) * 1000
+        return {
+            "n": self.total,
+            "janela": len(recentes),
+            "media_ms": round(float(recentes.mean()) * 1000, 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(recentes.max()) * 1000, 3),
+            "media_total_ms": round(self.soma / self.total * 1000, 3),
+            "max_total_ms": round(self.maximo * 1000, 3),
+        }
+
+    def histograma(self, limites_ms=LIMITES_HISTOGRAMA_MS):
+        # Quantas das medidas recentes caem em cada faixa: [0, l0), [l0, l1), ..., [l_n, inf)
+        bordas = np.concatenate(([0.0], np.asarray(limites_ms, dtype=np.float64) / 1000, [np.inf]))
+        contagens, _ = np.histogram(self.recentes(), bordas)
+        return contagens.tolist()
+
+
+class _Medida:
+    # Context manager de medir(); uma classe simples sai mais barata que @contextmanager
+    __slots__ = ("buffer", "inicio")
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self.buffer.registrar(time.perf_counter() - self.inicio)
+        return False
+
+
+class RegistroLatencias:
+    def __init__(self, capacidade=4096):
+        self.capacidade = capacidade
+        self.etapas = {}
+
+    def buffer(self, etapa):
+        buffer = self.etapas.get(etapa)
+        if buffer is None:
+            buffer = self.etapas[etapa] = BufferLatencias(self.capacidade)
+        return buffer
+
+    def registrar(self, etapa, duracao):
+        self.buffer(etapa).registrar(duracao)
+
+    def medir(self, etapa):
+        # Uso: with latencias.medir("rastreamento"): ...
+        return _Medida(self.buffer(etapa))
+
+    def resumo(self):
+        # list(): outra thread pode criar uma etapa nova durante a leitura
+        return {etapa: buffer.resumo() for etapa, buffer in list(self.etapas.items())}
+
+    def histogramas(self, limites_ms=LIMITES_HISTOGRAMA_MS):
+        return {etapa: buffer.histograma(limites_ms) for etapa, buffer in list(self.etapas.items())}
+# ------------------------------------
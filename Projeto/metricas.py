@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from medicao import LIMITES_HISTOGRAMA_MS
+
+# --- MÉTRICAS AO VIVO ---
+# Publica o RegistroLatencias do loop (percentis e histograma de cada etapa: captura, flip,
+# blob, forward, rastreamento, controle, serial...) sem mexer no loop: o JSON é montado só
+# quando alguém pede, em outra thread.
+#   - ServidorMetricas: HTTP local, ex: curl http://127.0.0.1:8765/metricas
+#   - ArquivoMetricas: sem rede/tela, reescreve um arquivo JSON a cada N segundos
+# "extras" é um dict {nome: função sem argumentos} com outros contadores (serial, tracker, ...).
+
+
+def coletar(latencias, extras=None):
+    dados = {
+        "instante": time.time(),
+        "etapas": latencias.resumo(),
+        "histograma_limites_ms": list(LIMITES_HISTOGRAMA_MS),
+        "histogramas": latencias.histogramas(),
+    }
+    for nome, funcao in (extras or {}).items():
+        try:
+            dados[nome] = funcao()
+        except Exception as e:  # um contador quebrado não derruba os outros
+            dados[nome] = f"erro: {e}"
+    return dados
+
+
+class ServidorMetricas:
+    def __init__(self, latencias, porta=8765, extras=None, endereco="127.0.0.1"):
+        # Só escuta em localhost por padrão; use endereco="0.0.0.0" para ver de outra máquina
+        self.latencias = latencias
+        self.extras = extras
+        servidor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metricas"):
+                    self.send_error(404)
+                    return
+                corpo = json.dumps(coletar(servidor.latencias, servidor.extras)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                # Sem uma linha no terminal a cada consulta
+                pass
+
+        self._http = ThreadingHTTPServer((endereco, porta), Tratador)
+        self._http.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endereco(self):
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}/metricas"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+class ArquivoMetricas:
+    def __init__(self, latencias, caminho, intervalo=5.0, extras=None):
+        self.latencias = latencias
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.extras = extras
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        # Última gravação com o estado final
+        self.gravar()
+
+    def gravar(self):
+        # Arquivo temporário + replace: quem lê nunca vê um JSON pela metade
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as fp:
+            json.dump(coletar(self.latencias, self.extras), fp, indent=2, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.gravar()
+            except OSError as e:
+                print(f"Erro ao gravar as métricas em {self.caminho}: {e}")
+# ------------------------------------
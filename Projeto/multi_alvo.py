@@ -0,0 +1,169 @@
+import numpy as np
+
+# --- RASTREAMENTO MULTI-ALVO COM IDs PERSISTENTES ---
+# Mantém uma "trilha" para cada objeto detectado (pessoa, carro, cachorro...), com um ID que não muda
+# entre frames. As detecções novas são associadas às trilhas por uma matriz de custo de IoU,
+# e entre duas passadas do detector a posição de cada trilha é prevista com um modelo de
+# velocidade constante (barato: algumas operações NumPy sobre todas as trilhas de uma vez).
+# Assim o operador pode trocar de alvo na hora, sem esperar uma nova detecção.
+
+
+def matriz_iou(caixas_a, caixas_b):
+    # IoU entre todas as caixas de A (K, 4) e de B (M, 4), formato (x, y, w, h). Retorna (K, M).
+    a = caixas_a[:, None, :]
+    b = caixas_b[None, :, :]
+    largura_inter = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    altura_inter = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    intersecao = np.clip(largura_inter, 0, None) * np.clip(altura_inter, 0, None)
+    uniao = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - intersecao
+    return np.where(uniao > 0, intersecao / np.maximum(uniao, 1e-9), 0.0)
+
+
+def associar(custo, custo_maximo):
+    # Associação gulosa: pega sempre o par de menor custo ainda livre.
+    # Para as poucas dezenas de objetos de uma cena é praticamente igual ao algoritmo húngaro.
+    pares = []
+    if custo.size == 0:
+        return pares
+    ordem = np.argsort(custo, axis=None)
+    linhas_usadas = set()
+    colunas_usadas = set()
+    for indice in ordem:
+        linha, coluna = divmod(int(indice), custo.shape[1])
+        if custo[linha, coluna] > custo_maximo:
+            break
+        if linha in linhas_usadas or coluna in colunas_usadas:
+            continue
+        linhas_usadas.add(linha)
+        colunas_usadas.add(coluna)
+        pares.append((linha, coluna))
+    return pares
+
+
+class RastreadorMultiAlvo:
+    def __init__(self, limiar_iou=0.3, max_perdas=3, min_acertos=2,
+                 max_quadros_sem_deteccao=90, suavizacao=0.5):
+        # IoU mínimo para uma detecção continuar uma trilha
+        self.limiar_iou = limiar_iou
+        # Passadas do detector sem ver a trilha antes de apagá-la
+        self.max_perdas = max_perdas
+        # Passadas com a trilha vista antes de ela aparecer para o operador
+        self.min_acertos = min_acertos
+        # Frames sem nenhuma detecção antes de apagar a trilha (o detector pode rodar pouco)
+        self.max_quadros_sem_deteccao = max_quadros_sem_deteccao
+        # Peso da velocidade nova na média móvel (0..1)
+        self.suavizacao = suavizacao
+
+        self._proximo_id = 1
+        # Estado de todas as trilhas em vetores, para prever/associar tudo de uma vez
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.caixas = np.zeros((0, 4), dtype=np.float32)  # caixa na última detecção
+        self.velocidades = np.zeros((0, 2), dtype=np.float32)  # pixels por frame
+        self.quadro_atualizacao = np.zeros(0, dtype=np.int64)
+        self.acertos = np.zeros(0, dtype=np.int64)
+        self.perdas = np.zeros(0, dtype=np.int64)
+        self.labels = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def prever(self, id_frame):
+        # Caixas previstas para o frame id_frame (velocidade constante)
+        decorrido = (id_frame - self.quadro_atualizacao).astype(np.float32)
+        previstas = self.caixas.copy()
+        previstas[:, :2] += self.velocidades * decorrido[:, None]
+        return previstas
+
+    def atualizar(self, deteccoes, id_frame, roi=None):
+        # deteccoes: lista de ((x, y, w, h), label, confianca) vinda do detector no frame id_frame.
+        # roi (x0, y0, x1, y1): a rede só viu esse recorte (reaquisição), então só as trilhas
+        # previstas dentro dele contam como não vistas; as de fora ficam como estavam
+        if deteccoes:
+            caixas_det = np.array([caixa for caixa, _, _ in deteccoes], dtype=np.float32)
+        else:
+            caixas_det = np.zeros((0, 4), dtype=np.float32)
+        labels_det = [label for _, label, _ in deteccoes]
+
+        # Custo = 1 - IoU; pares de classes diferentes nunca se associam
+        previstas = self.prever(id_frame)
+        custo = 1.0 - matriz_iou(previstas, caixas_det)
+        if custo.size:
+            mesma_classe = np.array(self.labels, dtype=object)[:, None] == np.array(labels_det, dtype=object)[None, :]
+            custo[~mesma_classe] = np.inf
+        pares = associar(custo, 1.0 - self.limiar_iou)
+
+        trilhas_vistas = np.zeros(len(self.ids), dtype=bool)
+        deteccoes_usadas = np.zeros(len(caixas_det), dtype=bool)
+        for trilha, det in pares:
+            trilhas_vistas[trilha] = True
+            deteccoes_usadas[det] = True
+            # Atualiza a velocidade com média móvel do deslocamento do canto
+            decorrido = max(1, id_frame - self.quadro_atualizacao[trilha])
+            velocidade = (caixas_det[det, :2] - self.caixas[trilha, :2]) / decorrido
+            self.velocidades[trilha] = ((1 - self.suavizacao) * self.velocidades[trilha]
+                                        + self.suavizacao * velocidade)
+            self.caixas[trilha] = caixas_det[det]
+            self.quadro_atualizacao[trilha] = id_frame
+            self.acertos[trilha] += 1
+            self.perdas[trilha] = 0
+
+        nao_vistas = ~trilhas_vistas
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            dentro = ((previstas[:, 0] < x1) & (previstas[:, 0] + previstas[:, 2] > x0)
+                      & (previstas[:, 1] < y1) & (previstas[:, 1] + previstas[:, 3] > y0))
+            nao_vistas &= dentro
+        self.perdas[nao_vistas] += 1
+
+        # Remove trilhas perdidas há muito tempo
+        manter = ((self.perdas <= self.max_perdas)
+                  & (id_frame - self.quadro_atualizacao <= self.max_quadros_sem_deteccao))
+        self._filtrar(manter)
+
+        # Detecções sem trilha viram trilhas novas
+        novas = np.flatnonzero(~deteccoes_usadas)
+        if len(novas):
+            self.ids = np.concatenate([self.ids, np.arange(self._proximo_id, self._proximo_id + len(novas))])
+            self._proximo_id += len(novas)
+            self.caixas = np.concatenate([self.caixas, caixas_det[novas]])
+            self.velocidades = np.concatenate([self.velocidades, np.zeros((len(novas), 2), dtype=np.float32)])
+            self.quadro_atualizacao = np.concatenate(
+                [self.quadro_atualizacao, np.full(len(novas), id_frame, dtype=np.int64)])
+            self.acertos = np.concatenate([self.acertos, np.ones(len(novas), dtype=np.int64)])
+            self.perdas = np.concatenate([self.perdas, np.zeros(len(novas), dtype=np.int64)])
+            self.labels += [labels_det[i] for i in novas]
+
+    def trilhas(self, id_frame):
+        # Lista de (id, (x, y, w, h), label) das trilhas confirmadas, na posição prevista para id_frame
+        previstas = self.prever(id_frame)
+        confirmadas = np.flatnonzero(self.acertos >= self.min_acertos)
+        return [(int(self.ids[i]), tuple(int(v) for v in previstas[i]), self.labels[i])
+                for i in confirmadas]
+
+    def caixa_da_trilha(self, id_trilha, id_frame):
+        # Caixa (x, y, w, h) da trilha prevista para o frame id_frame, ou None se ela não existe mais
+        indices = np.flatnonzero(self.ids == id_trilha)
+        if len(indices) == 0:
+            return None
+        caixa = self.prever(id_frame)[indices[0]]
+        return tuple(int(v) for v in caixa)
+
+    def trilha_no_ponto(self, x, y, id_frame):
+        # Trilha confirmada que contém o ponto (x, y); se houver várias, a menor (mais à frente)
+        escolhida = None
+        for id_trilha, caixa, label in self.trilhas(id_frame):
+            cx, cy, cw, ch = caixa
+            if cx <= x <= cx + cw and cy <= y <= cy + ch:
+                if escolhida is None or cw * ch < escolhida[1][2] * escolhida[1][3]:
+                    escolhida = (id_trilha, caixa, label)
+        return escolhida
+
+    def _filtrar(self, manter):
+        self.ids = self.ids[manter]
+        self.caixas = self.caixas[manter]
+        self.velocidades = self.velocidades[manter]
+        self.quadro_atualizacao = self.quadro_atualizacao[manter]
+        self.acertos = self.acertos[manter]
+        self.perdas = self.perdas[manter]
+        self.labels = [label for label, m in zip(self.labels, manter) if m]
+# ------------------------------------
@@ -0,0 +1,242 @@
+import argparse
+import time
+
+import cv2
+import serial
+
+from cache_modelo import carregar_rede, texto_grafo
+from comunicacao_serial import EnlaceSerial
+from controlador import ControladorPreditivo
+from detector_assincrono import DetectorEmLote
+from porta_movimento import PortaMovimento
+from pos_processamento import carregar_labels, como_lista, criar_mascara_classes, pos_processar
+from qualidade_adaptativa import ControladorQualidade
+from quadros import ExibicaoEspelhada, espelhar_x
+from rastreadores import RastreadorAdaptativo, RastreadorEscalado
+from reaquisicao import Reaquisicao
+from reidentificacao import Reidentificacao
+from seguidor import MODO_RASTREAMENTO, SeguidorAlvo, desenhar_estado
+
+# --- MODO MULTI-CÂMERA COM DETECÇÃO EM LOTE ---
+# Lê N câmeras/vídeos ao mesmo tempo, cada um com o seu Arduino (opcional) e o mesmo passo por
+# frame do Versão2.py (seguidor.py): tracker, correção de drift, reaquisição em recortes,
+# porta de movimento, reidentificação, controle de qualidade e controle. A rede neural é uma
+# só: os frames que precisam de detecção em um mesmo ciclo viram um único lote (blobFromImages)
+# e passam por um único net.forward(), em vez de uma passada por câmera. As detecções voltam
+# para cada fluxo pelo índice da imagem.
+#
+# Exemplos (a partir da pasta raiz do projeto):
+#   python Projeto/multi_camera.py 0 1
+#   python Projeto/multi_camera.py voo1.mp4 voo2.mp4 --portas COM4 COM5
+# Clique em uma detecção na janela de uma câmera para rastrear o alvo nela. ESC sai.
+
+MODELO_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29/frozen_inference_graph.pb"
+CONFIG_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt"
+OBJETOS_ALVO = ["person", "car", "bottle", "cat", "dog", "cell phone"]
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Siga-me com várias câmeras e uma só rede neural.")
+    parser.add_argument("fontes", nargs="+", help="Índices de câmera ou arquivos de vídeo.")
+    parser.add_argument("--portas", nargs="*", default=[],
+                        help="Porta serial de cada fonte, na mesma ordem (\"-\" = sem Arduino).")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--protocolo", default="texto", help="texto ou binario.")
+    parser.add_argument("--lado", type=int, default=300, help="Lado da entrada da rede (pixels).")
+    parser.add_argument("--modelo", default=MODELO_PADRAO)
+    parser.add_argument("--config", default=CONFIG_PADRAO)
+    parser.add_argument("--rastreador", default="CSRT", help="Tracker inicial de cada fonte.")
+    parser.add_argument("--idade-maxima", type=float, default=0.5,
+                        help="Detecções mais velhas que isso (s) são ignoradas.")
+    parser.add_argument("--preditivo", action="store_true",
+                        help="Kalman + PID (controlador.py) no lugar do controle P.")
+    parser.add_argument("--fps-alvo", type=float, default=20,
+                        help="FPS desejado do ciclo (todas as câmeras); o controle de qualidade de cada "
+                             "fonte trabalha com a sua parte do tempo do ciclo.")
+    return parser
+
+
+def abrir_enlace(porta, baudrate, protocolo):
+    if not porta or porta == "-":
+        return None
+    try:
+        arduino = serial.Serial(port=porta, baudrate=baudrate, timeout=0.1)
+        time.sleep(2)  # Espera a conexão se estabelecer
+        print(f"Conexão com o Arduino em {porta} estabelecida.")
+        return EnlaceSerial(arduino, baudrate, protocolo).iniciar()
+    except serial.SerialException as e:
+        print(f"Erro ao conectar com o Arduino em {porta}: {e} (seguindo em simulação)")
+        return None
+
+
+class DetectorDoFluxo:
+    # A parte de um fluxo no DetectorEmLote, com a interface de detector que o SeguidorAlvo usa.
+    # enviar() só guarda o pedido: depois que todos os fluxos dão o passo do ciclo, os pedidos
+    # viram um lote só (retirar_pedido)
+    def __init__(self, detector, fluxo):
+        self.detector = detector
+        self.fluxo = fluxo
+        self.pedido = None
+
+    def ocupado(self):
+        return self.pedido is not None or self.detector.ocupado(self.fluxo)
+
+    def enviar(self, frame, id_frame, timestamp=None, roi=None, lado=None):
+        # O lote inteiro usa a mesma entrada: lados_prontos() só oferece esse lado, então o
+        # SeguidorAlvo nunca pede outro e lado pode ser ignorado
+        self.pedido = (frame, id_frame, timestamp, roi)
+
+    def retirar_pedido(self):
+        pedido, self.pedido = self.pedido, None
+        return pedido
+
+    def ultimo_resultado(self, idade_maxima=None, id_minimo=None):
+        return self.detector.ultimo_resultado(self.fluxo, idade_maxima, id_minimo)
+
+    def lados_prontos(self):
+        return [self.detector.lado]
+
+    def latencias_medidas(self):
+        return {}
+
+
+class Fluxo:
+    # Captura, janela e Arduino de uma câmera; o que acontece em cada frame é o SeguidorAlvo
+    def __init__(self, indice, video, enlace, detector, args, fps_alvo):
+        self.indice = indice
+        self.video = video
+        self.enlace = enlace
+        self.janela = f"Siga-me - camera {indice}"
+        self.detector = DetectorDoFluxo(detector, indice)
+        tracker = RastreadorEscalado(RastreadorAdaptativo(inicial=args.rastreador,
+                                                          orcamento_quadro=1 / fps_alvo))
+        # Como o processo_controle do pipeline_processos.py: resolução do tracker, intervalo do
+        # detector, desenhos e, por último, o backend do tracker seguem o tempo do frame
+        self.qualidade = ControladorQualidade(fps_alvo=fps_alvo, rastreador=tracker)
+        # Mesmos parâmetros do Versão2.py
+        self.seguidor = SeguidorAlvo(
+            tracker, self.detector,
+            reaquisicao=Reaquisicao(fatores=(3.0, 5.0, 8.0), quadros_por_degrau=5, quadros_ate_tela_cheia=15),
+            reidentificacao=Reidentificacao(limiar=0.6),
+            movimento=PortaMovimento(idade_maxima=2.0),
+            controlador=ControladorPreditivo(ki_posicao=0.02, kd_posicao=0.01) if args.preditivo else None,
+            qualidade=self.qualidade, enlace=enlace, idade_maxima_deteccao=args.idade_maxima)
+        self.numero_frame = 0
+        self.timestamp_frame = 0.0
+        self.duracao_quadro = 0.0  # passo + exibição deste fluxo no ciclo
+        # Buffer de captura reaproveitado; só a cópia de exibição é espelhada
+        self.frame = None
+        self.tela = ExibicaoEspelhada()
+        self.ativo = True
+
+        cv2.namedWindow(self.janela)
+        cv2.setMouseCallback(self.janela, self.selecionar_alvo_por_clique)
+
+    def selecionar_alvo_por_clique(self, event, x, y, flags, param):
+        if event != cv2.EVENT_LBUTTONDOWN or self.frame is None:
+            return
+        # A janela mostra a imagem espelhada; as caixas estão nas coordenadas da câmera
+        alvo = self.seguidor.selecionar(espelhar_x(x, self.frame.shape[1]), y)
+        if alvo is not None:
+            print(f"Câmera {self.indice}: alvo selecionado {alvo}")
+
+    def ler(self):
+        # retrieve() depois do grab() de todas as câmeras: os frames do ciclo ficam quase simultâneos
+        ok, frame = self.video.retrieve(self.frame)
+        if not ok:
+            self.ativo = False
+            return False
+        self.frame = frame
+        self.numero_frame += 1
+        self.timestamp_frame = time.monotonic()
+        return True
+
+    def passo(self):
+        # Tracker, correção de drift e controle; um pedido de detecção fica guardado para o lote
+        inicio = time.perf_counter()
+        self.seguidor.passo(self.frame, self.numero_frame, self.timestamp_frame)
+        self.duracao_quadro = time.perf_counter() - inicio
+        if self.seguidor.reidentificado is not None:
+            print(f"Câmera {self.indice}: alvo reidentificado {self.seguidor.reidentificado}")
+
+    def exibir(self):
+        inicio = time.perf_counter()
+        exibicao = self.tela.preparar(self.frame)
+        desenhar_estado(exibicao, self.seguidor.estado(), self.qualidade.nivel_overlay)
+        cv2.imshow(self.janela, exibicao)
+        # Com o alvo sendo rastreado, o controle de qualidade também pode trocar o backend do tracker
+        self.duracao_quadro += time.perf_counter() - inicio
+        self.qualidade.registrar(self.duracao_quadro,
+                                 self.frame if self.seguidor.modo == MODO_RASTREAMENTO else None)
+
+    def fechar(self):
+        if self.enlace is not None:
+            self.enlace.fechar(comando_final=(90, 'M'))
+            print(f"Câmera {self.indice}: conexão fechada. Comandos: {self.enlace.contadores()}")
+        self.video.release()
+
+
+def executar(args):
+    labels = carregar_labels()
+    mascara_classes = criar_mascara_classes(labels, OBJETOS_ALVO)
+
+    def extrair_deteccoes(detections, largura, altura):
+        caixas, class_ids, confiancas = pos_processar(
+            detections, largura, altura, mascara_classes, limiar_confianca=0.5)
+        return como_lista(caixas, class_ids, confiancas, labels)
+
+    # Mesma poda dentro da rede do Versão2.py; com lote, o NMS do DetectionOutput roda por imagem
+    poda = dict(confidence_threshold=0.5, keep_top_k=20,
+                classes=[i for i, label in enumerate(labels) if label in OBJETOS_ALVO])
+    grafo = texto_grafo(args.modelo, pbtxt_padrao=args.config,
+                        image_width=args.lado, image_height=args.lado, **poda)
+    net = carregar_rede(args.modelo, grafo, (args.lado, args.lado))
+    detector = DetectorEmLote(net, extrair_deteccoes, args.lado).iniciar()
+
+    # As fontes dividem o mesmo ciclo: cada uma tem 1/N do tempo de um frame
+    fps_fluxo = args.fps_alvo * len(args.fontes)
+    fluxos = []
+    for indice, fonte_video in enumerate(args.fontes):
+        video = cv2.VideoCapture(int(fonte_video) if fonte_video.isdigit() else fonte_video)
+        if not video.isOpened():
+            raise SystemExit(f"Erro ao abrir a fonte {fonte_video}")
+        porta = args.portas[indice] if indice < len(args.portas) else None
+        fluxos.append(Fluxo(indice, video, abrir_enlace(porta, args.baudrate, args.protocolo),
+                            detector, args, fps_fluxo))
+
+    while any(fluxo.ativo for fluxo in fluxos):
+        # grab() é barato (não decodifica): captura todas as câmeras primeiro, decodifica depois
+        ativos = [fluxo for fluxo in fluxos if fluxo.ativo and fluxo.video.grab()]
+        for fluxo in fluxos:
+            if fluxo not in ativos:
+                fluxo.ativo = False
+        ativos = [fluxo for fluxo in ativos if fluxo.ler()]
+
+        # Passo de cada fluxo; os que pediram detecção entram todos no mesmo lote (um forward).
+        # Um fluxo cujo frame anterior ainda está na rede não pede (ocupado()).
+        for fluxo in ativos:
+            fluxo.passo()
+        pedidos = {}
+        for fluxo in ativos:
+            pedido = fluxo.detector.retirar_pedido()
+            if pedido is not None:
+                pedidos[fluxo.indice] = pedido
+        detector.enviar(pedidos)
+
+        for fluxo in ativos:
+            fluxo.exibir()
+
+        if cv2.waitKey(1) & 0xFF == 27:  # ESC para sair
+            break
+
+    detector.parar()
+    print(f"Lotes: {detector.lotes}, imagens: {detector.imagens}, "
+          f"descartadas: {detector.frames_descartados}")
+    for fluxo in fluxos:
+        fluxo.fechar()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    executar(criar_parser().parse_args())
+# ------------------------------------
@@ -0,0 +1,427 @@
+import argparse
+import multiprocessing
+import queue
+import time
+
+import cv2
+import numpy as np
+
+from anel_memoria import AnelQuadros
+from detector_assincrono import ResultadoDeteccao
+
+# --- PIPELINE EM VÁRIOS PROCESSOS ---
+# O Versão2.py roda tudo em um processo só, sob o GIL: captura, rede neural, CSRT, controle,
+# serial e imshow. Aqui cada etapa é um processo, com um núcleo para cada:
+#   captura  -> escreve os frames em um anel de memória compartilhada (anel_memoria.py); um
+#               arquivo de vídeo é lido no ritmo do CAP_PROP_FPS, como uma câmera
+#   controle -> o mesmo passo por frame do Versão2.py (seguidor.py: tracker, correção de drift,
+#               reaquisição, reidentificação, controle e serial) no frame mais novo do anel
+#   inferência -> roda o SSD no frame (ou recorte) que o controle pediu
+#   exibição -> espelha, desenha, mostra (e opcionalmente grava) cada frame que o controle
+#               processou, com o estado calculado para ele
+# Os frames nunca passam por pickle: cada processo lê o slot pela sequência, direto da memória.
+# Entre os processos só andam mensagens pequenas (pedidos e resultados de detecção, cliques,
+# estado do controle), em filas curtas que descartam a mensagem mais velha. Uma exibição ou
+# gravação lenta nunca atrasa os comandos do servo, porque o processo de controle não espera
+# por ninguém.
+#
+# Exemplos (a partir da pasta raiz do projeto):
+#   python Projeto/pipeline_processos.py 0 --porta COM4
+#   python Projeto/pipeline_processos.py voo1.mp4 --gravar saida.avi
+# Clique em uma detecção para rastrear. ESC sai.
+
+MODELO_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29/frozen_inference_graph.pb"
+CONFIG_PADRAO = "models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt"
+OBJETOS_ALVO = ["person", "car", "bottle", "cat", "dog", "cell phone"]
+
+# Espera entre consultas ao anel quando ainda não há frame novo (s)
+ESPERA_SEM_FRAME = 0.001
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Siga-me com captura, inferência, controle e exibição em processos separados.")
+    parser.add_argument("fonte", nargs="?", default="0", help="Índice da câmera ou arquivo de vídeo.")
+    parser.add_argument("--slots", type=int, default=16, help="Frames guardados no anel de memória compartilhada.")
+    parser.add_argument("--porta", help="Porta serial do Arduino (sem ela, só simula).")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--protocolo", default="texto", help="texto ou binario.")
+    parser.add_argument("--rastreador", default="CSRT", help="Tracker inicial.")
+    parser.add_argument("--preditivo", action="store_true",
+                        help="Kalman + PID (controlador.py) no lugar do controle P.")
+    parser.add_argument("--multi-alvo", action="store_true",
+                        help="Trilhas de todos os objetos; clique em qualquer uma, em qualquer modo.")
+    parser.add_argument("--fps-alvo", type=float, default=20,
+                        help="Orçamento do passo de controle (reduz tracker e detector para caber).")
+    parser.add_argument("--lado", type=int, default=300, help="Lado da entrada da rede (pixels).")
+    parser.add_argument("--modelo", default=MODELO_PADRAO)
+    parser.add_argument("--config", default=CONFIG_PADRAO)
+    parser.add_argument("--gravar", help="Grava o vídeo anotado da exibição neste arquivo.")
+    parser.add_argument("--fps-gravacao", type=float, help="Grava com menos frames por segundo que a câmera.")
+    parser.add_argument("--escala-gravacao", type=float, default=1.0, help="Grava em resolução reduzida (ex: 0.5).")
+    return parser
+
+
+def publicar(fila, mensagem):
+    # Fila curta com um único produtor: se estiver cheia, descarta a mensagem mais velha
+    try:
+        fila.put_nowait(mensagem)
+    except queue.Full:
+        try:
+            fila.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            fila.put_nowait(mensagem)
+        except queue.Full:
+            pass
+
+
+def mais_recente(fila, atual=None):
+    # Esvazia a fila e fica só com a última mensagem
+    while True:
+        try:
+            atual = fila.get_nowait()
+        except queue.Empty:
+            return atual
+
+
+# --- PROCESSO DE CAPTURA ---
+def processo_captura(fonte, slots, fila_anel, parar):
+    video = cv2.VideoCapture(int(fonte) if fonte.isdigit() else fonte)
+    ok, primeiro = video.read()
+    if not ok:
+        fila_anel.put(None)
+        return
+    anel = AnelQuadros.criar(primeiro.shape, slots)
+    proximo = time.monotonic()
+    anel.escrever(primeiro, proximo)
+    fila_anel.put((anel.nome, primeiro.shape))
+
+    # Uma câmera entrega os frames no ritmo dela; um arquivo seria lido o mais rápido possível e
+    # os outros processos pulariam quase todos os frames (e o vídeo acabaria antes da hora)
+    fps = video.get(cv2.CAP_PROP_FPS) if not fonte.isdigit() else 0
+    intervalo = 1.0 / fps if fps and fps > 0 else 0.0
+
+    while not parar.is_set():
+        if intervalo:
+            # A agenda avança de intervalo em intervalo; depois de um atraso ela é realinhada
+            proximo += intervalo
+            espera = proximo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            elif espera < -intervalo:
+                proximo = time.monotonic()
+        # O read() decodifica direto no slot do anel: nenhuma cópia do frame na captura
+        sequencia, slot = anel.reservar()
+        ok, imagem = video.read(slot)
+        if not ok:
+            break
+        if imagem is not slot:
+            np.copyto(slot, imagem)
+        anel.publicar(sequencia, time.monotonic())
+
+    # Fim do vídeo (ou câmera desconectada): encerra o pipeline.
+    # O processo principal apaga o bloco depois que todos pararem de usá-lo.
+    parar.set()
+    video.release()
+    anel.fechar(apagar=False)
+
+
+# --- PROCESSO DE INFERÊNCIA ---
+def processo_inferencia(nome, forma, slots, config, fila_pedidos, fila_deteccoes, parar):
+    from cache_modelo import carregar_rede, texto_grafo
+    from pos_processamento import carregar_labels, como_lista, criar_mascara_classes, pos_processar
+    from quadros import preparar_blob
+
+    labels = carregar_labels()
+    mascara_classes = criar_mascara_classes(labels, OBJETOS_ALVO)
+    poda = dict(confidence_threshold=0.5, keep_top_k=20,
+                classes=[i for i, label in enumerate(labels) if label in OBJETOS_ALVO])
+    lado = config["lado"]
+    grafo = texto_grafo(config["modelo"], pbtxt_padrao=config["config"],
+                        image_width=lado, image_height=lado, **poda)
+    net = carregar_rede(config["modelo"], grafo, (lado, lado))
+
+    anel = AnelQuadros.abrir(nome, forma, slots)
+    frame = np.empty(forma, dtype=np.uint8)
+    blobs = {}
+    while not parar.is_set():
+        # Pedidos do controle: (sequência, recorte ou None). Só o mais novo é atendido.
+        try:
+            pedido = fila_pedidos.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        sequencia, roi = mais_recente(fila_pedidos, pedido)
+        instante = anel.ler(sequencia, frame)
+        if instante is None:
+            # O frame pedido já saiu do anel: usa o mais novo (a resposta continua valendo para o pedido)
+            sequencia = anel.ultima()
+            instante = anel.ler(sequencia, frame)
+            if instante is None:
+                continue
+        if roi is None:
+            imagem = frame
+            x0, y0 = 0, 0
+        else:
+            x0, y0, x1, y1 = roi
+            imagem = frame[y0:y1, x0:x1]
+        altura, largura = imagem.shape[:2]
+        inicio = time.perf_counter()
+        net.setInput(preparar_blob(imagem, lado, blobs))
+        detections = net.forward()
+        caixas, class_ids, confiancas = pos_processar(detections, largura, altura, mascara_classes)
+        deteccoes = como_lista(caixas, class_ids, confiancas, labels)
+        if roi is not None:
+            # Leva as caixas do recorte de volta para as coordenadas do frame
+            deteccoes = [((x + x0, y + y0, w, h), label, confianca)
+                         for (x, y, w, h), label, confianca in deteccoes]
+        publicar(fila_deteccoes, (sequencia, instante, deteccoes, time.perf_counter() - inicio, roi))
+    anel.fechar()
+
+
+# --- PROCESSO DE RASTREAMENTO E CONTROLE ---
+class DetectorPipeline:
+    # O processo de inferência com a interface de detector que o SeguidorAlvo usa.
+    # enviar() só publica a sequência (o frame já está no anel) e o recorte; ultimo_resultado()
+    # relê do anel o frame de cada resposta, para o tracker iniciar e a reidentificação pontuar
+    # exatamente na imagem em que as caixas foram encontradas.
+    def __init__(self, anel, forma, lado, fila_pedidos, fila_deteccoes, tempo_maximo_pedido=1.0):
+        self.anel = anel
+        self.lado = lado
+        self.fila_pedidos = fila_pedidos
+        self.fila_deteccoes = fila_deteccoes
+        # Sem resposta depois disso (s), o pedido é dado como perdido (ex: rede ainda carregando)
+        self.tempo_maximo_pedido = tempo_maximo_pedido
+        # Dois buffers: o frame do resultado atual continua válido enquanto o próximo é lido.
+        # O seguinte já reescreve o buffer; o SeguidorAlvo guarda a sua própria cópia para o clique
+        self._buffers = [np.empty(forma, dtype=np.uint8) for _ in range(2)]
+        self._proximo_buffer = 0
+        self._resultado = None
+        self._pedido = None  # (sequência, instante do envio)
+
+        # Contadores para diagnóstico
+        self.passadas = 0
+        self.sem_frame = 0  # respostas cujo frame já tinha saído do anel
+
+    def ocupado(self):
+        self._receber()
+        if self._pedido is not None and time.monotonic() - self._pedido[1] > self.tempo_maximo_pedido:
+            self._pedido = None
+        return self._pedido is not None
+
+    def enviar(self, frame, id_frame, timestamp=None, roi=None, lado=None):
+        # id_frame é a sequência do frame no anel; lado é ignorado (a rede tem uma entrada só)
+        self._pedido = (id_frame, time.monotonic())
+        publicar(self.fila_pedidos, (id_frame, roi))
+
+    def ultimo_resultado(self, idade_maxima=None, id_minimo=None):
+        self._receber()
+        resultado = self._resultado
+        if resultado is None:
+            return None
+        if id_minimo is not None and resultado.id_frame < id_minimo:
+            return None
+        if idade_maxima is not None and time.monotonic() - resultado.timestamp > idade_maxima:
+            return None
+        return resultado
+
+    def lados_prontos(self):
+        return [self.lado]
+
+    def latencias_medidas(self):
+        return {}
+
+    def _receber(self):
+        mensagem = mais_recente(self.fila_deteccoes)
+        if mensagem is None:
+            return
+        sequencia, instante, deteccoes, duracao, roi = mensagem
+        if self._pedido is not None and sequencia >= self._pedido[0]:
+            self._pedido = None
+        self.passadas += 1
+        buffer = self._buffers[self._proximo_buffer]
+        if self.anel.ler(sequencia, buffer) is None:
+            # Sem o frame de origem o resultado não serve para iniciar o tracker
+            self.sem_frame += 1
+            return
+        self._proximo_buffer = 1 - self._proximo_buffer
+        self._resultado = ResultadoDeteccao(sequencia, instante, buffer, deteccoes, duracao, roi, self.lado)
+
+
+def processo_controle(nome, forma, slots, config, fila_pedidos, fila_deteccoes, fila_cliques,
+                      fila_estado, parar):
+    import serial
+
+    from comunicacao_serial import EnlaceSerial
+    from controlador import ControladorPreditivo
+    from multi_alvo import RastreadorMultiAlvo
+    from porta_movimento import PortaMovimento
+    from qualidade_adaptativa import ControladorQualidade
+    from rastreadores import RastreadorAdaptativo, RastreadorEscalado
+    from reaquisicao import Reaquisicao
+    from reidentificacao import Reidentificacao
+    from seguidor import MODO_RASTREAMENTO, SeguidorAlvo
+
+    enlace = None
+    if config["porta"]:
+        try:
+            arduino = serial.Serial(port=config["porta"], baudrate=config["baudrate"], timeout=0.1)
+            time.sleep(2)  # Espera a conexão se estabelecer
+            enlace = EnlaceSerial(arduino, config["baudrate"], config["protocolo"]).iniciar()
+        except serial.SerialException as e:
+            print(f"Erro ao conectar com o Arduino: {e} (seguindo em simulação)")
+
+    anel = AnelQuadros.abrir(nome, forma, slots)
+    frame = np.empty(forma, dtype=np.uint8)
+    detector = DetectorPipeline(anel, forma, config["lado"], fila_pedidos, fila_deteccoes)
+    tracker = RastreadorEscalado(RastreadorAdaptativo(inicial=config["rastreador"],
+                                                      orcamento_quadro=1 / config["fps_alvo"]))
+    # Aqui o orçamento é só o do passo de controle: os desenhos ficam no processo de exibição
+    qualidade = ControladorQualidade(fps_alvo=config["fps_alvo"], rastreador=tracker)
+    # Mesmos parâmetros do Versão2.py
+    seguidor = SeguidorAlvo(
+        tracker, detector,
+        reaquisicao=Reaquisicao(fatores=(3.0, 5.0, 8.0), quadros_por_degrau=5, quadros_ate_tela_cheia=15),
+        reidentificacao=Reidentificacao(limiar=0.6),
+        movimento=PortaMovimento(idade_maxima=2.0),
+        controlador=ControladorPreditivo(ki_posicao=0.02, kd_posicao=0.01) if config["preditivo"] else None,
+        multi_alvo=RastreadorMultiAlvo() if config["multi_alvo"] else None,
+        qualidade=qualidade, enlace=enlace, idade_maxima_deteccao=0.5)
+    processada = 0
+
+    while not parar.is_set():
+        sequencia = anel.ultima()
+        if sequencia == processada:
+            time.sleep(ESPERA_SEM_FRAME)
+            continue
+        instante = anel.ler(sequencia, frame)
+        if instante is None:
+            continue
+        processada = sequencia
+
+        # A sequência do anel é o número do frame; o instante é o da captura
+        inicio = time.perf_counter()
+        seguidor.passo(frame, sequencia, instante)
+        # Com o alvo sendo rastreado, o controle de qualidade também pode trocar o backend do tracker
+        qualidade.registrar(time.perf_counter() - inicio,
+                            frame if seguidor.modo == MODO_RASTREAMENTO else None)
+        if seguidor.reidentificado is not None:
+            print(f"Alvo reidentificado: {seguidor.reidentificado}")
+
+        # Cliques da exibição, já nas coordenadas da câmera; o tracker começa no próximo frame
+        clique = mais_recente(fila_cliques)
+        if clique is not None:
+            alvo = seguidor.selecionar(*clique)
+            if alvo is not None:
+                print(f"Alvo selecionado: {alvo}")
+
+        publicar(fila_estado, seguidor.estado())
+
+    if enlace is not None:
+        enlace.fechar(comando_final=(90, 'M'))
+        print(f"Conexão com o Arduino fechada. Comandos: {enlace.contadores()}")
+    print(f"Detecções: {detector.passadas} (sem o frame no anel: {detector.sem_frame})")
+    anel.fechar()
+
+
+# --- PROCESSO DE EXIBIÇÃO ---
+def processo_exibicao(nome, forma, slots, config, fila_estado, fila_cliques, parar):
+    from gravacao_video import GravadorVideo
+    from quadros import ExibicaoEspelhada, espelhar_x
+    from seguidor import desenhar_estado
+
+    anel = AnelQuadros.abrir(nome, forma, slots)
+    frame = np.empty(forma, dtype=np.uint8)
+    tela = ExibicaoEspelhada()
+    largura = forma[1]
+    gravador = None
+    if config["gravar"]:
+        # A codificação roda em uma thread: a janela continua no ritmo do controle
+        gravador = GravadorVideo(config["gravar"], None, config["fps_gravacao"], config["escala_gravacao"]).iniciar()
+
+    def clique(event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN:
+            publicar(fila_cliques, (espelhar_x(x, largura), y))
+
+    win_name = "Siga-me (pipeline em processos)"
+    cv2.namedWindow(win_name)
+    cv2.setMouseCallback(win_name, clique)
+
+    exibida = 0
+    while not parar.is_set():
+        # Mostra o frame de cada estado, e não o mais novo do anel: as caixas e o comando
+        # desenhados são sempre os calculados para a imagem que aparece
+        estado = mais_recente(fila_estado)
+        if estado is not None and estado.id_frame != exibida:
+            instante = anel.ler(estado.id_frame, frame)
+            if instante is not None:
+                exibida = estado.id_frame
+                exibicao = tela.preparar(frame)
+                desenhar_estado(exibicao, estado)
+                cv2.imshow(win_name, exibicao)
+                if gravador is not None:
+                    gravador.adicionar(exibicao, instante)
+        # waitKey também mantém a janela respondendo enquanto não há estado novo
+        if cv2.waitKey(1) & 0xFF == 27:  # ESC para sair
+            parar.set()
+
+    if gravador is not None:
+        gravador.fechar()
+        print(f"Vídeo anotado em {config['gravar']}: {gravador.contadores()}")
+    cv2.destroyAllWindows()
+    anel.fechar()
+
+
+def executar(args):
+    config = {"lado": args.lado, "modelo": args.modelo, "config": args.config, "porta": args.porta,
+              "baudrate": args.baudrate, "protocolo": args.protocolo, "rastreador": args.rastreador,
+              "preditivo": args.preditivo, "multi_alvo": args.multi_alvo, "fps_alvo": args.fps_alvo,
+              "gravar": args.gravar, "fps_gravacao": args.fps_gravacao,
+              "escala_gravacao": args.escala_gravacao}
+    parar = multiprocessing.Event()
+    fila_anel = multiprocessing.Queue()
+    fila_pedidos = multiprocessing.Queue(maxsize=2)
+    fila_deteccoes = multiprocessing.Queue(maxsize=2)
+    fila_cliques = multiprocessing.Queue(maxsize=4)
+    fila_estado = multiprocessing.Queue(maxsize=2)
+
+    captura = multiprocessing.Process(target=processo_captura, name="captura",
+                                      args=(args.fonte, args.slots, fila_anel, parar))
+    captura.start()
+    anel_info = fila_anel.get()
+    if anel_info is None:
+        captura.join()
+        raise SystemExit(f"Erro ao abrir a fonte {args.fonte}")
+    nome, forma = anel_info
+    # O processo principal segura o bloco até o fim e o apaga quando todos terminarem
+    anel = AnelQuadros.abrir(nome, forma, args.slots)
+
+    processos = [
+        multiprocessing.Process(target=processo_inferencia, name="inferencia",
+                                args=(nome, forma, args.slots, config, fila_pedidos, fila_deteccoes, parar)),
+        multiprocessing.Process(target=processo_controle, name="controle",
+                                args=(nome, forma, args.slots, config, fila_pedidos, fila_deteccoes,
+                                      fila_cliques, fila_estado, parar)),
+        multiprocessing.Process(target=processo_exibicao, name="exibicao",
+                                args=(nome, forma, args.slots, config, fila_estado, fila_cliques, parar)),
+    ]
+    for processo in processos:
+        processo.start()
+
+    try:
+        # Se qualquer etapa morrer, o pipeline inteiro para
+        while not parar.is_set() and all(p.is_alive() for p in processos + [captura]):
+            parar.wait(0.2)
+    except KeyboardInterrupt:
+        pass
+    parar.set()
+    for processo in [captura] + processos:
+        processo.join(timeout=5)
+        if processo.is_alive():
+            processo.terminate()
+    anel.fechar(apagar=True)
+
+
+if __name__ == "__main__":
+    executar(criar_parser().parse_args())
+# ------------------------------------
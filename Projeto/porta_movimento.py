@@ -0,0 +1,60 @@
+import time
+
+import cv2
+import numpy as np
+
+# --- DETECÇÃO SÓ QUANDO A CENA MUDA ---
+# No modo de detecção o loop pedia uma passada do SSD a cada frame livre, mesmo com a câmera
+# parada olhando a mesma cena. Aqui cada frame é reduzido para uma miniatura em tons de cinza
+# (ex: 64 px de largura) e comparado com a miniatura do último frame que foi para a rede:
+# se menos de "fracao_minima" dos pixels mudou mais que "limiar_pixel", as detecções
+# anteriores continuam valendo e a rede não roda. Uma passada é forçada a cada "idade_maxima"
+# segundos, para não ficar preso a uma cena que mudou devagar demais para o limiar.
+
+
+class PortaMovimento:
+    def __init__(self, largura=64, limiar_pixel=15, fracao_minima=0.01, idade_maxima=2.0):
+        self.largura = largura
+        self.limiar_pixel = limiar_pixel
+        self.fracao_minima = fracao_minima
+        self.idade_maxima = idade_maxima
+        self._referencia = None  # miniatura do último frame enviado para a rede
+        self._instante_referencia = 0.0
+        # True enquanto a cena não mudou desde a última passada (as detecções dela ainda valem)
+        self.parada = False
+        self.fracao_mudada = 0.0
+
+        # Contadores para diagnóstico
+        self.passadas = 0
+        self.ignorados = 0
+
+    def reiniciar(self):
+        # A próxima consulta sempre libera uma passada (ex: ao voltar para o modo de detecção)
+        self._referencia = None
+        self.parada = False
+
+    def _miniatura(self, frame):
+        altura, largura = frame.shape[:2]
+        escala = self.largura / largura
+        pequeno = cv2.resize(frame, (self.largura, max(1, int(altura * escala))), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(pequeno, cv2.COLOR_BGR2GRAY)
+
+    def deve_detectar(self, frame, agora=None):
+        # True se o frame deve ir para a rede; nesse caso ele vira a nova referência
+        if agora is None:
+            agora = time.monotonic()
+        miniatura = self._miniatura(frame)
+        if self._referencia is not None and miniatura.shape == self._referencia.shape:
+            diferenca = cv2.absdiff(miniatura, self._referencia)
+            self.fracao_mudada = np.count_nonzero(diferenca > self.limiar_pixel) / diferenca.size
+            vencida = agora - self._instante_referencia >= self.idade_maxima
+            if self.fracao_mudada < self.fracao_minima and not vencida:
+                self.parada = True
+                self.ignorados += 1
+                return False
+        self._referencia = miniatura
+        self._instante_referencia = agora
+        self.parada = False
+        self.passadas += 1
+        return True
+# ------------------------------------
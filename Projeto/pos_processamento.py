@@ -0,0 +1,49 @@
+import numpy as np
+
+# --- PÓS-PROCESSAMENTO VETORIZADO DA SAÍDA DO SSD ---
+# A rede devolve um tensor (1, 1, N, 7) onde cada linha é:
+#   [id_imagem, class_id, confianca, x1, y1, x2, y2]  (coordenadas normalizadas entre 0 e 1)
+# Em vez de percorrer as N linhas em Python, filtramos e escalamos tudo de uma vez com NumPy.
+
+
+def carregar_labels(caminho="coco_class_labels.txt"):
+    with open(caminho) as fp:
+        return fp.read().split("\n")
+
+
+def criar_mascara_classes(labels, objetos_alvo=None):
+    # Vetor booleano indexado pelo class_id: True se a classe interessa.
+    # Calculado uma única vez, evita comparar strings a cada detecção.
+    if objetos_alvo is None:
+        return np.ones(len(labels), dtype=bool)
+    alvos = set(objetos_alvo)
+    return np.array([label in alvos for label in labels], dtype=bool)
+
+
+def pos_processar(detections, largura, altura, mascara_classes, limiar_confianca=0.5):
+    # Retorna (caixas, class_ids, confiancas):
+    #   caixas: int32 (M, 4) no formato (x, y, w, h) em pixels
+    #   class_ids: int64 (M,)
+    #   confiancas: float32 (M,)
+    linhas = detections.reshape(-1, 7)
+    class_ids = linhas[:, 1].astype(np.int64)
+    confiancas = linhas[:, 2]
+
+    # Class ids fora da tabela de labels são ignorados
+    validos = (class_ids >= 0) & (class_ids < len(mascara_classes))
+    selecao = validos & (confiancas > limiar_confianca)
+    selecao[selecao] = mascara_classes[class_ids[selecao]]
+
+    # Converte os cantos normalizados em pixels (trunca como o int() do código original)
+    escala = np.array([largura, altura, largura, altura], dtype=np.float32)
+    cantos = (linhas[selecao, 3:7] * escala).astype(np.int32)
+    caixas = cantos.copy()
+    caixas[:, 2:] -= cantos[:, :2]
+    return caixas, class_ids[selecao], confiancas[selecao]
+
+
+def como_lista(caixas, class_ids, confiancas, labels):
+    # Formato usado pela interface: lista de ((x, y, w, h), label, confianca)
+    return [(tuple(int(v) for v in caixa), labels[class_id], float(confianca))
+            for caixa, class_id, confianca in zip(caixas, class_ids, confiancas)]
+# ------------------------------------
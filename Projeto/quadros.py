@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+
+# --- CAMINHO DO FRAME SEM CÓPIAS ---
+# A câmera entrega a imagem "de verdade" e a janela mostra o espelho (como um espelho de
+# selfie). Em vez de espelhar os pixels do frame inteiro logo depois da captura, o loop trabalha
+# na imagem da câmera e só espelha:
+#   - a cópia de exibição (que é onde os desenhos vão, nunca no frame do tracker/detector);
+#   - as coordenadas que passam de um lado para o outro (caixas desenhadas, cliques, controle).
+# Os buffers (captura, exibição, cópias para o detector) são alocados uma vez e reaproveitados.
+
+
+def espelhar_x(x, largura):
+    # Coluna x na imagem espelhada <-> coluna na imagem da câmera
+    return largura - 1 - x
+
+
+def espelhar_caixa(caixa, largura):
+    # (x, y, w, h) de um lado para o outro: as colunas x..x+w-1 viram largura-x-w..largura-x-1
+    x, y, w, h = caixa
+    return (largura - x - w, y, w, h)
+
+
+def espelhar_roi(roi, largura):
+    # (x0, y0, x1, y1) com x1 exclusivo
+    x0, y0, x1, y1 = roi
+    return (largura - x1, y0, largura - x0, y1)
+
+
+class ExibicaoEspelhada:
+    # Cópia espelhada do frame para desenhar e mostrar, sempre no mesmo buffer
+    def __init__(self):
+        self._buffer = None
+
+    def preparar(self, frame):
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = np.empty_like(frame)
+        return cv2.flip(frame, 1, dst=self._buffer)
+
+
+class PoolQuadros:
+    # Anel de buffers do tamanho do frame: copiar() grava no próximo buffer do anel em vez de
+    # alocar um frame novo. Um buffer só é reescrito "tamanho" cópias depois, então quem guarda
+    # uma cópia (ex: o frame de um ResultadoDeteccao) pode contar com ela até lá.
+    def __init__(self, tamanho=5):
+        self.tamanho = tamanho
+        self._buffers = []
+        self._proximo = 0
+
+    def copiar(self, frame):
+        i = self._proximo
+        self._proximo = (i + 1) % self.tamanho
+        if i == len(self._buffers):
+            self._buffers.append(np.empty_like(frame))
+        elif self._buffers[i].shape != frame.shape or self._buffers[i].dtype != frame.dtype:
+            self._buffers[i] = np.empty_like(frame)
+        np.copyto(self._buffers[i], frame)
+        return self._buffers[i]
+
+
+def preparar_blob(imagem, lado, buffers):
+    # Mesmo blob de cv2.dnn.blobFromImage(imagem, 1.0, (lado, lado), (0, 0, 0), swapRB=True,
+    # crop=False), mas gravado em buffers reaproveitados: buffers é um dict
+    # {lado: (imagem redimensionada uint8, blob float32 (1, 3, lado, lado))}
+    if lado not in buffers:
+        buffers[lado] = (np.empty((lado, lado, 3), dtype=np.uint8),
+                         np.empty((1, 3, lado, lado), dtype=np.float32))
+    redimensionada, blob = buffers[lado]
+    # blobFromImage também redimensiona com interpolação linear
+    cv2.resize(imagem, (lado, lado), dst=redimensionada, interpolation=cv2.INTER_LINEAR)
+    # HWC BGR -> CHW RGB e uint8 -> float32 em uma cópia só
+    np.copyto(blob[0], redimensionada.transpose(2, 0, 1)[::-1])
+    return blob
+# ------------------------------------
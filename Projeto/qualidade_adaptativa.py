@@ -0,0 +1,113 @@
+# --- CONTROLE ADAPTATIVO DE RESOLUÇÃO E QUALIDADE ---
+# A mesma pipeline precisa rodar com câmera 4K em uma plataforma e VGA em outra.
+# Este controlador observa o tempo de processamento de cada frame e sobe ou desce um "nível"
+# de qualidade para manter o FPS configurado. Cada nível define:
+#   - a largura máxima da imagem em que o tracker roda (as bboxes voltam para o tamanho cheio)
+#   - quantas vezes mais espaçadas ficam as passadas do detector
+#   - quanto do overlay é desenhado (2 = tudo, 1 = só caixas e comando, 0 = só o alvo)
+# Com um tracker adaptativo (rastreadores.RastreadorAdaptativo), este controlador é o único dono
+# do orçamento do frame: depois do último nível ele troca o backend do tracker por um mais barato
+# e, na volta, recupera o backend antes de subir de nível. Assim os dois nunca reagem ao mesmo
+# frame lento ao mesmo tempo.
+
+# (largura máxima do tracker, fator do intervalo do detector, nível de overlay)
+NIVEIS_PADRAO = [
+    (960, 1.0, 2),
+    (640, 1.5, 2),
+    (480, 2.0, 1),
+    (320, 3.0, 0),
+]
+
+
+class ControladorQualidade:
+    def __init__(self, fps_alvo=20, niveis=None, nivel_inicial=0,
+                 quadros_para_descer=15, quadros_para_subir=90, folga_para_subir=0.7,
+                 suavizacao=0.1, rastreador=None):
+        self.fps_alvo = fps_alvo
+        self.niveis = niveis or NIVEIS_PADRAO
+        self.nivel = nivel_inicial
+        # Frames seguidos fora do alvo antes de mudar de nível (histerese)
+        self.quadros_para_descer = quadros_para_descer
+        self.quadros_para_subir = quadros_para_subir
+        # Só sobe de nível se o frame estiver abaixo desta fração do orçamento
+        self.folga_para_subir = folga_para_subir
+        self.suavizacao = suavizacao
+        # Tracker com descer()/subir() (ver acima), direto ou embrulhado; None = só os níveis
+        self.rastreador = rastreador
+
+        self.tempo_medio = None
+        self.mudancas = 0
+        self.trocas_rastreador = 0
+        self._acima = 0
+        self._abaixo = 0
+
+    @property
+    def orcamento(self):
+        return 1.0 / self.fps_alvo
+
+    @property
+    def fator_intervalo_deteccao(self):
+        return self.niveis[self.nivel][1]
+
+    @property
+    def nivel_overlay(self):
+        return self.niveis[self.nivel][2]
+
+    def escala(self, largura_frame):
+        # Escala (<= 1) aplicada ao frame antes de entregar ao tracker
+        largura_maxima = self.niveis[self.nivel][0]
+        return min(1.0, largura_maxima / largura_frame)
+
+    def registrar(self, duracao, frame=None):
+        # Chamado uma vez por frame com o tempo de processamento (sem a espera da câmera).
+        # frame: o frame atual, só enquanto o tracker estiver rastreando (fora disso o backend
+        # do tracker não muda). Retorna True se o nível ou o backend mudou.
+        if self.tempo_medio is None:
+            self.tempo_medio = duracao
+        else:
+            self.tempo_medio += self.suavizacao * (duracao - self.tempo_medio)
+
+        if self.tempo_medio > self.orcamento:
+            self._acima += 1
+            self._abaixo = 0
+        elif self.tempo_medio < self.orcamento * self.folga_para_subir:
+            self._abaixo += 1
+            self._acima = 0
+        else:
+            self._acima = 0
+            self._abaixo = 0
+
+        pode_trocar = self.rastreador is not None and frame is not None
+        if self._acima >= self.quadros_para_descer:
+            if self.nivel < len(self.niveis) - 1:
+                return self._mudar(self.nivel + 1)
+            if pode_trocar and self.rastreador.descer(frame):
+                return self._trocou_rastreador()
+        if self._abaixo >= self.quadros_para_subir:
+            if pode_trocar and self.rastreador.indice > 0:
+                # Backend mais barato que o inicial: ele volta primeiro, se couber no orçamento
+                if self.rastreador.subir(frame, self.tempo_medio, self.orcamento):
+                    return self._trocou_rastreador()
+                self._abaixo = 0
+                return False
+            if self.nivel > 0:
+                return self._mudar(self.nivel - 1)
+        return False
+
+    def _trocou_rastreador(self):
+        self.trocas_rastreador += 1
+        self._acima = 0
+        self._abaixo = 0
+        self.tempo_medio = None
+        return True
+
+    def _mudar(self, nivel):
+        print(f"Qualidade: nível {self.nivel} -> {nivel}")
+        self.nivel = nivel
+        self.mudancas += 1
+        self._acima = 0
+        self._abaixo = 0
+        # Depois de mudar, a média recomeça para medir o efeito do novo nível
+        self.tempo_medio = None
+        return True
+# ------------------------------------
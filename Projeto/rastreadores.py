@@ -0,0 +1,324 @@
+import time
+
+import cv2
+
+# --- BACKENDS DE RASTREAMENTO INTERCAMBIÁVEIS ---
+# O CSRT é preciso, mas é um dos trackers mais lentos do OpenCV. Aqui todos os trackers
+# (CSRT, KCF, MOSSE, MIL e um modo "só detector") têm a mesma interface do OpenCV:
+#   tracker.init(frame, bbox)
+#   ok, bbox = tracker.update(frame)
+# e o RastreadorAdaptativo troca de backend quando o loop estoura o orçamento de tempo: sozinho
+# (registrar_tempo_quadro) ou a pedido de quem é dono do orçamento (descer/subir, usados pelo
+# ControladorQualidade do Versão2.py).
+
+# Nome do backend -> nome da função de criação no OpenCV
+CONSTRUTORES = {
+    "CSRT": "TrackerCSRT_create",
+    "KCF": "TrackerKCF_create",
+    "MOSSE": "TrackerMOSSE_create",
+    "MIL": "TrackerMIL_create",
+}
+
+# Do mais preciso (e caro) para o mais barato.
+# O MIL fica de fora por padrão: costuma ser tão lento quanto o CSRT e menos preciso.
+# Se ele (ou outro backend fora da ordem) for pedido como inicial, entra no topo da ordem.
+ORDEM_PADRAO = ["CSRT", "KCF", "MOSSE", "DETECTOR"]
+
+
+def _funcao_criacao(nome):
+    # Nas versões novas do OpenCV alguns trackers (ex: MOSSE) só existem em cv2.legacy
+    funcao = CONSTRUTORES[nome]
+    if hasattr(cv2, funcao):
+        return getattr(cv2, funcao)
+    legado = getattr(cv2, "legacy", None)
+    return getattr(legado, funcao, None)
+
+
+def backends_disponiveis():
+    nomes = [nome for nome in CONSTRUTORES if _funcao_criacao(nome) is not None]
+    return nomes + ["DETECTOR"]
+
+
+def criar_rastreador(nome):
+    if nome == "DETECTOR":
+        return RastreadorSomenteDetector()
+    funcao = _funcao_criacao(nome)
+    if funcao is None:
+        raise ValueError(f"Tracker {nome} não disponível nesta instalação do OpenCV")
+    return funcao()
+
+
+class RastreadorSomenteDetector:
+    # "Tracker" que só repete a última caixa que a IA entregou (via init).
+    # É o backend mais barato: nenhum processamento por frame, mas depende do detector rodar sempre.
+    somente_detector = True
+
+    def __init__(self, idade_maxima=1.0):
+        # Sem detecção nova há mais que isso (em segundos), o alvo é considerado perdido
+        self.idade_maxima = idade_maxima
+        self.bbox = None
+        self.timestamp = 0.0
+
+    def init(self, frame, bbox):
+        self.bbox = tuple(bbox)
+        self.timestamp = time.monotonic()
+        return True
+
+    def update(self, frame):
+        ok = self.bbox is not None and time.monotonic() - self.timestamp <= self.idade_maxima
+        return ok, self.bbox
+
+
+class RastreadorEscalado:
+    # Roda o tracker em uma cópia reduzida do frame e devolve a bbox no tamanho cheio.
+    # Em câmeras 4K o CSRT/KCF ficam muito mais rápidos sem perder o alvo.
+    def __init__(self, base, escala=1.0):
+        self.base = base
+        self.escala = escala
+        self._bbox = None
+        self._frame_reduzido = None
+        # Buffer da imagem reduzida, reaproveitado enquanto o tamanho não muda
+        self._buffer = None
+
+    def __getattr__(self, nome):
+        # nome, somente_detector, latencias... vêm do tracker de dentro
+        return getattr(self.base, nome)
+
+    def _reduzir(self, frame):
+        if self.escala == 1.0:
+            self._frame_reduzido = frame
+        else:
+            altura, largura = frame.shape[:2]
+            tamanho = (max(1, int(round(largura * self.escala))), max(1, int(round(altura * self.escala))))
+            if self._buffer is None or self._buffer.shape[1::-1] != tamanho:
+                self._buffer = None
+            self._buffer = self._frame_reduzido = cv2.resize(frame, tamanho, dst=self._buffer,
+                                                             interpolation=cv2.INTER_AREA)
+        return self._frame_reduzido
+
+    def init(self, frame, bbox):
+        self._bbox = tuple(bbox)
+        caixa = tuple(int(round(v * self.escala)) for v in bbox)
+        return self.base.init(self._reduzir(frame), caixa)
+
+    def update(self, frame):
+        ok, caixa = self.base.update(self._reduzir(frame))
+        if ok:
+            self._bbox = tuple(int(round(v / self.escala)) for v in caixa)
+        return ok, self._bbox
+
+    def definir_escala(self, escala, frame):
+        # Troca a resolução do tracker; reinicia na última bbox se ele já estava rodando.
+        # frame=None só troca a escala: quem embrulha este tracker faz o init (ver RastreadorIntercalado)
+        if escala == self.escala:
+            return
+        self.escala = escala
+        if self._bbox is not None and frame is not None:
+            self.init(frame, self._bbox)
+
+    # O tracker de dentro só conhece o frame reduzido
+    def registrar_tempo_quadro(self, duracao, frame):
+        self.base.registrar_tempo_quadro(duracao, self._frame_reduzido)
+
+    def descer(self, frame):
+        return self.base.descer(self._frame_reduzido)
+
+    def subir(self, frame, tempo_quadro=None, orcamento=None):
+        return self.base.subir(self._frame_reduzido, tempo_quadro, orcamento)
+
+
+class RastreadorIntercalado:
+    # Roda o tracker de verdade só a cada "intervalo" frames; nos frames do meio a bbox é
+    # extrapolada com a velocidade medida entre as duas últimas atualizações reais.
+    # Se o deslocamento previsto desde a última atualização passar de "limiar_movimento" pixels,
+    # o tracker roda antes da hora (alvo rápido: pular frames faria o CSRT perdê-lo).
+    # O loop continua recebendo uma bbox por frame, então o controle e a serial mantêm a taxa cheia.
+    def __init__(self, base, intervalo=1, limiar_movimento=8.0, suavizacao=0.5):
+        self.base = base
+        # 1 = sem intercalar (atualiza todo frame)
+        self.intervalo = intervalo
+        self.limiar_movimento = limiar_movimento
+        self.suavizacao = suavizacao
+        self._bbox = None
+        self._velocidade = (0.0, 0.0)  # pixels por frame
+        self._quadros_desde_update = 0
+        self._entregue = None  # última bbox devolvida por update (real ou extrapolada)
+        # Contadores para diagnóstico
+        self.atualizacoes = 0
+        self.interpolados = 0
+
+    def __getattr__(self, nome):
+        return getattr(self.base, nome)
+
+    def init(self, frame, bbox):
+        self._bbox = tuple(float(v) for v in bbox)
+        self._entregue = tuple(bbox)
+        self._velocidade = (0.0, 0.0)
+        self._quadros_desde_update = 0
+        return self.base.init(frame, bbox)
+
+    def definir_escala(self, escala, frame):
+        # A troca de resolução reinicia o tracker de dentro; o init passa por aqui para a
+        # extrapolação também recomeçar, na última caixa entregue (e não com a velocidade antiga)
+        if escala == self.base.escala:
+            return
+        self.base.definir_escala(escala, None)
+        if self._entregue is not None:
+            self.init(frame, self._entregue)
+
+    def _prevista(self, quadros):
+        x, y, w, h = self._bbox
+        vx, vy = self._velocidade
+        return x + vx * quadros, y + vy * quadros, w, h
+
+    def update(self, frame):
+        self._quadros_desde_update += 1
+        quadros = self._quadros_desde_update
+        # O modo "só detector" não tem custo por frame e depende de ver cada caixa nova da IA
+        if self._bbox is not None and self.intervalo > 1 and quadros < self.intervalo \
+                and not getattr(self.base, "somente_detector", False):
+            vx, vy = self._velocidade
+            if max(abs(vx), abs(vy)) * quadros <= self.limiar_movimento:
+                self.interpolados += 1
+                self._entregue = tuple(int(round(v)) for v in self._prevista(quadros))
+                return True, self._entregue
+
+        ok, caixa = self.base.update(frame)
+        self.atualizacoes += 1
+        if ok:
+            if self._bbox is not None:
+                # Velocidade do canto superior esquerdo desde a última atualização real
+                vx = (caixa[0] - self._bbox[0]) / quadros
+                vy = (caixa[1] - self._bbox[1]) / quadros
+                a = self.suavizacao
+                self._velocidade = (self._velocidade[0] + a * (vx - self._velocidade[0]),
+                                    self._velocidade[1] + a * (vy - self._velocidade[1]))
+            self._bbox = tuple(float(v) for v in caixa)
+            self._quadros_desde_update = 0
+            self._entregue = tuple(caixa)
+        return ok, caixa
+
+
+class RastreadorAdaptativo:
+    def __init__(self, inicial="CSRT", ordem=None, orcamento_quadro=1 / 15,
+                 quadros_para_descer=10, quadros_para_subir=150, folga_para_subir=0.6,
+                 suavizacao=0.1):
+        disponiveis = backends_disponiveis()
+        self.ordem = [nome for nome in (ordem or ORDEM_PADRAO) if nome in disponiveis]
+        if inicial not in self.ordem:
+            if inicial not in disponiveis:
+                raise ValueError(f"Tracker {inicial} não disponível nesta instalação do OpenCV")
+            # Escolhido explicitamente: começa nele e, se estourar o orçamento, desce pela ordem
+            self.ordem.insert(0, inicial)
+        self.indice = self.ordem.index(inicial)
+        # Tempo máximo de processamento de um frame (em segundos)
+        self.orcamento_quadro = orcamento_quadro
+        # Frames seguidos acima do orçamento antes de trocar por um backend mais barato
+        self.quadros_para_descer = quadros_para_descer
+        # Frames seguidos com folga antes de tentar voltar para um backend mais preciso
+        self.quadros_para_subir = quadros_para_subir
+        self.folga_para_subir = folga_para_subir
+        self.suavizacao = suavizacao
+
+        # Latência média do update de cada backend (média móvel exponencial, em segundos)
+        self.latencias = {}
+        self.trocas = 0
+        self._base = None
+        self._bbox = None
+        self._acima = 0
+        self._abaixo = 0
+        self._tempo_quadro = None
+
+    @property
+    def nome(self):
+        return self.ordem[self.indice]
+
+    @property
+    def somente_detector(self):
+        return getattr(self._base, "somente_detector", False)
+
+    def init(self, frame, bbox):
+        self._base = criar_rastreador(self.nome)
+        self._base.init(frame, tuple(int(v) for v in bbox))
+        self._bbox = tuple(bbox)
+        return True
+
+    def update(self, frame):
+        inicio = time.perf_counter()
+        ok, bbox = self._base.update(frame)
+        self._registrar_latencia(self.nome, time.perf_counter() - inicio)
+        if ok:
+            self._bbox = bbox
+        return ok, bbox
+
+    def registrar_tempo_quadro(self, duracao, frame):
+        # Chamado pelo loop com o tempo total de processamento do frame.
+        # Decide se o backend atual cabe no orçamento e troca se for preciso.
+        if self._tempo_quadro is None:
+            self._tempo_quadro = duracao
+        else:
+            self._tempo_quadro += self.suavizacao * (duracao - self._tempo_quadro)
+
+        if duracao > self.orcamento_quadro:
+            self._acima += 1
+            self._abaixo = 0
+        elif duracao < self.orcamento_quadro * self.folga_para_subir:
+            self._abaixo += 1
+            self._acima = 0
+        else:
+            self._acima = 0
+            self._abaixo = 0
+
+        if self._acima >= self.quadros_para_descer:
+            self.descer(frame)
+        elif self._abaixo >= self.quadros_para_subir:
+            self.subir(frame)
+
+    def descer(self, frame):
+        # Troca por um backend mais barato; retorna True se trocou
+        self._acima = 0
+        latencia_atual = self.latencias.get(self.nome)
+        for indice in range(self.indice + 1, len(self.ordem)):
+            latencia = self.latencias.get(self.ordem[indice])
+            # Pula backends que já se mostraram tão lentos quanto o atual
+            if latencia is None or latencia_atual is None or latencia < latencia_atual:
+                self._trocar(indice, frame)
+                return True
+        return False
+
+    def subir(self, frame, tempo_quadro=None, orcamento=None):
+        # Volta para o backend anterior (mais preciso); retorna True se trocou.
+        # tempo_quadro / orcamento: os de quem chama, se for ele o dono do orçamento
+        self._abaixo = 0
+        if self.indice == 0:
+            return False
+        if tempo_quadro is None:
+            tempo_quadro = self._tempo_quadro
+        if orcamento is None:
+            orcamento = self.orcamento_quadro
+        anterior = self.ordem[self.indice - 1]
+        latencia_anterior = self.latencias.get(anterior)
+        latencia_atual = self.latencias.get(self.nome, 0.0)
+        # Só volta se o tempo do frame, trocando a latência do backend, ainda couber no orçamento
+        if latencia_anterior is not None and tempo_quadro is not None:
+            previsto = tempo_quadro - latencia_atual + latencia_anterior
+            if previsto > orcamento * self.folga_para_subir:
+                return False
+        self._trocar(self.indice - 1, frame)
+        return True
+
+    def _trocar(self, indice, frame):
+        anterior = self.nome
+        self.indice = indice
+        self.trocas += 1
+        print(f"Tracker trocado: {anterior} -> {self.nome}")
+        if self._bbox is not None:
+            self.init(frame, self._bbox)
+
+    def _registrar_latencia(self, nome, duracao):
+        media = self.latencias.get(nome)
+        if media is None:
+            self.latencias[nome] = duracao
+        else:
+            self.latencias[nome] = media + self.suavizacao * (duracao - media)
+# ------------------------------------
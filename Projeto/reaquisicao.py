@@ -0,0 +1,58 @@
+# --- REAQUISIÇÃO DO ALVO EM UM RECORTE (ROI) AO REDOR DA ÚLTIMA CAIXA ---
+# Quando o alvo é perdido, ele quase sempre ainda está perto de onde estava.
+# Em vez de reduzir o frame inteiro para 300x300 (e perder alvos pequenos), o SSD roda primeiro
+# em um recorte ampliado ao redor da última bbox: mesmo custo, resolução efetiva bem maior.
+# A busca vai sendo alargada em degraus e, depois de alguns frames, volta para a tela cheia.
+
+
+class Reaquisicao:
+    def __init__(self, fatores=(3.0, 5.0, 8.0), quadros_por_degrau=5, quadros_ate_tela_cheia=15,
+                 tamanho_minimo=160):
+        # Tamanho do recorte em múltiplos do lado maior da última bbox, em cada degrau
+        self.fatores = fatores
+        # Frames (pedidos ao detector) em cada degrau antes de alargar a busca
+        self.quadros_por_degrau = quadros_por_degrau
+        # Depois disso a reaquisição desiste do recorte e usa o frame inteiro
+        self.quadros_ate_tela_cheia = quadros_ate_tela_cheia
+        # Lado mínimo do recorte em pixels (abaixo disso a imagem ficaria ampliada demais)
+        self.tamanho_minimo = tamanho_minimo
+
+        self.ultima_bbox = None
+        self.tentativas = 0
+        # Último recorte entregue ao detector (para desenhar na tela)
+        self.roi_atual = None
+
+    @property
+    def ativa(self):
+        return self.ultima_bbox is not None and self.tentativas < self.quadros_ate_tela_cheia
+
+    def iniciar(self, bbox):
+        # Chamado quando o tracker perde o alvo, com a última bbox conhecida
+        self.ultima_bbox = tuple(bbox)
+        self.tentativas = 0
+        self.roi_atual = None
+
+    def encerrar(self):
+        self.ultima_bbox = None
+        self.tentativas = 0
+        self.roi_atual = None
+
+    def proxima_roi(self, largura, altura):
+        # Região (x0, y0, x1, y1) para a próxima detecção, ou None para usar o frame inteiro
+        if not self.ativa:
+            self.roi_atual = None
+            return None
+        degrau = min(self.tentativas // self.quadros_por_degrau, len(self.fatores) - 1)
+        self.tentativas += 1
+
+        x, y, w, h = self.ultima_bbox
+        lado = max(self.tamanho_minimo, self.fatores[degrau] * max(w, h))
+        # Recorte quadrado (a rede espera 300x300), limitado ao tamanho do frame
+        lado = int(min(lado, largura, altura))
+        centro_x = x + w / 2
+        centro_y = y + h / 2
+        x0 = int(min(max(centro_x - lado / 2, 0), largura - lado))
+        y0 = int(min(max(centro_y - lado / 2, 0), altura - lado))
+        self.roi_atual = (x0, y0, x0 + lado, y0 + lado)
+        return self.roi_atual
+# ------------------------------------
@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+
+# --- REGISTRO BINÁRIO DO VOO ---
+# Um registro de tamanho fixo por frame com o que o loop calculou: instante, modo, detecções,
+# caixa do tracker e comando enviado. Como todos os registros têm o mesmo tamanho, o arquivo
+# inteiro abre com np.memmap como um array estruturado, sem parse, e o replay.py percorre
+# horas de voo sem rodar a rede neural.
+#
+# Formato: cabeçalho de 16 bytes (MAGICO, max. de detecções por registro, tamanho do registro)
+# seguido dos registros, little-endian e sem alinhamento.
+# Versão 2: cada registro guarda também o instante em que o controle rodou e o atraso de atuação
+# usado pelo controle preditivo, para o replay repetir exatamente a mesma previsão.
+# Arquivos da versão 1 continuam legíveis (sem esses campos).
+
+MAGICO = b"SIGAVOO2"
+MAGICOS = {b"SIGAVOO1": 1, MAGICO: 2}
+TAMANHO_CABECALHO = 16
+CABECALHO = np.dtype([("magico", "S8"), ("max_deteccoes", "<u4"), ("tamanho_registro", "<u4")])
+# Cabem as 20 caixas da PODA_DETECCAO do Versão2.py
+MAX_DETECCOES = 20
+
+# Mesmos valores de MODO_DETECCAO / MODO_RASTREAMENTO do Versão2.py
+MODO_DETECCAO = 0
+MODO_RASTREAMENTO = 1
+
+DETECCAO = np.dtype([("classe", "u1"), ("confianca", "<f4"), ("caixa", "<i2", (4,))])
+
+
+def tipo_registro(max_deteccoes=MAX_DETECCOES, versao=2):
+    campos_controle = []
+    if versao >= 2:
+        campos_controle = [
+            ("instante_controle", "<f8"),  # time.monotonic() passado ao controle (0 = sem comando)
+            ("atraso_atuacao", "<f8"),  # latência da serial usada na previsão (s)
+        ]
+    return np.dtype([
+        ("frame", "<u4"),
+        ("timestamp", "<f8"),  # time.monotonic() do frame
+        ("modo", "u1"),
+        ("rastreio_ok", "u1"),  # 1 se o tracker tinha o alvo neste frame
+        ("largura", "<u2"),
+        ("altura", "<u2"),
+        ("bbox", "<f4", (4,)),  # caixa do tracker (x, y, w, h)
+        ("area_referencia", "<f4"),
+        ("angulo", "u1"),
+        ("distancia", "S1"),  # 'F', 'A', 'M' ou b"" quando nenhum comando saiu
+    ] + campos_controle + [
+        ("id_deteccao", "<u4"),  # frame de onde vieram as detecções (0 = nenhuma nova)
+        ("n_deteccoes", "u1"),
+        ("deteccoes", DETECCAO, (max_deteccoes,)),
+    ])
+
+
+class GravadorVoo:
+    # Anexa um registro por frame. O registro é um array de 1 elemento reaproveitado e o arquivo
+    # tem buffer grande, então registrar() custa algumas atribuições e um memcpy.
+    def __init__(self, caminho, labels, max_deteccoes=MAX_DETECCOES):
+        self.tipo = tipo_registro(max_deteccoes)
+        self.max_deteccoes = max_deteccoes
+        self.ids_classes = {label: i for i, label in enumerate(labels)}
+        self._registro = np.zeros(1, dtype=self.tipo)
+        self._ultimo_id_deteccao = 0
+
+        novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        if not novo:
+            # Continua um arquivo existente só se o formato for o mesmo, descartando um último
+            # registro incompleto para não desalinhar os próximos
+            ler_cabecalho(caminho, self.tipo)
+            completos = (os.path.getsize(caminho) - TAMANHO_CABECALHO) // self.tipo.itemsize
+            os.truncate(caminho, TAMANHO_CABECALHO + completos * self.tipo.itemsize)
+        self._arquivo = open(caminho, "ab", buffering=1 << 16)
+        if novo:
+            cabecalho = np.array([(MAGICO, max_deteccoes, self.tipo.itemsize)], dtype=CABECALHO)
+            self._arquivo.write(cabecalho.tobytes())
+        self.registros = 0
+
+    def registrar(self, id_frame, timestamp, modo, largura, altura, bbox=None, area_referencia=0,
+                  comando=None, resultado=None, espelhado=False, instante_controle=0.0, atraso_atuacao=0.0):
+        # comando: ComandoControle (ou None); resultado: ResultadoDeteccao mais recente (ou None).
+        # instante_controle / atraso_atuacao: os "agora" e "atraso_atuacao" passados ao controle.
+        # As detecções de um resultado entram só no primeiro registro depois que ele chega.
+        # espelhado: as caixas das detecções vêm na imagem da câmera e são gravadas espelhadas,
+        # no mesmo referencial da bbox (a imagem exibida, que é onde o controle é calculado).
+        # Elemento de um array estruturado: as atribuições escrevem direto em self._registro
+        r = self._registro[0]
+        r["frame"] = id_frame
+        r["timestamp"] = timestamp
+        r["modo"] = modo
+        r["largura"] = largura
+        r["altura"] = altura
+        r["rastreio_ok"] = bbox is not None
+        r["bbox"] = bbox if bbox is not None else (0, 0, 0, 0)
+        r["area_referencia"] = area_referencia
+        if comando is not None:
+            r["angulo"] = comando.angulo
+            r["distancia"] = comando.comando_distancia.encode("ascii")
+            r["instante_controle"] = instante_controle
+            r["atraso_atuacao"] = atraso_atuacao
+        else:
+            r["angulo"] = 0
+            r["distancia"] = b""
+            r["instante_controle"] = 0.0
+            r["atraso_atuacao"] = 0.0
+
+        n = 0
+        if resultado is not None and resultado.id_frame > self._ultimo_id_deteccao:
+            self._ultimo_id_deteccao = resultado.id_frame
+            r["id_deteccao"] = resultado.id_frame
+            deteccoes = self._registro["deteccoes"][0]
+            for caixa, label, confianca in resultado.deteccoes[:self.max_deteccoes]:
+                if espelhado:
+                    caixa = (largura - caixa[0] - caixa[2], caixa[1], caixa[2], caixa[3])
+                deteccoes[n] = (self.ids_classes.get(label, 0), confianca, tuple(caixa))
+                n += 1
+        else:
+            r["id_deteccao"] = 0
+        r["n_deteccoes"] = n
+
+        self._arquivo.write(self._registro.tobytes())
+        self.registros += 1
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+def ler_cabecalho(caminho, tipo=None):
+    # Retorna o dtype dos registros do arquivo; ValueError se não for um registro de voo
+    # (ou, com "tipo", se o formato for diferente dele)
+    cabecalho = np.fromfile(caminho, dtype=CABECALHO, count=1)
+    if len(cabecalho) == 0 or cabecalho["magico"][0] not in MAGICOS:
+        raise ValueError(f"{caminho} não é um registro de voo")
+    versao = MAGICOS[cabecalho["magico"][0]]
+    tipo_arquivo = tipo_registro(int(cabecalho["max_deteccoes"][0]), versao)
+    if tipo_arquivo.itemsize != int(cabecalho["tamanho_registro"][0]):
+        raise ValueError(f"{caminho}: tamanho de registro inesperado")
+    if tipo is not None and tipo_arquivo != tipo:
+        raise ValueError(f"{caminho} foi gravado com outro formato de registro")
+    return tipo_arquivo
+
+
+def ler_registro(caminho):
+    # Array estruturado (somente leitura) mapeado direto do arquivo.
+    # Um último registro incompleto (gravação interrompida) é ignorado.
+    tipo = ler_cabecalho(caminho)
+    quantidade = (os.path.getsize(caminho) - TAMANHO_CABECALHO) // tipo.itemsize
+    if quantidade <= 0:
+        return np.zeros(0, dtype=tipo)
+    return np.memmap(caminho, dtype=tipo, mode="r", offset=TAMANHO_CABECALHO, shape=(quantidade,))
+# ------------------------------------
@@ -0,0 +1,121 @@
+import time
+
+import cv2
+import numpy as np
+
+# --- REIDENTIFICAÇÃO AUTOMÁTICA DO ALVO DEPOIS DE UMA PERDA ---
+# Ao selecionar o alvo guardamos uma assinatura compacta da aparência dele: histograma H-S
+# (HSV) da caixa, tamanho e proporção (w/h). Durante o rastreamento a assinatura "recente" é
+# atualizada aos poucos (média móvel), e a do clique fica guardada como âncora.
+# Quando o tracker perde o alvo, cada resultado novo do detector é comparado com a assinatura
+# em uma passada NumPy sobre todas as detecções da mesma classe; a melhor acima do limiar
+# reinicia o tracker sozinha, sem esperar o operador clicar de novo.
+
+
+class Reidentificacao:
+    def __init__(self, bins=(16, 8), limiar=0.6, intervalo_atualizacao=10, suavizacao=0.1,
+                 peso_aparencia=0.6, peso_tamanho=0.2, peso_proporcao=0.2, tempo_maximo=10.0):
+        self.bins = bins  # bins de H (0-180) e S (0-256)
+        self.limiar = limiar
+        # A assinatura recente é atualizada a cada N frames rastreados, com este peso
+        self.intervalo_atualizacao = intervalo_atualizacao
+        self.suavizacao = suavizacao
+        self.peso_aparencia = peso_aparencia
+        self.peso_tamanho = peso_tamanho
+        self.peso_proporcao = peso_proporcao
+        # Depois disso (s) sem reencontrar o alvo, a busca automática desiste e espera um clique
+        self.tempo_maximo = tempo_maximo
+
+        self.classe = None
+        self.histograma_original = None
+        self.histograma_recente = None
+        self.tamanho = None  # (w, h) recente
+        self._quadros = 0
+        self.instante_perda = None
+        self.ultimo_avaliado = -1
+        self.ultima_pontuacao = 0.0
+
+        # Contadores para diagnóstico
+        self.reidentificacoes = 0
+
+    @property
+    def buscando(self):
+        return (self.instante_perda is not None and self.histograma_original is not None
+                and time.monotonic() - self.instante_perda <= self.tempo_maximo)
+
+    def _histogramas(self, frame, caixas):
+        # Um histograma H-S normalizado (soma 1) por caixa, em uma matriz (M, bins_h * bins_s).
+        # O frame é convertido para HSV uma vez só; depois é um calcHist por recorte.
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        altura, largura = hsv.shape[:2]
+        histogramas = np.zeros((len(caixas), self.bins[0] * self.bins[1]), dtype=np.float32)
+        for i, (x, y, w, h) in enumerate(caixas):
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1, y1 = min(largura, int(x + w)), min(altura, int(y + h))
+            if x1 <= x0 or y1 <= y0:
+                continue
+            histograma = cv2.calcHist([hsv[y0:y1, x0:x1]], [0, 1], None, list(self.bins), [0, 180, 0, 256])
+            histogramas[i] = histograma.ravel()
+        somas = histogramas.sum(axis=1, keepdims=True)
+        return np.divide(histogramas, somas, out=np.zeros_like(histogramas), where=somas > 0)
+
+    def capturar(self, frame, bbox, classe):
+        # Chamado na seleção do alvo (clique ou reidentificação)
+        histograma = self._histogramas(frame, [bbox])[0]
+        self.classe = classe
+        self.histograma_original = histograma
+        self.histograma_recente = histograma.copy()
+        self.tamanho = (float(bbox[2]), float(bbox[3]))
+        self._quadros = 0
+        self.instante_perda = None
+
+    def atualizar(self, frame, bbox):
+        # Chamado a cada frame rastreado; só recalcula a cada intervalo_atualizacao frames
+        self._quadros += 1
+        if self.histograma_recente is None or self._quadros % self.intervalo_atualizacao:
+            return
+        histograma = self._histogramas(frame, [bbox])[0]
+        self.histograma_recente += self.suavizacao * (histograma - self.histograma_recente)
+        w, h = self.tamanho
+        self.tamanho = (w + self.suavizacao * (bbox[2] - w), h + self.suavizacao * (bbox[3] - h))
+
+    def perdido(self, instante=None):
+        # Chamado quando o tracker perde o alvo: começa a busca automática
+        self.instante_perda = time.monotonic() if instante is None else instante
+
+    def encerrar(self):
+        self.instante_perda = None
+
+    def pontuar(self, frame, caixas):
+        # Pontuação (0..1) de cada caixa contra a assinatura, todas de uma vez
+        caixas = np.asarray(caixas, dtype=np.float32).reshape(-1, 4)
+        histogramas = self._histogramas(frame, caixas)
+        # Coeficiente de Bhattacharyya (1 = histogramas iguais) contra as duas assinaturas
+        referencias = np.sqrt(np.stack([self.histograma_original, self.histograma_recente]))
+        aparencia = (np.sqrt(histogramas) @ referencias.T).max(axis=1)
+
+        w_ref, h_ref = self.tamanho
+        w, h = np.maximum(caixas[:, 2], 1), np.maximum(caixas[:, 3], 1)
+        # 1 para o mesmo tamanho/proporção, caindo com a razão em escala log (x2 -> ~0.5)
+        tamanho = np.exp(-np.abs(np.log(w * h / max(w_ref * h_ref, 1))))
+        proporcao = np.exp(-2 * np.abs(np.log((w / h) / (max(w_ref, 1) / max(h_ref, 1)))))
+        return (self.peso_aparencia * aparencia + self.peso_tamanho * tamanho
+                + self.peso_proporcao * proporcao)
+
+    def procurar(self, resultado):
+        # Avalia cada ResultadoDeteccao uma vez. Retorna (caixa, label) da melhor detecção da
+        # classe do alvo acima do limiar, ou None.
+        if not self.buscando or resultado is None or resultado.id_frame <= self.ultimo_avaliado:
+            return None
+        self.ultimo_avaliado = resultado.id_frame
+        candidatas = [(caixa, label) for caixa, label, _ in resultado.deteccoes if label == self.classe]
+        if not candidatas:
+            return None
+        pontuacoes = self.pontuar(resultado.frame, [caixa for caixa, _ in candidatas])
+        melhor = int(np.argmax(pontuacoes))
+        self.ultima_pontuacao = float(pontuacoes[melhor])
+        if self.ultima_pontuacao < self.limiar:
+            return None
+        self.reidentificacoes += 1
+        return candidatas[melhor]
+# ------------------------------------
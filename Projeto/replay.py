@@ -0,0 +1,146 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import serial
+
+from comunicacao_serial import CODIFICADORES, EnlaceSerial
+from controlador import ControladorPreditivo
+from controle import FATOR_CONVERSAO, KP_AREA, KP_POSICAO, calcular_comando
+from registro_voo import MODO_RASTREAMENTO, ler_registro
+
+# --- REPLAY DE UM VOO GRAVADO (SEM REDE NEURAL) ---
+# Lê o registro binário gravado pelo Versão2.py (ARQUIVO_REGISTRO) e passa as caixas do tracker
+# de novo pelo controle e pela codificação serial, com outros ganhos, sem câmera e sem net.forward().
+# Compara os comandos novos com os gravados. Sem --tempo-real roda tão rápido quanto o
+# controle permite (milhares de frames por segundo), o que permite varrer ganhos em voos reais.
+#
+# Exemplos (a partir da pasta raiz do projeto):
+#   python Projeto/replay.py voo.reg --kp 0.08 --fator 4.0
+#   python Projeto/replay.py voo.reg --preditivo --ki 0.02 --kd 0.01 --saida replay.json
+#   python Projeto/replay.py voo.reg --porta /dev/ttyUSB0 --tempo-real   # repete no servo de verdade
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Replay de um registro de voo pelo controle e pela serial.")
+    parser.add_argument("registro", help="Arquivo gravado pelo Versão2.py (ARQUIVO_REGISTRO).")
+    parser.add_argument("--kp", type=float, default=KP_POSICAO, help="Kp_posicao")
+    parser.add_argument("--fator", type=float, default=FATOR_CONVERSAO, help="fator_conversao")
+    parser.add_argument("--kp-area", type=float, default=KP_AREA, help="Kp_area")
+    parser.add_argument("--preditivo", action="store_true", help="Kalman + PID (controlador.py).")
+    parser.add_argument("--ki", type=float, default=0.0, help="Ki do controle preditivo")
+    parser.add_argument("--kd", type=float, default=0.0, help="Kd do controle preditivo")
+    parser.add_argument("--protocolo", default="texto", help="texto ou binario.")
+    parser.add_argument("--porta", help="Envia os comandos para esta porta serial (ex: Arduino ou emulador).")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--tempo-real", action="store_true",
+                        help="Respeita os instantes gravados em vez de rodar o mais rápido possível.")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout).")
+    return parser
+
+
+def executar(args):
+    registros = ler_registro(args.registro)
+    codificar = CODIFICADORES[args.protocolo]
+    controlador = ControladorPreditivo(args.kp, args.ki, args.kd, args.fator, args.kp_area) \
+        if args.preditivo else None
+
+    enlace = None
+    if args.porta:
+        enlace = EnlaceSerial(serial.Serial(port=args.porta, baudrate=args.baudrate, timeout=0.1),
+                              args.baudrate, args.protocolo).iniciar()
+
+    # Colunas inteiras de uma vez: cada uma é lida do memmap em bloco, não registro a registro
+    ativos = (registros["modo"] == MODO_RASTREAMENTO) & (registros["rastreio_ok"] == 1)
+    timestamps = np.asarray(registros["timestamp"])
+    bboxes = np.asarray(registros["bbox"]).tolist()
+    larguras = np.asarray(registros["largura"]).tolist()
+    areas = np.asarray(registros["area_referencia"]).tolist()
+    angulos_gravados = np.asarray(registros["angulo"])
+    # Registros da versão 2 trazem o relógio e o atraso que o controle usou no voo; nos antigos
+    # o controle preditivo roda com agora = instante do frame e sem atraso (não reproduz o voo)
+    relogio_gravado = "instante_controle" in registros.dtype.names
+    if relogio_gravado:
+        instantes_controle = np.asarray(registros["instante_controle"]).tolist()
+        atrasos = np.asarray(registros["atraso_atuacao"]).tolist()
+    else:
+        instantes_controle = timestamps.tolist()
+        atrasos = [0.0] * len(registros)
+    distancias_gravadas = np.asarray(registros["distancia"])
+
+    angulos = np.zeros(len(registros), dtype=np.int16)
+    distancias = np.full(len(registros), b"", dtype="S1")
+    comandos = 0
+    mudancas = 0
+    bytes_serial = 0
+    ultimo = None
+
+    inicio = time.perf_counter()
+    for i in np.flatnonzero(ativos).tolist():
+        if args.tempo_real:
+            espera = (timestamps[i] - timestamps[0]) - (time.perf_counter() - inicio)
+            if espera > 0:
+                time.sleep(espera)
+
+        if controlador is not None:
+            # Novo alvo (ou retomada depois de uma perda): o filtro começa do zero, como no Versão2.py
+            if i == 0 or not ativos[i - 1] or areas[i] != areas[i - 1]:
+                controlador.reiniciar()
+            # O relógio e o atraso são os gravados: o replay é determinístico, não depende da
+            # velocidade da máquina e, com os mesmos ganhos, repete os comandos do voo
+            comando = controlador.calcular(bboxes[i], larguras[i], areas[i], timestamps[i],
+                                           instantes_controle[i], atrasos[i])
+        else:
+            comando = calcular_comando(bboxes[i], larguras[i], areas[i], kp_posicao=args.kp,
+                                       fator_conversao=args.fator, kp_area=args.kp_area)
+
+        angulos[i] = comando.angulo
+        distancias[i] = comando.comando_distancia.encode("ascii")
+        comandos += 1
+        chave = (comando.angulo, comando.comando_distancia)
+        if chave != ultimo:
+            # Só os comandos que mudam saem de fato pela serial (o EnlaceSerial descarta repetidos)
+            mudancas += 1
+            bytes_serial += len(codificar(*chave))
+            ultimo = chave
+        if enlace is not None:
+            enlace.publicar(*chave)
+    duracao = time.perf_counter() - inicio
+
+    if enlace is not None:
+        enlace.fechar(comando_final=(90, 'M'))
+
+    # Comparação com o que foi enviado no voo (só onde os dois têm comando)
+    comparaveis = ativos & (distancias_gravadas != b"")
+    erro_angulo = np.abs(angulos[comparaveis] - angulos_gravados[comparaveis].astype(np.int16))
+    return {
+        "configuracao": vars(args),
+        "quadros": len(registros),
+        "quadros_rastreando": int(ativos.sum()),
+        "deteccoes_gravadas": int(np.count_nonzero(registros["id_deteccao"])),
+        "relogio_controle_gravado": relogio_gravado,
+        "duracao_voo_s": round(float(timestamps[-1] - timestamps[0]), 3) if len(registros) else 0.0,
+        "duracao_replay_s": round(duracao, 3),
+        "fps_replay": round(comandos / duracao, 1) if duracao > 0 else 0.0,
+        "comandos": comandos,
+        "mudancas_comando": mudancas,
+        "bytes_serial": bytes_serial,
+        "diferentes_do_gravado": int(np.count_nonzero(
+            (angulos[comparaveis] != angulos_gravados[comparaveis])
+            | (distancias[comparaveis] != distancias_gravadas[comparaveis]))),
+        "erro_angulo_medio": round(float(erro_angulo.mean()), 3) if len(erro_angulo) else 0.0,
+        "erro_angulo_max": int(erro_angulo.max()) if len(erro_angulo) else 0,
+        "comandos_enlace": enlace.contadores() if enlace is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    resultado = executar(criar_parser().parse_args())
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if resultado["configuracao"]["saida"]:
+        with open(resultado["configuracao"]["saida"], "w", encoding="utf-8") as fp:
+            fp.write(texto + "\n")
+    else:
+        print(texto)
+# ------------------------------------
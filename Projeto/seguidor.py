@@ -0,0 +1,352 @@
+import time
+from collections import namedtuple
+
+import cv2
+
+from controle import calcular_comando
+from correcao_drift import CONCORDA, CORRIGIR, AgendadorCorrecao
+from detector_assincrono import escolher_lado_entrada
+from medicao import RegistroLatencias
+from quadros import PoolQuadros, espelhar_caixa, espelhar_roi
+
+# --- PASSO POR FRAME DO SIGA-ME ---
+# Tudo o que acontece com um alvo entre a captura e a exibição de um frame: tracker, correção de
+# drift pela IA, reaquisição em recortes, porta de movimento, reidentificação, trilhas multi-alvo
+# e controle. O Versão2.py, o multi_camera.py (um por câmera) e o processo de controle do
+# pipeline_processos.py rodam este mesmo passo; cada um só troca a captura, a exibição e o
+# "detector", que precisa ter:
+#   ocupado(), enviar(frame, id_frame, timestamp, roi, lado), ultimo_resultado(idade_maxima, id_minimo),
+#   lados_prontos() e latencias_medidas()
+# O DetectorAssincrono já é assim; o multi_camera.py e o pipeline usam adaptadores (para o
+# DetectorEmLote e para o processo de inferência).
+# Os componentes opcionais (None = desligado) são os mesmos objetos que o Versão2.py configura.
+# Tracker, detector e controle trabalham na imagem da câmera; o controle (calibrado na imagem
+# espelhada) e os desenhos recebem as caixas espelhadas.
+
+MODO_DETECCAO = 0
+MODO_RASTREAMENTO = 1
+
+# O que a exibição precisa para desenhar um frame (caixas nas coordenadas da câmera).
+# É uma tupla simples para poder passar de um processo para outro no pipeline.
+EstadoQuadro = namedtuple("EstadoQuadro", [
+    "id_frame", "modo", "bbox", "comando", "deteccoes", "trilhas", "roi", "perdido", "procurando",
+    "rastreador"])
+
+cor_sucesso = (0, 255, 0)
+cor_falha = (0, 0, 255)
+cor_info = (0, 0, 255)
+cor_caixa_ia = (255, 178, 50)
+fonte = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class SeguidorAlvo:
+    def __init__(self, tracker, detector, agendador=None, reaquisicao=None, reidentificacao=None,
+                 movimento=None, controlador=None, multi_alvo=None, qualidade=None, enlace=None,
+                 registro=None, idade_maxima_deteccao=0.5, orcamento_deteccao=0.15, intervalo_trilhas=15):
+        self.tracker = tracker
+        self.detector = detector
+        # Durante o rastreamento a IA confere o tracker a cada N frames (N se adapta à estabilidade)
+        self.agendador = agendador if agendador is not None else AgendadorCorrecao()
+        self.reaquisicao = reaquisicao
+        self.reidentificacao = reidentificacao
+        self.movimento = movimento
+        # ControladorPreditivo; None = controle P (controle.calcular_comando)
+        self.controlador = controlador
+        self.multi_alvo = multi_alvo
+        self.qualidade = qualidade
+        self.enlace = enlace
+        self.registro = registro if registro is not None else RegistroLatencias()
+        # Detecções mais velhas que isso (s) são ignoradas
+        self.idade_maxima_deteccao = idade_maxima_deteccao
+        self.orcamento_deteccao = orcamento_deteccao
+        # Com multi-alvo, o detector roda no frame inteiro pelo menos a cada N frames
+        self.intervalo_trilhas = intervalo_trilhas
+
+        self.modo = MODO_DETECCAO
+        self.bbox = None
+        # Última caixa em que o tracker ainda tinha o alvo (ponto de partida da reaquisição)
+        self.bbox_valida = None
+        self.area_referencia = 0
+        # Detecções mostradas no modo de detecção e o frame em que foram calculadas
+        self.deteccoes = []
+        self.frame_deteccoes = None
+        # O frame de um ResultadoDeteccao é um buffer que o detector reaproveita; o clique pode vir
+        # muito depois, então o frame das detecções exibidas fica em uma cópia própria
+        self._copia_deteccoes = PoolQuadros(tamanho=1)
+        self.id_frame_deteccoes = None
+        # Resultados de frames anteriores a este id são descartados
+        self.id_minimo_deteccao = 0
+        self.ultimo_envio_deteccao = 0
+        # Último resultado do detector já entregue às trilhas
+        self.resultado_multi = None
+        self.frame = None
+        self.numero_frame = 0
+        self.timestamp = 0.0
+
+        # Saídas do último passo (para a exibição e o registro do voo)
+        self.modo_quadro = MODO_DETECCAO  # modo no início do frame
+        self.comando = None  # None se nenhum comando saiu neste frame
+        self.bbox_controle = None  # caixa espelhada usada pelo controle
+        self.instante_controle = 0.0
+        self.atraso_atuacao = 0.0
+        self.perdido = False
+        self.procurando = False
+        self.reidentificado = None  # label do alvo reidentificado neste frame
+
+    def iniciar_rastreamento(self, frame_base, caixa, label, reidentificado=False):
+        self.bbox = caixa
+        # Reinicia o tracker no frame de onde a caixa veio; o próximo update já alcança o frame atual
+        self.tracker.init(frame_base, caixa)
+        # Na reidentificação o alvo é o mesmo: a área de referência e a assinatura do clique continuam
+        if self.reidentificacao is not None:
+            if reidentificado:
+                self.reidentificacao.encerrar()
+            else:
+                self.reidentificacao.capturar(frame_base, caixa, label)
+        if not reidentificado:
+            self.area_referencia = caixa[2] * caixa[3]
+        # Guarda a classe do alvo para a correção de drift
+        self.agendador.reiniciar(caixa, label)
+        # O filtro do controle preditivo começa do zero para o novo alvo
+        if self.controlador is not None:
+            self.controlador.reiniciar()
+        self.modo = MODO_RASTREAMENTO
+        self.deteccoes = []
+        # Alvo (re)encontrado: encerra a busca em recortes
+        if self.reaquisicao is not None:
+            self.reaquisicao.encerrar()
+
+    def selecionar(self, x, y):
+        # Clique em (x, y) nas coordenadas da câmera. Retorna a descrição do alvo escolhido, ou None.
+        # Com multi-alvo, qualquer trilha pode ser escolhida, em qualquer modo, sem esperar o detector
+        if self.multi_alvo is not None and self.resultado_multi is not None:
+            trilha = self.multi_alvo.trilha_no_ponto(x, y, self.numero_frame)
+            if trilha is not None:
+                id_trilha, _, label = trilha
+                # Inicia no frame atual, com a caixa da trilha prevista para ele: o frame da última
+                # detecção pode ser velho demais para o tracker alcançar o alvo
+                caixa = self.multi_alvo.caixa_da_trilha(id_trilha, self.numero_frame)
+                self.iniciar_rastreamento(self.frame, caixa, label)
+                return f"{label} [#{id_trilha}]"
+
+        if self.modo == MODO_DETECCAO:
+            for i, (caixa, label, conf) in enumerate(self.deteccoes):
+                (x_caixa, y_caixa, w_caixa, h_caixa) = caixa
+                if x_caixa <= x <= x_caixa + w_caixa and y_caixa <= y <= y_caixa + h_caixa:
+                    self.iniciar_rastreamento(self.frame_deteccoes, caixa, label)
+                    return f"{label} [{i}]"
+        return None
+
+    def passo(self, frame, numero_frame, timestamp):
+        # Um frame capturado em "timestamp" (time.monotonic()); retorna o comando calculado, ou None.
+        # O frame não é alterado nem guardado além do próximo passo.
+        self.frame = frame
+        self.numero_frame = numero_frame
+        self.timestamp = timestamp
+        self.modo_quadro = self.modo
+        self.comando = None
+        self.bbox_controle = None
+        self.perdido = False
+        self.procurando = False
+        self.reidentificado = None
+        if self.qualidade is not None:
+            self.agendador.fator_intervalo = self.qualidade.fator_intervalo_deteccao
+
+        if self.modo == MODO_RASTREAMENTO:
+            self._rastrear(frame)
+        else:
+            self._detectar(frame)
+
+        if self.multi_alvo is not None:
+            # Cada resultado novo do detector (de qualquer modo) atualiza as trilhas uma única vez
+            resultado = self.detector.ultimo_resultado()
+            if resultado is not None and (self.resultado_multi is None
+                                          or resultado.id_frame > self.resultado_multi.id_frame):
+                self.multi_alvo.atualizar(resultado.deteccoes, resultado.id_frame, resultado.roi)
+                self.resultado_multi = resultado
+        return self.comando
+
+    def _escolher_lado(self, caixa_alvo=None, tamanho_imagem=None):
+        return escolher_lado_entrada(self.detector.lados_prontos(), self.detector.latencias_medidas(),
+                                     self.orcamento_deteccao, caixa_alvo, tamanho_imagem)
+
+    def _rastrear(self, frame):
+        altura, largura = frame.shape[:2]
+        if self.qualidade is not None:
+            # Resolução do tracker do nível atual; se mudou, ele reinicia na caixa do frame anterior
+            self.tracker.definir_escala(self.qualidade.escala(largura), frame)
+        with self.registro.medir("rastreamento"):
+            ok, bbox = self.tracker.update(frame)
+
+        if not ok:
+            self.perdido = True
+            self.modo = MODO_DETECCAO
+            # Detecções anteriores à perda não servem mais
+            self.id_minimo_deteccao = self.numero_frame
+            if self.movimento is not None:
+                self.movimento.reiniciar()
+            # Começa a procurar o alvo ao redor de onde ele estava
+            if self.reaquisicao is not None and self.bbox_valida is not None:
+                self.reaquisicao.iniciar(self.bbox_valida)
+            # E a comparar cada detecção nova com a assinatura do alvo
+            if self.reidentificacao is not None:
+                self.reidentificacao.perdido(self.timestamp)
+            return
+
+        self.bbox = self.bbox_valida = bbox
+        # --- CORREÇÃO DE DRIFT PELA IA ---
+        # Pede uma detecção a cada N frames, ou antes se a caixa crescer, encolher ou saltar.
+        # No modo "só detector" a IA é o próprio tracker, então pede sempre que estiver livre.
+        precisa_detectar = self.agendador.registrar(self.numero_frame, bbox) or self.tracker.somente_detector
+        # Com multi-alvo as outras trilhas também precisam de detecções de tempos em tempos
+        trilhas_vencidas = (self.multi_alvo is not None
+                            and self.numero_frame - self.ultimo_envio_deteccao >= self.intervalo_trilhas)
+        if (precisa_detectar or trilhas_vencidas) and not self.detector.ocupado():
+            if trilhas_vencidas:
+                # Os outros alvos podem ser menores que o rastreado: entrada cheia
+                lado = self._escolher_lado()
+            else:
+                # A menor entrada em que o alvo ainda aparece bem, dentro do orçamento de latência
+                lado = self._escolher_lado(bbox[2:], (largura, altura))
+            self.detector.enviar(frame, self.numero_frame, self.timestamp, None, lado)
+            self.ultimo_envio_deteccao = self.numero_frame
+            # O resultado também serve de correção de drift (avaliar() aceita qualquer
+            # resultado mais novo que o último pedido)
+            self.agendador.marcar_enviado(self.numero_frame)
+        resultado = self.detector.ultimo_resultado()
+        if self.agendador.aguardando(resultado):
+            acao, caixa = self.agendador.avaliar(resultado, bbox)
+            if acao == CORRIGIR or (acao == CONCORDA and self.tracker.somente_detector):
+                # Tracker e IA discordam: reinicia o tracker na posição da detecção
+                self.tracker.init(frame, caixa)
+                self.bbox = caixa
+        # Mantém a assinatura de aparência em dia com o alvo (luz, pose, distância)
+        if self.reidentificacao is not None:
+            self.reidentificacao.atualizar(frame, self.bbox)
+
+        # --- CONTROLE ---
+        # Posição -> ângulo do servo; área -> comando de distância (ver controle.py)
+        # O controle sempre foi calibrado na imagem espelhada: a caixa é espelhada antes
+        self.bbox_controle = espelhar_caixa(self.bbox, largura)
+        # Relógio e atraso do controle, guardados no registro do voo para o replay
+        self.instante_controle = time.monotonic()
+        self.atraso_atuacao = self.enlace.latencia_ultimo_envio if self.enlace is not None else 0.0
+        with self.registro.medir("controle"):
+            if self.controlador is not None:
+                # Prevê onde o alvo estará quando o comando chegar ao servo
+                self.comando = self.controlador.calcular(self.bbox_controle, largura, self.area_referencia,
+                                                         self.timestamp, self.instante_controle,
+                                                         self.atraso_atuacao)
+            else:
+                self.comando = calcular_comando(self.bbox_controle, largura, self.area_referencia)
+        # Não bloqueia: repetidos são descartados e a taxa é limitada pela thread do enlace
+        if self.enlace is not None:
+            self.enlace.publicar(self.comando.angulo, self.comando.comando_distancia)
+
+    def _detectar(self, frame):
+        altura, largura = frame.shape[:2]
+        # --- DETECÇÃO ASSÍNCRONA ---
+        # Entrega o frame ao detector quando ele estiver livre; nunca espera pela rede neural.
+        # Logo após uma perda, a rede roda só no recorte ao redor da última caixa.
+        # O controle de qualidade pode espaçar as passadas quando o frame está caro demais.
+        # Com a cena parada, o frame inteiro nem vai para a rede: as detecções anteriores continuam valendo.
+        fator_intervalo = self.qualidade.fator_intervalo_deteccao if self.qualidade is not None else 1
+        if not self.detector.ocupado() and self.numero_frame - self.ultimo_envio_deteccao >= fator_intervalo:
+            roi = self.reaquisicao.proxima_roi(largura, altura) if self.reaquisicao is not None else None
+            if roi is not None:
+                # Os recortes mudam a cada tentativa: a porta de movimento só vale para o frame inteiro
+                if self.movimento is not None:
+                    self.movimento.reiniciar()
+                enviar = True
+            else:
+                enviar = self.movimento is None or self.movimento.deve_detectar(frame, self.timestamp)
+            if enviar:
+                if roi is not None and self.bbox_valida is not None:
+                    # Recorte da reaquisição: o alvo perdido ocupa uma boa parte dele, entrada pequena basta
+                    x0, y0, x1, y1 = roi
+                    lado = self._escolher_lado(self.bbox_valida[2:], (x1 - x0, y1 - y0))
+                else:
+                    # Seleção inicial no frame inteiro: entrada cheia
+                    lado = self._escolher_lado()
+                self.detector.enviar(frame, self.numero_frame, self.timestamp, roi, lado)
+                self.ultimo_envio_deteccao = self.numero_frame
+
+        # Usa o resultado mais recente, descartando os velhos demais ou anteriores à última troca de modo.
+        # Enquanto a cena estiver parada, o resultado não envelhece.
+        parada = self.movimento is not None and self.movimento.parada
+        idade_maxima = None if parada else self.idade_maxima_deteccao
+        resultado = self.detector.ultimo_resultado(idade_maxima, self.id_minimo_deteccao)
+        if resultado is not None:
+            self.deteccoes = resultado.deteccoes
+            # Frame de onde as caixas vieram (usado para iniciar o tracker no clique).
+            # Copiado só quando o resultado é novo: o mesmo resultado volta a cada frame até o próximo
+            if resultado.id_frame != self.id_frame_deteccoes:
+                self.frame_deteccoes = self._copia_deteccoes.copiar(resultado.frame)
+                self.id_frame_deteccoes = resultado.id_frame
+        else:
+            self.deteccoes = []
+
+        # --- REIDENTIFICAÇÃO AUTOMÁTICA ---
+        # Cada resultado novo depois de uma perda é comparado com a assinatura do alvo
+        if self.reidentificacao is not None:
+            encontrado = self.reidentificacao.procurar(resultado)
+            if encontrado is not None:
+                caixa, label = encontrado
+                self.iniciar_rastreamento(resultado.frame, caixa, label, reidentificado=True)
+                self.reidentificado = label
+            else:
+                self.procurando = self.reidentificacao.buscando
+
+    def estado(self):
+        # Retrato do último passo para desenhar (ver desenhar_estado)
+        rastreando = self.comando is not None
+        trilhas = self.multi_alvo.trilhas(self.numero_frame) if self.multi_alvo is not None else []
+        roi = None
+        if self.reaquisicao is not None and self.modo_quadro == MODO_DETECCAO:
+            roi = self.reaquisicao.roi_atual
+        rastreador = None
+        if rastreando:
+            rastreador = self.tracker.nome
+            escala = getattr(self.tracker, "escala", None)
+            if escala is not None:
+                rastreador = f"{rastreador} ({escala:.2f}x)"
+        # Com multi-alvo as detecções aparecem como trilhas
+        deteccoes = self.deteccoes if self.multi_alvo is None and self.modo_quadro == MODO_DETECCAO else []
+        return EstadoQuadro(self.numero_frame, self.modo, self.bbox if rastreando else None, self.comando,
+                            list(deteccoes), trilhas, roi, self.perdido, self.procurando, rastreador)
+
+
+def desenhar_estado(exibicao, estado, nivel_overlay=2):
+    # Desenha um EstadoQuadro na cópia espelhada de exibição
+    largura = exibicao.shape[1]
+    if estado.bbox is not None:
+        x, y, w, h = (int(v) for v in espelhar_caixa(estado.bbox, largura))
+        cv2.rectangle(exibicao, (x, y), (x + w, y + h), cor_sucesso, 2, 1)
+        if estado.comando is not None and nivel_overlay >= 1:
+            comando_final = f"Pos: {estado.comando.texto_posicao} | Dist: {estado.comando.texto_distancia}"
+            cv2.putText(exibicao, comando_final, (10, 30), fonte, 0.6, cor_info, 2)
+        if estado.rastreador is not None and nivel_overlay >= 2:
+            cv2.putText(exibicao, f"Tracker: {estado.rastreador}", (10, 55), fonte, 0.5, cor_info, 1)
+    if estado.perdido:
+        cv2.putText(exibicao, "Alvo Perdido!", (100, 80), fonte, 0.75, cor_falha, 2)
+    if estado.roi is not None and nivel_overlay >= 2:
+        x0, y0, x1, y1 = espelhar_roi(estado.roi, largura)
+        cv2.rectangle(exibicao, (x0, y0), (x1, y1), cor_falha, 1)
+    if estado.procurando and nivel_overlay >= 1:
+        cv2.putText(exibicao, "Procurando alvo...", (10, 55), fonte, 0.5, cor_info, 1)
+    if nivel_overlay < 1:
+        return
+
+    for caixa, label, confianca in estado.deteccoes:
+        (x, y, w, h) = espelhar_caixa(caixa, largura)
+        cv2.rectangle(exibicao, (x, y), (x + w, y + h), cor_caixa_ia, 2)
+        if nivel_overlay >= 2:
+            cv2.putText(exibicao, f"{label}: {confianca:.2f}", (x, y - 5), fonte, 0.5, cor_caixa_ia, 2)
+    # Entre detecções as trilhas são previstas por velocidade constante
+    espessura = 1 if estado.modo == MODO_RASTREAMENTO else 2
+    for id_trilha, caixa, label in estado.trilhas:
+        (x, y, w, h) = espelhar_caixa(caixa, largura)
+        cv2.rectangle(exibicao, (x, y), (x + w, y + h), cor_caixa_ia, espessura)
+        if nivel_overlay >= 2:
+            cv2.putText(exibicao, f"#{id_trilha} {label}", (x, y - 5), fonte, 0.5, cor_caixa_ia, espessura)
+# ------------------------------------
@@ -0,0 +1,219 @@
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+import serial
+
+from comunicacao_serial import EnlaceSerial
+from controlador import ControladorPreditivo
+from controle import ANGULO_CENTRO, FATOR_CONVERSAO, KP_POSICAO, calcular_comando
+from emulador_arduino import EmuladorArduino
+from rastreadores import criar_rastreador
+
+# --- SIMULADOR DE MALHA FECHADA DO PAN ---
+# Fecha a malha sem hardware: uma câmera virtual "pendurada" no servo emulado olha para uma
+# cena sintética larga (panorama) onde um alvo se move. O controle de Versão2.py calcula o
+# ângulo, o comando vai pela serial (pty) até o emulador do Arduino, o servo emulado gira
+# com velocidade limitada e isso muda o que a câmera virtual vê no frame seguinte.
+# Mede latência dos comandos, tempo de acomodação e sobressinal para diferentes Kp_posicao/fator_conversao.
+#
+# Exemplos (a partir da pasta raiz do projeto):
+#   python Projeto/simulador.py --kp 0.1 --fator 4.5
+#   python Projeto/simulador.py --cenario senoide --rastreador CSRT --exibir
+#   python Projeto/simulador.py --preditivo --ki 0.02 --kd 0.01 --ruido 3
+
+
+def criar_cena(largura, altura, semente=0):
+    # Fundo com textura (ruído suavizado) para que o tracker tenha o que seguir
+    rng = np.random.default_rng(semente)
+    ruido = rng.integers(0, 255, (altura // 8, largura // 8, 3), dtype=np.uint8)
+    return cv2.resize(ruido, (largura, altura), interpolation=cv2.INTER_CUBIC)
+
+
+def posicao_alvo(cenario, t, amplitude):
+    # Deslocamento horizontal do alvo (em pixels da cena) a partir do centro
+    if cenario == "degrau":
+        return amplitude if t >= 1.0 else 0.0
+    if cenario == "senoide":
+        return amplitude * np.sin(2 * np.pi * 0.25 * t)
+    raise ValueError(f"Cenário desconhecido: {cenario}")
+
+
+def metricas_degrau(tempos, angulos, instante_degrau=1.0, faixa=0.05):
+    # Sobressinal e tempo de acomodação (faixa de 5% do tamanho do degrau) da resposta do servo
+    tempos = np.asarray(tempos)
+    angulos = np.asarray(angulos)
+    depois = tempos >= instante_degrau
+    if depois.sum() < 10:
+        return {}
+    inicial = angulos[~depois][-1] if (~depois).any() else angulos[0]
+    final = angulos[depois][-max(1, depois.sum() // 10):].mean()
+    degrau = final - inicial
+    if abs(degrau) < 1e-6:
+        return {"angulo_final": float(final)}
+    resposta = (angulos[depois] - inicial) / degrau
+    sobressinal = max(0.0, float(resposta.max()) - 1.0)
+    fora = np.flatnonzero(np.abs(resposta - 1.0) > faixa)
+    acomodacao = float(tempos[depois][fora[-1]] - instante_degrau) if len(fora) else 0.0
+    return {
+        "angulo_inicial": float(inicial),
+        "angulo_final": float(final),
+        "sobressinal_pct": round(sobressinal * 100, 2),
+        "tempo_acomodacao_s": round(acomodacao, 3),
+    }
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Simulador de malha fechada do servo de pan.")
+    parser.add_argument("--kp", type=float, default=KP_POSICAO, help="Kp_posicao")
+    parser.add_argument("--fator", type=float, default=FATOR_CONVERSAO, help="fator_conversao (graus por unidade)")
+    parser.add_argument("--preditivo", action="store_true",
+                        help="Usa o controle preditivo (Kalman + PID) de controlador.py.")
+    parser.add_argument("--ki", type=float, default=0.0, help="Ki_posicao (só com --preditivo)")
+    parser.add_argument("--kd", type=float, default=0.0, help="Kd_posicao (só com --preditivo)")
+    parser.add_argument("--cenario", choices=["degrau", "senoide"], default="degrau")
+    parser.add_argument("--amplitude", type=float, default=250, help="Deslocamento do alvo, em pixels da cena.")
+    parser.add_argument("--duracao", type=float, default=5.0, help="Segundos simulados (em tempo real).")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--campo-visao", type=float, default=60, help="Campo de visão horizontal da câmera, em graus.")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--protocolo", choices=["texto", "binario"], default="texto")
+    parser.add_argument("--velocidade-servo", type=float, default=600, help="Graus por segundo.")
+    parser.add_argument("--rastreador", help="Usa um tracker de verdade (ex: CSRT) em vez da posição exata do alvo.")
+    parser.add_argument("--ruido", type=float, default=0.0, help="Ruído (desvio, em pixels) na bbox exata.")
+    parser.add_argument("--exibir", action="store_true", help="Mostra a câmera virtual em uma janela.")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout).")
+    return parser
+
+
+def executar(args):
+    largura_view, altura_view = 640, 480
+    px_por_grau = largura_view / args.campo_visao
+    # A cena cobre todo o curso do servo (0-180 graus) mais uma margem
+    largura_cena = int(180 * px_por_grau + largura_view)
+    cena = criar_cena(largura_cena, altura_view)
+    centro_cena = largura_cena // 2
+    lado_alvo = 60
+    rng = np.random.default_rng(1)
+
+    emulador = EmuladorArduino(args.baudrate, args.velocidade_servo, ANGULO_CENTRO, args.protocolo).iniciar()
+    porta = serial.Serial(emulador.caminho, baudrate=args.baudrate, timeout=0.1)
+    enlace = EnlaceSerial(porta, args.baudrate, args.protocolo).iniciar()
+
+    controlador = ControladorPreditivo(args.kp, args.ki, args.kd, args.fator) if args.preditivo else None
+    tracker = None
+    area_referencia = lado_alvo * lado_alvo
+    publicados = {}
+    ultimo_comando = None
+    latencias = []
+    tempos, angulos, erros = [], [], []
+
+    inicio = time.perf_counter()
+    proximo_quadro = inicio
+    while True:
+        agora = time.perf_counter()
+        t = agora - inicio
+        if t >= args.duracao:
+            break
+
+        # --- CÂMERA VIRTUAL: o que o servo está "olhando" agora ---
+        angulo_servo = emulador.angulo(agora)
+        # Ângulo menor gira a câmera para a direita da cena
+        centro_view = centro_cena + (ANGULO_CENTRO - angulo_servo) * px_por_grau
+        x0 = int(np.clip(centro_view - largura_view / 2, 0, largura_cena - largura_view))
+        frame = cena[:, x0:x0 + largura_view].copy()
+
+        alvo_x = centro_cena + posicao_alvo(args.cenario, t, args.amplitude)
+        caixa_real = (int(alvo_x - lado_alvo / 2 - x0), altura_view // 2 - lado_alvo // 2, lado_alvo, lado_alvo)
+        cv2.rectangle(frame, caixa_real[:2], (caixa_real[0] + lado_alvo, caixa_real[1] + lado_alvo),
+                      (0, 0, 255), -1)
+        cv2.circle(frame, (caixa_real[0] + lado_alvo // 2, caixa_real[1] + lado_alvo // 2),
+                   lado_alvo // 4, (255, 255, 255), -1)
+
+        # --- "PERCEPÇÃO": bbox exata (com ruído opcional) ou um tracker de verdade ---
+        if args.rastreador:
+            if tracker is None:
+                tracker = criar_rastreador(args.rastreador)
+                tracker.init(frame, caixa_real)
+                bbox = caixa_real
+            else:
+                ok, bbox = tracker.update(frame)
+                if not ok:
+                    bbox = caixa_real
+                    tracker.init(frame, bbox)
+        else:
+            dx, dy = rng.normal(0, args.ruido, 2) if args.ruido else (0.0, 0.0)
+            bbox = (caixa_real[0] + dx, caixa_real[1] + dy, lado_alvo, lado_alvo)
+
+        # --- CONTROLE (o mesmo do loop principal) e envio pela serial emulada ---
+        if controlador is not None:
+            # O frame é gerado "agora"; o atraso até o servo é a fila do enlace mais a transmissão
+            atraso = enlace.latencia_ultimo_envio + enlace.intervalo_minimo
+            comando = controlador.calcular(bbox, largura_view, area_referencia, agora, agora, atraso)
+        else:
+            comando = calcular_comando(bbox, largura_view, area_referencia,
+                                       kp_posicao=args.kp, fator_conversao=args.fator)
+        chave = (comando.angulo, comando.comando_distancia)
+        if chave != ultimo_comando:
+            # Momento em que o controle pediu este comando (o enlace só envia mudanças)
+            publicados[chave] = agora
+            ultimo_comando = chave
+        enlace.publicar(comando.angulo, comando.comando_distancia)
+
+        tempos.append(t)
+        angulos.append(angulo_servo)
+        erros.append(caixa_real[0] + lado_alvo / 2 - largura_view / 2)
+
+        if args.exibir:
+            cv2.imshow("Simulador", frame)
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
+
+        proximo_quadro += 1 / args.fps
+        espera = proximo_quadro - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+
+    enlace.fechar(comando_final=None)
+    # Dá tempo para os últimos bytes chegarem ao emulador antes de parar
+    time.sleep(0.1)
+    emulador.parar()
+    if args.exibir:
+        cv2.destroyAllWindows()
+
+    # Latência de cada comando: do pedido do controle até a chegada no "Arduino"
+    for chegada, angulo, led in emulador.recebidos:
+        publicado = publicados.get((angulo, led))
+        if publicado is not None and chegada >= publicado:
+            latencias.append(chegada - publicado)
+
+    erros = np.abs(np.asarray(erros))
+    resultado = {
+        "configuracao": vars(args),
+        "quadros": len(tempos),
+        "comandos_recebidos": len(emulador.recebidos),
+        "comandos_invalidos": emulador.invalidos,
+        "serial": enlace.contadores(),
+        "erro_px_medio": round(float(erros.mean()), 2) if len(erros) else None,
+        "erro_px_final": round(float(erros[-max(1, len(erros) // 10):].mean()), 2) if len(erros) else None,
+    }
+    if latencias:
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) * 1000
+        resultado["latencia_comando_ms"] = {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+                                            "p99": round(float(p99), 3)}
+    if args.cenario == "degrau":
+        resultado["resposta_degrau"] = metricas_degrau(tempos, angulos)
+    return resultado
+
+
+if __name__ == "__main__":
+    resultado = executar(criar_parser().parse_args())
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if resultado["configuracao"]["saida"]:
+        with open(resultado["configuracao"]["saida"], "w", encoding="utf-8") as fp:
+            fp.write(texto + "\n")
+    else:
+        print(texto)
+# ------------------------------------
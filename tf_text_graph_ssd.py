@@ -9,27 +9,14 @@
 # deep learning network trained in TensorFlow Object Detection API.
 # Then you can import it with a binary frozen graph (.pb) using readNetFromTensorflow() function.
 # See details and examples on the following wiki page: https://github.com/opencv/opencv/wiki/TensorFlow-Object-Detection-API
-import tensorflow as tf
+#
+# Graph rewriting works on an indexed graph (name -> node map, consumer lists and reference
+# counts) so that batch norm fusion, Identity removal and dead node pruning are single linear
+# passes. Nodes are never deleted one by one from graph_def.node (each delete is O(n)); instead
+# the node list is rebuilt once with keepNodes(). These helpers do not need TensorFlow.
 import argparse
+import os
 from math import sqrt
-from tensorflow.core.framework.node_def_pb2 import NodeDef
-from tensorflow.tools.graph_transforms import TransformGraph
-from google.protobuf import text_format
-
-parser = argparse.ArgumentParser(description='Run this script to get a text graph of '
-                                             'SSD model from TensorFlow Object Detection API. '
-                                             'Then pass it with .pb file to cv::dnn::readNetFromTensorflow function.')
-parser.add_argument('--input', required=True, help='Path to frozen TensorFlow graph.')
-parser.add_argument('--output', required=True, help='Path to output text graph.')
-parser.add_argument('--num_classes', default=90, type=int, help='Number of trained classes.')
-parser.add_argument('--min_scale', default=0.2, type=float, help='Hyper-parameter of ssd_anchor_generator from config file.')
-parser.add_argument('--max_scale', default=0.95, type=float, help='Hyper-parameter of ssd_anchor_generator from config file.')
-parser.add_argument('--num_layers', default=6, type=int, help='Hyper-parameter of ssd_anchor_generator from config file.')
-parser.add_argument('--aspect_ratios', default=[1.0, 2.0, 0.5, 3.0, 0.333], type=float, nargs='+',
-                    help='Hyper-parameter of ssd_anchor_generator from config file.')
-parser.add_argument('--image_width', default=300, type=int, help='Training images width.')
-parser.add_argument('--image_height', default=300, type=int, help='Training images height.')
-args = parser.parse_args()
 
 # Nodes that should be kept.
 keepOps = ['Conv2D', 'BiasAdd', 'Add', 'Relu6', 'Placeholder', 'FusedBatchNorm',
@@ -42,28 +29,41 @@ unusedAttrs = ['T', 'data_format', 'Tshape', 'N', 'Tidx', 'Tdim', 'use_cudnn_on_
 # Node with which prefixes should be removed
 prefixesToRemove = ('MultipleGridAnchorGenerator/', 'Postprocessor/', 'Preprocessor/')
 
-# Read the graph.
-with tf.gfile.FastGFile(args.input, 'rb') as f:
-    graph_def = tf.GraphDef()
-    graph_def.ParseFromString(f.read())
 
-inpNames = ['image_tensor']
-outNames = ['num_detections', 'detection_scores', 'detection_boxes', 'detection_classes']
-graph_def = TransformGraph(graph_def, inpNames, outNames, ['sort_by_execution_order'])
+def nodeName(inp):
+    # 'name:1' (output port) and '^name' (control dependency) both refer to node 'name'
+    if inp.startswith('^'):
+        inp = inp[1:]
+    return inp.split(':', 1)[0]
+
+
+def keepNodes(graph_def, keep):
+    # Rebuild the node list in one pass, keeping the nodes for which keep(node) is true.
+    kept = type(graph_def)()
+    kept.node.extend(node for node in graph_def.node if keep(node))
+    del graph_def.node[:]
+    graph_def.node.extend(kept.node)
 
-def getUnconnectedNodes():
-    unconnected = []
+
+def buildConsumers(graph_def):
+    # name -> names of the nodes that read it
+    consumers = {node.name: [] for node in graph_def.node}
     for node in graph_def.node:
-        unconnected.append(node.name)
         for inp in node.input:
-            if inp in unconnected:
-                unconnected.remove(inp)
-    return unconnected
+            name = nodeName(inp)
+            if name in consumers:
+                consumers[name].append(node.name)
+    return consumers
+
+
+def getUnconnectedNodes(graph_def):
+    # Nodes whose output is not used by any other node
+    consumers = buildConsumers(graph_def)
+    return [name for name, users in consumers.items() if not users]
 
-removedNodes = []
 
 # Detect unfused batch normalization nodes and fuse them.
-def fuse_batch_normalization():
+def fuse_batch_normalization(graph_def):
     # Add_0 <-- moving_variance, add_y
     # Rsqrt <-- Add_0
     # Mul_0 <-- Rsqrt, gamma
@@ -91,7 +91,7 @@ def fuse_batch_normalization():
         else:
             return False
 
-    nodesToRemove = []
+    nodesToRemove = set()
     for node in graph_def.node:
         inputs = {}
         fusedNodes = []
@@ -105,57 +105,80 @@ def fuse_batch_normalization():
             node.input.append(inputs['beta'])
             node.input.append(inputs['moving_mean'])
             node.input.append(inputs['moving_variance'])
-            text_format.Merge('f: 0.001', node.attr["epsilon"])
-            nodesToRemove += fusedNodes[1:]
-    for node in nodesToRemove:
-        graph_def.node.remove(node)
+            node.attr["epsilon"].f = 0.001
+            nodesToRemove.update(fused.name for fused in fusedNodes[1:])
+    if nodesToRemove:
+        keepNodes(graph_def, lambda node: node.name not in nodesToRemove)
 
-fuse_batch_normalization()
 
 # Removes Identity nodes
-def removeIdentity():
-    identities = {}
-    for node in graph_def.node:
-        if node.op == 'Identity':
-            identities[node.name] = node.input[0]
-            graph_def.node.remove(node)
+def removeIdentity(graph_def):
+    identities = {node.name: node.input[0] for node in graph_def.node if node.op == 'Identity'}
+
+    def resolve(name):
+        # Identity -> Identity chains point straight to the first real node
+        while name in identities:
+            name = identities[name]
+        return name
 
     for node in graph_def.node:
-        for i in range(len(node.input)):
-            if node.input[i] in identities:
-                node.input[i] = identities[node.input[i]]
+        for i, inp in enumerate(node.input):
+            if inp in identities:
+                node.input[i] = resolve(inp)
 
-removeIdentity()
+    keepNodes(graph_def, lambda node: node.op != 'Identity')
 
-# Remove extra nodes and attributes.
-for i in reversed(range(len(graph_def.node))):
-    op = graph_def.node[i].op
-    name = graph_def.node[i].name
 
-    if (not op in keepOps) or name.startswith(prefixesToRemove):
-        if op != 'Const':
-            removedNodes.append(name)
+# Remove extra nodes and attributes.
+def removeUnusedOps(graph_def):
+    removedNodes = set()
 
-        del graph_def.node[i]
-    else:
+    def keep(node):
+        if (not node.op in keepOps) or node.name.startswith(prefixesToRemove):
+            if node.op != 'Const':
+                removedNodes.add(node.name)
+            return False
         for attr in unusedAttrs:
-            if attr in graph_def.node[i].attr:
-                del graph_def.node[i].attr[attr]
-
-# Remove references to removed nodes except Const nodes.
-for node in graph_def.node:
-    for i in reversed(range(len(node.input))):
-        if node.input[i] in removedNodes:
-            del node.input[i]
-
-# Connect input node to the first layer
-assert(graph_def.node[0].op == 'Placeholder')
-# assert(graph_def.node[1].op == 'Conv2D')
-weights = graph_def.node[1].input[0]
-for i in range(len(graph_def.node[1].input)):
-    graph_def.node[1].input.pop()
-graph_def.node[1].input.append(graph_def.node[0].name)
-graph_def.node[1].input.append(weights)
+            if attr in node.attr:
+                del node.attr[attr]
+        return True
+
+    keepNodes(graph_def, keep)
+
+    # Remove references to removed nodes except Const nodes.
+    for node in graph_def.node:
+        for i in reversed(range(len(node.input))):
+            if node.input[i] in removedNodes:
+                del node.input[i]
+
+
+def removeUnconnectedNodes(graph_def, outputs):
+    # Reference counting: a node is dead when nothing reads it and it is not an output.
+    # Removing it decrements its inputs, which may die in turn; every node is visited once.
+    nodesMap = {node.name: node for node in graph_def.node}
+    refCounts = {name: 0 for name in nodesMap}
+    for node in graph_def.node:
+        for inp in node.input:
+            name = nodeName(inp)
+            if name in refCounts:
+                refCounts[name] += 1
+
+    removed = set()
+    stack = [name for name, count in refCounts.items() if count == 0 and not name in outputs]
+    while stack:
+        name = stack.pop()
+        removed.add(name)
+        for inp in nodesMap[name].input:
+            inpName = nodeName(inp)
+            if inpName in refCounts:
+                refCounts[inpName] -= 1
+                if refCounts[inpName] == 0 and not inpName in outputs:
+                    stack.append(inpName)
+
+    if removed:
+        keepNodes(graph_def, lambda node: node.name not in removed)
+    return removed
+
 
 # Create SSD postprocessing head ###############################################
 
@@ -175,122 +198,197 @@ def tensorMsg(values):
         msg += '%s: %s ' % (field, str(value))
     return msg + '}'
 
-def addConstNode(name, values):
-    node = NodeDef()
-    node.name = name
-    node.op = 'Const'
-    text_format.Merge(tensorMsg(values), node.attr["value"])
-    graph_def.node.extend([node])
-
-def addConcatNode(name, inputs, axisNodeName):
-    concat = NodeDef()
-    concat.name = name
-    concat.op = 'ConcatV2'
-    for inp in inputs:
-        concat.input.append(inp)
-    concat.input.append(axisNodeName)
-    graph_def.node.extend([concat])
-
-addConstNode('concat/axis_flatten', [-1])
-addConstNode('PriorBox/concat/axis', [-2])
-
-for label in ['ClassPredictor', 'BoxEncodingPredictor']:
-    concatInputs = []
+
+def classMask(numAnchors, numClasses, classes):
+    # Per-channel offsets for a ClassPredictor output with numAnchors * (numClasses + 1) channels
+    # (anchor-major, class 0 is background): 0 for kept classes, a large negative logit for the rest,
+    # so their sigmoid scores are 0 and DetectionOutput drops them before NMS.
+    keep = set(classes)
+    return [0.0 if c == 0 or c in keep else -1e4
+            for _ in range(numAnchors) for c in range(numClasses + 1)]
+
+
+def addSSDHead(graph_def, args, imageWidth, imageHeight):
+    # Only the PriorBox sizes depend on the network input size, so one rewritten
+    # graph can get several heads (see --sizes).
+    from google.protobuf import text_format
+
+    def addConstNode(name, values):
+        node = graph_def.node.add()
+        node.name = name
+        node.op = 'Const'
+        text_format.Merge(tensorMsg(values), node.attr["value"])
+
+    def addConcatNode(name, inputs, axisNodeName):
+        concat = graph_def.node.add()
+        concat.name = name
+        concat.op = 'ConcatV2'
+        for inp in inputs:
+            concat.input.append(inp)
+        concat.input.append(axisNodeName)
+
+    addConstNode('concat/axis_flatten', [-1])
+    addConstNode('PriorBox/concat/axis', [-2])
+
+    for label in ['ClassPredictor', 'BoxEncodingPredictor']:
+        concatInputs = []
+        for i in range(args.num_layers):
+            # Flatten predictions
+            inpName = 'BoxPredictor_%d/%s/BiasAdd' % (i, label)
+            if label == 'ClassPredictor' and args.classes:
+                # Class whitelist: mask the logits of the other classes
+                numAnchors = 3 if i == 0 else len(args.aspect_ratios) + 1
+                addConstNode(inpName + '/class_mask', classMask(numAnchors, args.num_classes, args.classes))
+                mask = graph_def.node.add()
+                mask.name = inpName + '/class_filter'
+                mask.op = 'Add'
+                mask.input.append(inpName)
+                mask.input.append(inpName + '/class_mask')
+                inpName = mask.name
+            flatten = graph_def.node.add()
+            flatten.input.append(inpName)
+            flatten.name = 'BoxPredictor_%d/%s/BiasAdd/Flatten' % (i, label)
+            flatten.op = 'Flatten'
+
+            concatInputs.append(flatten.name)
+        addConcatNode('%s/concat' % label, concatInputs, 'concat/axis_flatten')
+
+    # Add layers that generate anchors (bounding boxes proposals).
+    scales = [args.min_scale + (args.max_scale - args.min_scale) * i / (args.num_layers - 1)
+              for i in range(args.num_layers)] + [1.0]
+
+    priorBoxes = []
+    addConstNode('reshape_prior_boxes_to_4d', [1, 2, -1, 1])
     for i in range(args.num_layers):
-        # Flatten predictions
-        flatten = NodeDef()
-        inpName = 'BoxPredictor_%d/%s/BiasAdd' % (i, label)
-        flatten.input.append(inpName)
-        flatten.name = inpName + '/Flatten'
-        flatten.op = 'Flatten'
-
-        concatInputs.append(flatten.name)
-        graph_def.node.extend([flatten])
-    addConcatNode('%s/concat' % label, concatInputs, 'concat/axis_flatten')
-
-# Add layers that generate anchors (bounding boxes proposals).
-scales = [args.min_scale + (args.max_scale - args.min_scale) * i / (args.num_layers - 1)
-          for i in range(args.num_layers)] + [1.0]
-
-priorBoxes = []
-addConstNode('reshape_prior_boxes_to_4d', [1, 2, -1, 1])
-for i in range(args.num_layers):
-    priorBox = NodeDef()
-    priorBox.name = 'PriorBox_%d' % i
-    priorBox.op = 'PriorBox'
-    priorBox.input.append('BoxPredictor_%d/BoxEncodingPredictor/BiasAdd' % i)
-    priorBox.input.append(graph_def.node[0].name)  # image_tensor
-
-    text_format.Merge('b: false', priorBox.attr["flip"])
-    text_format.Merge('b: false', priorBox.attr["clip"])
-
-    if i == 0:
-        widths = [0.1, args.min_scale * sqrt(2.0), args.min_scale * sqrt(0.5)]
-        heights = [0.1, args.min_scale / sqrt(2.0), args.min_scale / sqrt(0.5)]
-    else:
-        widths = [scales[i] * sqrt(ar) for ar in args.aspect_ratios]
-        heights = [scales[i] / sqrt(ar) for ar in args.aspect_ratios]
-
-        widths += [sqrt(scales[i] * scales[i + 1])]
-        heights += [sqrt(scales[i] * scales[i + 1])]
-    widths = [w * args.image_width for w in widths]
-    heights = [h * args.image_height for h in heights]
-    text_format.Merge(tensorMsg(widths), priorBox.attr["width"])
-    text_format.Merge(tensorMsg(heights), priorBox.attr["height"])
-    text_format.Merge(tensorMsg([0.1, 0.1, 0.2, 0.2]), priorBox.attr["variance"])
-
-    graph_def.node.extend([priorBox])
-
-    # Reshape from 1x2xN to 1x2xNx1
-    reshape = NodeDef()
-    reshape.name = priorBox.name + '/4d'
-    reshape.op = 'Reshape'
-    reshape.input.append(priorBox.name)
-    reshape.input.append('reshape_prior_boxes_to_4d')
-    graph_def.node.extend([reshape])
-
-    priorBoxes.append(reshape.name)
-
-addConcatNode('PriorBox/concat', priorBoxes, 'PriorBox/concat/axis')
-
-# Sigmoid for classes predictions and DetectionOutput layer
-sigmoid = NodeDef()
-sigmoid.name = 'ClassPredictor/concat/sigmoid'
-sigmoid.op = 'Sigmoid'
-sigmoid.input.append('ClassPredictor/concat')
-graph_def.node.extend([sigmoid])
-
-detectionOut = NodeDef()
-detectionOut.name = 'detection_out'
-detectionOut.op = 'DetectionOutput'
-
-detectionOut.input.append('BoxEncodingPredictor/concat')
-detectionOut.input.append(sigmoid.name)
-detectionOut.input.append('PriorBox/concat')
-
-text_format.Merge('i: %d' % (args.num_classes + 1), detectionOut.attr['num_classes'])
-text_format.Merge('b: true', detectionOut.attr['share_location'])
-text_format.Merge('i: 0', detectionOut.attr['background_label_id'])
-text_format.Merge('f: 0.6', detectionOut.attr['nms_threshold'])
-text_format.Merge('i: 100', detectionOut.attr['top_k'])
-text_format.Merge('s: "CENTER_SIZE"', detectionOut.attr['code_type'])
-text_format.Merge('i: 100', detectionOut.attr['keep_top_k'])
-text_format.Merge('f: 0.01', detectionOut.attr['confidence_threshold'])
-text_format.Merge('b: true', detectionOut.attr['loc_pred_transposed'])
-
-graph_def.node.extend([detectionOut])
-
-while True:
-    unconnectedNodes = getUnconnectedNodes()
-    unconnectedNodes.remove(detectionOut.name)
-    if not unconnectedNodes:
-        break
-
-    for name in unconnectedNodes:
-        for i in range(len(graph_def.node)):
-            if graph_def.node[i].name == name:
-                del graph_def.node[i]
-                break
-
-# Save as text.
-tf.train.write_graph(graph_def, "", args.output, as_text=True)
+        priorBox = graph_def.node.add()
+        priorBox.name = 'PriorBox_%d' % i
+        priorBox.op = 'PriorBox'
+        priorBox.input.append('BoxPredictor_%d/BoxEncodingPredictor/BiasAdd' % i)
+        priorBox.input.append(graph_def.node[0].name)  # image_tensor
+
+        text_format.Merge('b: false', priorBox.attr["flip"])
+        text_format.Merge('b: false', priorBox.attr["clip"])
+
+        if i == 0:
+            widths = [0.1, args.min_scale * sqrt(2.0), args.min_scale * sqrt(0.5)]
+            heights = [0.1, args.min_scale / sqrt(2.0), args.min_scale / sqrt(0.5)]
+        else:
+            widths = [scales[i] * sqrt(ar) for ar in args.aspect_ratios]
+            heights = [scales[i] / sqrt(ar) for ar in args.aspect_ratios]
+
+            widths += [sqrt(scales[i] * scales[i + 1])]
+            heights += [sqrt(scales[i] * scales[i + 1])]
+        widths = [w * imageWidth for w in widths]
+        heights = [h * imageHeight for h in heights]
+        text_format.Merge(tensorMsg(widths), priorBox.attr["width"])
+        text_format.Merge(tensorMsg(heights), priorBox.attr["height"])
+        text_format.Merge(tensorMsg([0.1, 0.1, 0.2, 0.2]), priorBox.attr["variance"])
+
+        # Reshape from 1x2xN to 1x2xNx1
+        reshape = graph_def.node.add()
+        reshape.name = priorBox.name + '/4d'
+        reshape.op = 'Reshape'
+        reshape.input.append(priorBox.name)
+        reshape.input.append('reshape_prior_boxes_to_4d')
+
+        priorBoxes.append(reshape.name)
+
+    addConcatNode('PriorBox/concat', priorBoxes, 'PriorBox/concat/axis')
+
+    # Sigmoid for classes predictions and DetectionOutput layer
+    sigmoid = graph_def.node.add()
+    sigmoid.name = 'ClassPredictor/concat/sigmoid'
+    sigmoid.op = 'Sigmoid'
+    sigmoid.input.append('ClassPredictor/concat')
+
+    detectionOut = graph_def.node.add()
+    detectionOut.name = 'detection_out'
+    detectionOut.op = 'DetectionOutput'
+
+    detectionOut.input.append('BoxEncodingPredictor/concat')
+    detectionOut.input.append(sigmoid.name)
+    detectionOut.input.append('PriorBox/concat')
+
+    text_format.Merge('i: %d' % (args.num_classes + 1), detectionOut.attr['num_classes'])
+    text_format.Merge('b: true', detectionOut.attr['share_location'])
+    text_format.Merge('i: 0', detectionOut.attr['background_label_id'])
+    text_format.Merge('f: %f' % args.nms_threshold, detectionOut.attr['nms_threshold'])
+    text_format.Merge('i: %d' % args.top_k, detectionOut.attr['top_k'])
+    text_format.Merge('s: "CENTER_SIZE"', detectionOut.attr['code_type'])
+    text_format.Merge('i: %d' % args.keep_top_k, detectionOut.attr['keep_top_k'])
+    text_format.Merge('f: %f' % args.confidence_threshold, detectionOut.attr['confidence_threshold'])
+    text_format.Merge('b: true', detectionOut.attr['loc_pred_transposed'])
+
+    removeUnconnectedNodes(graph_def, {detectionOut.name})
+
+
+def variantPath(output, size):
+    # ssd.pbtxt -> ssd_192.pbtxt
+    root, ext = os.path.splitext(output)
+    return '%s_%d%s' % (root, size, ext)
+
+
+if __name__ == '__main__':
+    import tensorflow as tf
+    from tensorflow.tools.graph_transforms import TransformGraph
+
+    parser = argparse.ArgumentParser(description='Run this script to get a text graph of '
+                                                 'SSD model from TensorFlow Object Detection API. '
+                                                 'Then pass it with .pb file to cv::dnn::readNetFromTensorflow function.')
+    parser.add_argument('--input', required=True, help='Path to frozen TensorFlow graph.')
+    parser.add_argument('--output', required=True, help='Path to output text graph.')
+    parser.add_argument('--num_classes', default=90, type=int, help='Number of trained classes.')
+    parser.add_argument('--min_scale', default=0.2, type=float, help='Hyper-parameter of ssd_anchor_generator from config file.')
+    parser.add_argument('--max_scale', default=0.95, type=float, help='Hyper-parameter of ssd_anchor_generator from config file.')
+    parser.add_argument('--num_layers', default=6, type=int, help='Hyper-parameter of ssd_anchor_generator from config file.')
+    parser.add_argument('--aspect_ratios', default=[1.0, 2.0, 0.5, 3.0, 0.333], type=float, nargs='+',
+                        help='Hyper-parameter of ssd_anchor_generator from config file.')
+    parser.add_argument('--image_width', default=300, type=int, help='Training images width.')
+    parser.add_argument('--image_height', default=300, type=int, help='Training images height.')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        help='Also write square input size variants (e.g. --sizes 192 256 300) '
+                             'as <output>_<size>.pbtxt, each with matching PriorBox sizes.')
+    parser.add_argument('--nms_threshold', default=0.6, type=float, help='IoU threshold of DetectionOutput NMS.')
+    parser.add_argument('--top_k', default=100, type=int,
+                        help='Maximum number of boxes per class that go into NMS.')
+    parser.add_argument('--keep_top_k', default=100, type=int,
+                        help='Maximum number of detections in the output (rows of the output tensor).')
+    parser.add_argument('--confidence_threshold', default=0.01, type=float,
+                        help='Detections below this score are dropped inside the network.')
+    parser.add_argument('--classes', type=int, nargs='+',
+                        help='Only keep these class ids (1-based, e.g. COCO: 1 = person). Default: all.')
+    args = parser.parse_args()
+
+    # Read the graph.
+    with tf.gfile.FastGFile(args.input, 'rb') as f:
+        graph_def = tf.GraphDef()
+        graph_def.ParseFromString(f.read())
+
+    inpNames = ['image_tensor']
+    outNames = ['num_detections', 'detection_scores', 'detection_boxes', 'detection_classes']
+    graph_def = TransformGraph(graph_def, inpNames, outNames, ['sort_by_execution_order'])
+
+    fuse_batch_normalization(graph_def)
+
+    removeIdentity(graph_def)
+
+    removeUnusedOps(graph_def)
+
+    # Connect input node to the first layer
+    assert(graph_def.node[0].op == 'Placeholder')
+    # assert(graph_def.node[1].op == 'Conv2D')
+    weights = graph_def.node[1].input[0]
+    for i in range(len(graph_def.node[1].input)):
+        graph_def.node[1].input.pop()
+    graph_def.node[1].input.append(graph_def.node[0].name)
+    graph_def.node[1].input.append(weights)
+
+    outputs = [(args.output, args.image_width, args.image_height)]
+    outputs += [(variantPath(args.output, size), size, size) for size in args.sizes or []]
+    for output, imageWidth, imageHeight in outputs:
+        variant = tf.GraphDef()
+        variant.CopyFrom(graph_def)
+        addSSDHead(variant, args, imageWidth, imageHeight)
+
+        # Save as text.
+        tf.train.write_graph(variant, "", output, as_text=True)